@@ -3,6 +3,8 @@ import requests
 import uuid
 from datetime import datetime
 from models import persistence, prompts
+from models.spreadsheet_reader import SpreadsheetReader, OPENPYXL_AVAILABLE, PANDAS_AVAILABLE
+from utils import helpers
 import base64
 import mimetypes
 import os
@@ -19,12 +21,7 @@ try:
 except ImportError:
     DOCX_AVAILABLE = False
 
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
-
+SPREADSHEET_AVAILABLE = PANDAS_AVAILABLE and OPENPYXL_AVAILABLE
 
 class AIController:
     def __init__(self, main_controller):
@@ -58,7 +55,7 @@ class AIController:
         }
     ]
 
-    def _extract_text_from_file(self, file_path: str) -> str:
+    def _extract_text_from_file(self, file_path: str, spreadsheet: SpreadsheetReader | None = None) -> str:
         _, file_extension = os.path.splitext(file_path)
         file_extension = file_extension.lower()
         try:
@@ -81,16 +78,9 @@ class AIController:
                 doc = docx.Document(file_path)
                 return "\n".join([para.text for para in doc.paragraphs])
             elif file_extension == ".xlsx":
-                if not PANDAS_AVAILABLE:
-                    return "A extração de XLSX não é suportada (biblioteca pandas não encontrada)."
-                
-                excel_file = pd.read_excel(file_path, sheet_name=None, engine='openpyxl')
-                full_text = ""
-                for sheet_name, df in excel_file.items():
-                    full_text += f"--- Planilha: {sheet_name} ---\n"
-                    full_text += df.to_markdown(index=False)
-                    full_text += "\n\n"
-                return full_text
+                if not SPREADSHEET_AVAILABLE:
+                    return "A extração de XLSX não é suportada (bibliotecas pandas/openpyxl não encontradas)."
+                return (spreadsheet or SpreadsheetReader(file_path)).to_text()
             else:
                 return f"A extração de conteúdo para arquivos '{file_extension}' não é suportada."
         except Exception as e:
@@ -119,13 +109,15 @@ class AIController:
             self.page.update()
 
     def execute_confirmed_import(self, e):
-        active_file_path = self.app_state.active_file_in_chat.get("file_path")
-        if not active_file_path or not PANDAS_AVAILABLE:
-            result_message = "Erro: Arquivo da planilha não encontrado ou biblioteca pandas ausente."
+        active_file = self.app_state.active_file_in_chat or {}
+        active_file_path = active_file.get("file_path")
+        if not active_file_path or not SPREADSHEET_AVAILABLE:
+            result_message = "Erro: Arquivo da planilha não encontrado ou bibliotecas pandas/openpyxl ausentes."
         else:
             try:
-                df = pd.read_excel(active_file_path, engine='openpyxl')
-                items_added, result_message = self.main.data_controller.import_data_from_dataframe(df)
+                # A planilha já foi lida para a IA: a importação usa a mesma tabela, sem ler o arquivo de novo.
+                reader = active_file.get("spreadsheet") or SpreadsheetReader(active_file_path)
+                items_added, result_message = self.main.data_controller.import_data_from_frames(reader.iter_frames())
             except Exception as ex:
                 result_message = f"Erro ao ler o arquivo Excel: {ex}"
         
@@ -160,7 +152,7 @@ class AIController:
         file_ext = os.path.splitext(file_path)[1].lower()
         
         message_type = "image" if file_ext in image_extensions else "file"
-        current_chat["messages"].append({"role": "user", "content": file_path, "type": message_type, "caption": caption})
+        self.app_state.append_chat_message(current_chat["id"], {"role": "user", "content": file_path, "type": message_type, "caption": caption})
         
         if message_type == "image":
             from views.ai_view import _create_image_message_control
@@ -188,9 +180,11 @@ class AIController:
                 response, error = None, f"Erro ao processar a imagem: {e}"
         else:
             filename = os.path.basename(file_path)
-            extracted_content = self._extract_text_from_file(file_path)
+            spreadsheet = SpreadsheetReader(file_path) if file_ext in excel_extensions and SPREADSHEET_AVAILABLE else None
+            extracted_content = self._extract_text_from_file(file_path, spreadsheet)
             self.app_state.active_file_in_chat = {
-                "chat_id": current_chat["id"], "file_path": file_path, "content": extracted_content
+                "chat_id": current_chat["id"], "file_path": file_path, "content": extracted_content,
+                "spreadsheet": spreadsheet,
             }
             prompt_text = prompts.get_document_analysis_prompt(filename, extracted_content, caption)
             contents = {"contents": [{"parts": [{"text": prompt_text}]}]}
@@ -205,13 +199,13 @@ class AIController:
         
         if response:
             ai_content = response
-            current_chat["messages"].append({"role": "ai", "content": ai_content, "type": "text"})
+            self.app_state.append_chat_message(current_chat["id"], {"role": "ai", "content": ai_content, "type": "text"})
             from views.ai_view import _create_chat_message_control
             self.main.ai_chat_messages_list.controls.append(_create_chat_message_control(ai_content, "ai", cs))
             persistence.save_state(self.app_state)
         elif error:
             ai_content = f"Erro: {error}"
-            current_chat["messages"].append({"role": "system", "content": ai_content, "type": "text"})
+            self.app_state.append_chat_message(current_chat["id"], {"role": "system", "content": ai_content, "type": "text"})
             from views.ai_view import _create_chat_message_control
             self.main.ai_chat_messages_list.controls.append(_create_chat_message_control(ai_content, "system", cs))
             persistence.save_state(self.app_state)
@@ -262,7 +256,7 @@ class AIController:
         current_chat = self.app_state.get_current_chat()
         if not current_chat: return
 
-        current_chat["messages"].append({"role": "user", "content": user_text, "type": "text"})
+        self.app_state.append_chat_message(current_chat["id"], {"role": "user", "content": user_text, "type": "text"})
         from views.ai_view import _create_chat_message_control
         cs = self.page.theme.color_scheme if self.page.theme else None
         self.main.ai_chat_messages_list.controls.append(_create_chat_message_control(user_text, "user", cs))
@@ -299,11 +293,11 @@ class AIController:
         
         if response:
             ai_content = response
-            current_chat["messages"].append({"role": "ai", "content": ai_content, "type": "text"})
+            self.app_state.append_chat_message(current_chat["id"], {"role": "ai", "content": ai_content, "type": "text"})
             self.main.ai_chat_messages_list.controls.append(_create_chat_message_control(ai_content, "ai", cs))
         elif error:
             ai_content = f"Erro: {error}"
-            current_chat["messages"].append({"role": "system", "content": ai_content, "type": "text"})
+            self.app_state.append_chat_message(current_chat["id"], {"role": "system", "content": ai_content, "type": "text"})
             self.main.ai_chat_messages_list.controls.append(_create_chat_message_control(ai_content, "system", cs))
 
         persistence.save_state(self.app_state)
@@ -316,21 +310,21 @@ class AIController:
         self.page.go(f"/ai/chat/{chat_id}")
 
     def handle_ai_enabled_change(self, e):
-        self.app_state.ai_settings["enabled"] = e.control.value
+        self.app_state.set_ai_setting("enabled", e.control.value)
         persistence.save_state(self.app_state)
         self.main.view.rebuild_drawer()
         self.main.navigation.route_change_handler(ft.RouteChangeEvent(self.page.route))
         self.page.open(ft.SnackBar(ft.Text(f"IA Global {'Habilitada' if e.control.value else 'Desabilitada'}.")))
 
     def handle_ai_suggestions_change(self, e):
-        self.app_state.ai_settings["suggestions_on_dashboard"] = e.control.value
+        self.app_state.set_ai_setting("suggestions_on_dashboard", e.control.value)
         persistence.save_state(self.app_state)
         self.page.open(ft.SnackBar(ft.Text(f"Sugestões no Dashboard {'Habilitadas' if e.control.value else 'Desabilitadas'}.")))
 
     def start_new_chat(self, e=None, title: str | None = None, initial_messages: list | None = None):
         new_chat_id = str(uuid.uuid4())
         new_chat = { "id": new_chat_id, "title": title or "Nova Conversa", "timestamp": datetime.now().isoformat(), "messages": initial_messages or [] }
-        self.app_state.chat_history.insert(0, new_chat)
+        self.app_state.add_chat(new_chat)
         self.app_state.current_chat_id = new_chat_id
         self.app_state.active_file_in_chat = None
         persistence.save_state(self.app_state)
@@ -382,12 +376,9 @@ class AIController:
         for name, results in sorted_indices:
             if results:
                 parts.append(f"\n### {name}\n")
-                try:
-                    recent_results = sorted(results, key=lambda x: datetime.strptime(f"{x.get('Data','1/1/1900')} {x.get('Hora','00:00')}", "%d/%m/%Y %H:%M"), reverse=True)[:5]
-                except (ValueError, KeyError):
-                    recent_results = results[-5:]
+                recent_results = self.app_state.latest_calculations(name, 5)
                 for result in recent_results:
-                    parts.append(f"- **{result.get('Resultado', 'N/A')}** (Data: {result.get('Data', 'N/A')})\n")
+                    parts.append(f"- **{helpers.format_result(result.get('valor'), result.get('unidade', ''), decimals=4)}** (Data: {result.get('Data', 'N/A')})\n")
         return "".join(parts)
 
     def _handle_suggestion_flow(self, text_control, loading_control, continue_button, prompt_instruction, data_context):
@@ -1,8 +1,17 @@
 import flet as ft
 import uuid
+from bisect import bisect_left
 from datetime import datetime
 from models import persistence
-from views import animal_detail_view
+from utils.dates import is_valid_date
+from utils.helpers import refresh_if_mounted
+from views import animal_detail_view, herd_list_view
+
+ANIMAL_EVENTS = ("animal_add", "animal_add_many", "animal_update", "animal_delete", "reset")
+DETAIL_HISTORY_KEYS = {
+    "pesagens": "historico_pesagens", "vacinas": "historico_vacinacao",
+    "ocorrencias": "historico_doencas", "reproducao": "historico_reproducao",
+}
 
 class AnimalController:
     def __init__(self, main_controller):
@@ -16,6 +25,77 @@ class AnimalController:
         
         self.detail_content_area = ft.Container(expand=True)
         self.current_animal_id = None
+        self.current_detail_key = None
+        self.history_list_column = None
+        self.history_cards = {}
+
+        # Cards exibidos (id -> (campos mostrados, card)), suas chaves de ordem (brinco, id) na
+        # ordem da lista e o filtro atual, para trocar só o card do animal alterado.
+        self._herd_items = {}
+        self._herd_keys = []
+        self._herd_query = ""
+        self._herd_placeholder = False
+        self._unsubscribe_herd_list = None
+
+        self.app_state.subscribe(self._handle_animal_changed, kinds=ANIMAL_EVENTS)
+
+    def _handle_animal_changed(self, event):
+        if event.kind == "reset" or event.kind == "batch" and "reset" in event.data["kinds"] \
+                or self.current_animal_id in event.animal_ids:
+            self._refresh_detail()
+
+    def attach_herd_list(self):
+        """Liga a lista do rebanho aos eventos enquanto /herd está na tela e a sincroniza com o estado atual."""
+        if self._unsubscribe_herd_list is None:
+            self._unsubscribe_herd_list = self.app_state.subscribe(self._handle_herd_list_changed, kinds=ANIMAL_EVENTS)
+        self.update_herd_list(self._herd_query)
+
+    def detach_herd_list(self):
+        """Desliga a lista ao sair de /herd; attach_herd_list reaproveita os cards que não mudaram."""
+        if self._unsubscribe_herd_list is not None:
+            self._unsubscribe_herd_list()
+            self._unsubscribe_herd_list = None
+
+    def _handle_herd_list_changed(self, event):
+        if event.kind in ("reset", "batch", "animal_add_many") or self._herd_placeholder or not self.app_state.herd:
+            self.update_herd_list(self._herd_query)
+        else:
+            for animal_id in event.animal_ids:
+                self._patch_herd_card(animal_id)
+
+    def _patch_herd_card(self, animal_id: str):
+        """Remove, troca ou insere (na ordem do brinco) só o card de `animal_id`."""
+        if not self.herd_list_view: return
+        animal, _ = self.app_state.get_animal_by_id(animal_id)
+        visible = animal is not None and self.app_state.herd_index.matches(animal_id, self._herd_query)
+        fields = herd_list_view.card_fields(animal) if visible else None
+        shown = self._herd_items.get(animal_id)
+        if shown is not None and shown[0] == fields:
+            return
+
+        controls = self.herd_list_view.controls
+        if shown is not None:
+            position = bisect_left(self._herd_keys, (shown[0][0] or "", animal_id))
+            del self._herd_keys[position], controls[position]
+            del self._herd_items[animal_id]
+        if visible:
+            key = (fields[0] or "", animal_id)
+            position = bisect_left(self._herd_keys, key)
+            card = herd_list_view.create_animal_list_item(self.main, animal)
+            self._herd_keys.insert(position, key)
+            controls.insert(position, card)
+            self._herd_items[animal_id] = (fields, card)
+        refresh_if_mounted(self.herd_list_view)
+
+    def _refresh_detail(self):
+        """Atualiza a aba aberta da ficha; nas abas de histórico só os cards alterados são recriados."""
+        history_key = DETAIL_HISTORY_KEYS.get(self.current_detail_key)
+        animal_data, _ = self.app_state.get_animal_by_id(self.current_animal_id)
+        if history_key and animal_data and self.history_list_column is not None:
+            animal_detail_view.fill_history_list(self.main, animal_data, history_key)
+            refresh_if_mounted(self.history_list_column)
+        elif self.current_detail_key:
+            self.update_detail_content(self.current_detail_key)
 
     def handle_nav_bar_change(self, e):
         """Troca o conteúdo da página de detalhes com base no item da nav bar clicado."""
@@ -28,9 +108,13 @@ class AnimalController:
             self.update_detail_content("vacinas")
         elif selected_index == 3:
             self.update_detail_content("ocorrencias")
+        elif selected_index == 4:
+            self.update_detail_content("reproducao")
 
     def update_detail_content(self, content_key: str):
         """Busca o animal e atualiza a área de conteúdo da view."""
+        self.current_detail_key = content_key
+        self.history_list_column = None
         animal_data, _ = self.app_state.get_animal_by_id(self.current_animal_id)
         if not animal_data:
             self.detail_content_area.content = ft.Text("Animal não encontrado.")
@@ -43,9 +127,10 @@ class AnimalController:
                 self.detail_content_area.content = animal_detail_view._build_vacinas_section(self.main, animal_data)
             elif content_key == "ocorrencias":
                 self.detail_content_area.content = animal_detail_view._build_doencas_section(self.main, animal_data)
-        
-        if self.page:
-            self.page.update()
+            elif content_key == "reproducao":
+                self.detail_content_area.content = animal_detail_view._build_reproducao_section(self.main, animal_data)
+
+        refresh_if_mounted(self.detail_content_area)
 
     def get_new_animal_template(self):
         return {
@@ -62,6 +147,7 @@ class AnimalController:
             "historico_pesagens": [],
             "historico_vacinacao": [],
             "historico_doencas": [],
+            "historico_reproducao": [],
         }
 
     def handle_save_animal(self, animal_id: str | None):
@@ -98,6 +184,14 @@ class AnimalController:
         animal, _ = self.app_state.get_animal_by_id(animal_id)
         if not animal: return
 
+        date_field = self.history_form_fields.get("data")
+        if date_field is not None:
+            record_data["data"] = (record_data.get("data") or "").strip() or datetime.now().strftime("%d/%m/%Y")
+            date_field.error_text = None if is_valid_date(record_data["data"]) else "Use DD/MM/AAAA."
+            if date_field.error_text:
+                date_field.update()
+                return
+
         if record_id:
             history_list = animal.get(history_key, [])
             for i, rec in enumerate(history_list):
@@ -107,14 +201,14 @@ class AnimalController:
                     break
         else:
             record_data["id"] = str(uuid.uuid4())
-            record_data["data"] = datetime.now().strftime("%d/%m/%Y")
-            animal[history_key].insert(0, record_data)
+            record_data.setdefault("data", datetime.now().strftime("%d/%m/%Y"))
+            animal.setdefault(history_key, []).insert(0, record_data)
             msg = "Registro adicionado com sucesso!"
 
         self.app_state.update_animal_by_id(animal_id, animal)
         persistence.save_state(self.app_state)
         
-        self.page.go(f"/animal/view/{animal_id}")
+        self.main.navigation.pop_to(f"/animal/view/{animal_id}")
         self.page.open(ft.SnackBar(ft.Text(msg)))
 
     def handle_delete_history_record(self, animal_id: str, history_key: str, record_id: str):
@@ -127,31 +221,27 @@ class AnimalController:
         self.app_state.update_animal_by_id(animal_id, animal)
         persistence.save_state(self.app_state)
 
-        self.page.go(f"/animal/view/{animal_id}")
+        self.main.navigation.pop_to(f"/animal/view/{animal_id}")
         self.page.open(ft.SnackBar(ft.Text("Registro excluído.")))
 
     def update_herd_list(self, query: str = ""):
         if not self.herd_list_view: return
-        from views import herd_list_view
 
-        query = query.lower().strip()
-        
-        filtered_herd = sorted(
-            [
-                animal for animal in self.app_state.herd 
-                if not query or 
-                query in animal.get("brinco_interno", "").lower() or
-                query in animal.get("nome", "").lower() or
-                query in animal.get("lote_atual", "").lower()
-            ],
-            key=lambda x: x.get("brinco_interno", "")
-        )
-
-        self.herd_list_view.controls = [
-            herd_list_view.create_animal_list_item(self.main, animal) 
-            for animal in filtered_herd
-        ]
-        if not filtered_herd and not self.app_state.herd:
+        self._herd_query = query
+        items, keys = {}, []
+        for animal_id in self.app_state.herd_index.search(query):
+            animal, _ = self.app_state.get_animal_by_id(animal_id)
+            fields = herd_list_view.card_fields(animal)
+            shown = self._herd_items.get(animal_id)
+            card = shown[1] if shown is not None and shown[0] == fields else herd_list_view.create_animal_list_item(self.main, animal)
+            items[animal_id] = (fields, card)
+            keys.append((fields[0] or "", animal_id))
+        self._herd_items, self._herd_keys = items, keys
+
+        # Cards reaproveitados são os mesmos objetos, então o Flet só envia os que foram recriados.
+        self.herd_list_view.controls = [card for _, card in items.values()]
+        self._herd_placeholder = not items and not self.app_state.herd
+        if self._herd_placeholder:
              self.herd_list_view.controls.append(
                 ft.Column(
                     [
@@ -166,8 +256,7 @@ class AnimalController:
                 )
             )
 
-        if self.herd_list_view.page:
-            self.herd_list_view.update()
+        refresh_if_mounted(self.herd_list_view)
 
     def handle_filter_herd(self, e):
         self.update_herd_list(e.control.value)
\ No newline at end of file
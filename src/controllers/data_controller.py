@@ -1,8 +1,14 @@
 import flet as ft
+import os
+import threading
 from datetime import datetime
-from models import persistence, export_manager
+from functools import partial
+from models import persistence, export_manager, recompute, tabular_io
+import numpy as np
 import pandas as pd
 import uuid
+from utils import helpers
+from utils.dates import parse_date_array, parse_date_ordinal
 
 class DataController:
     def __init__(self, main_controller):
@@ -11,43 +17,90 @@ class DataController:
         self.app_state = main_controller.app_state
         self.file_manager = main_controller.file_manager_controller
         self.main.backup_checkboxes = {}
+        self.main.backup_incremental_switch = None
         self.main.spreadsheet_checkboxes = {}
         self.main.pdf_checkboxes = {}
+        self.main.tables_checkboxes = {}
+        self.main.tables_format_group = None
+        self.main.tables_include_herd_checkbox = None
+        self.main.recompute_progress_bar = None
+        self.main.recompute_status_text = None
+        self.main.recompute_button = None
+        self.main.pdf_progress_bar = None
+        self.main.pdf_status_text = None
+        self.main.pdf_cancel_button = None
+        self.main.pdf_cancel_event = None
 
     def import_data_from_dataframe(self, df: pd.DataFrame) -> tuple[int, str]:
+        return self.import_data_from_frames([df])
+
+    def import_data_from_frames(self, frames) -> tuple[int, str]:
+        """Importa blocos de linhas da planilha (ex.: SpreadsheetReader.iter_frames) e grava uma vez no fim."""
         required_columns = ["Nome do Índice", "Índice (Valor e Unidade)", "Data", "Hora"]
-        if not all(col in df.columns for col in required_columns):
-            msg = f"A planilha não contém as colunas necessárias: {', '.join(required_columns)}."
-            return 0, msg
+        items_added = duplicates = invalid_rows = 0
+        for df in frames:
+            if not all(col in df.columns for col in required_columns):
+                msg = f"A planilha não contém as colunas necessárias: {', '.join(required_columns)}."
+                return 0, msg
+            added, chunk_duplicates, chunk_invalid = self._import_frame(df.dropna(subset=required_columns))
+            items_added += added
+            duplicates += chunk_duplicates
+            invalid_rows += chunk_invalid
 
-        items_added = 0
-        df = df.dropna(subset=required_columns)
-
-        for _, row in df.iterrows():
-            try:
-                index_name = row["Nome do Índice"]
-                
-                new_calc = {
-                    "id": f"imported_{uuid.uuid4()}",
-                    "Resultado": row["Índice (Valor e Unidade)"],
-                    "Data": row["Data"],
-                    "Hora": row["Hora"],
-                    "inputs": [],
-                }
-                
-                if index_name not in self.app_state.calculated_indices:
-                    self.app_state.calculated_indices[index_name] = []
-                
-                self.app_state.calculated_indices[index_name].append(new_calc)
-                items_added += 1
-            except Exception:
-                continue
-        
+        skipped = []
+        if duplicates:
+            skipped.append(f"{duplicates} duplicado(s)")
+        if invalid_rows:
+            skipped.append(f"{invalid_rows} com data/hora inválida")
+        detail = f" Ignorado(s): {', '.join(skipped)}." if skipped else ""
         if items_added > 0:
             persistence.save_state(self.app_state)
-            return items_added, f"{items_added} registro(s) importado(s) com sucesso da planilha."
+            return items_added, f"{items_added} registro(s) importado(s) com sucesso da planilha.{detail}"
         else:
-            return 0, "Nenhum registro válido encontrado para importar na planilha."
+            return 0, f"Nenhum registro válido encontrado para importar na planilha.{detail}"
+
+    def _import_frame(self, df: pd.DataFrame) -> tuple[int, int, int]:
+        """Importa um bloco já sem linhas vazias; retorna (incluídos, duplicados, inválidos)."""
+        total_rows = len(df)
+        frame = _normalize_import_frame(df)
+        invalid_rows = total_rows - len(frame)
+        # Linhas repetidas na própria planilha contam uma vez só.
+        frame = frame.drop_duplicates(["index_name", "timestamp", "Resultado"])
+        duplicates = total_rows - invalid_rows - len(frame)
+
+        items_added = 0
+        batch_id = uuid.uuid4().hex
+        for index_name, group in frame.groupby("index_name", sort=False):
+            # Junção por conteúdo com o que já está salvo: mesmo momento e mesmo resultado.
+            existing = {
+                (calc.get("timestamp"), str(calc.get("Resultado", "")).strip())
+                for calc in self.app_state.calculated_indices.get(index_name, [])
+            }
+            keys = zip(group["timestamp"].tolist(), group["Resultado"].tolist())
+            keep = [key not in existing for key in keys]
+            duplicates += len(keep) - sum(keep)
+            group = group[keep]
+            if group.empty:
+                continue
+            columns = zip(
+                group.index.tolist(), group["Resultado"].tolist(), group["valor"].tolist(), group["unidade"].tolist(),
+                group["Data"].tolist(), group["Hora"].tolist(), group["timestamp"].tolist(),
+            )
+            new_calcs = [
+                {
+                    "id": f"imported_{batch_id}_{row}",
+                    "Resultado": resultado,
+                    "valor": None if valor != valor else valor,
+                    "unidade": unidade,
+                    "Data": data,
+                    "Hora": hora,
+                    "timestamp": timestamp,
+                    "inputs": [],
+                }
+                for row, resultado, valor, unidade, data, hora, timestamp in columns
+            ]
+            items_added += self.app_state.add_calculations(index_name, new_calcs)
+        return items_added, duplicates, invalid_rows
 
     def handle_delete_all_data_confirmed(self, e):
         self.app_state.reset()
@@ -55,26 +108,71 @@ class DataController:
         self.page.open(ft.SnackBar(ft.Text("Todos os dados foram apagados.")))
         self.page.go("/dashboard")
 
+    def handle_recompute_click(self, e):
+        self.main.recompute_button.disabled = True
+        self.main.recompute_progress_bar.visible = True
+        self.main.recompute_progress_bar.value = 0
+        self.main.recompute_status_text.value = "Preparando..."
+        self.page.update()
+        self.page.run_thread(self._run_recompute, recompute.snapshot_indices(self.app_state))
+
+    def _run_recompute(self, snapshot: dict):
+        progress_bar, status_text = self.main.recompute_progress_bar, self.main.recompute_status_text
+
+        def report(done, total):
+            progress_bar.value = done / total if total else 1
+            status_text.value = f"{done} de {total} cálculo(s) processado(s)..."
+            helpers.refresh_if_mounted(progress_bar)
+            helpers.refresh_if_mounted(status_text)
+
+        try:
+            summary = recompute.recompute_all(
+                self.app_state, progress=report, calculator=self.main.calculator, snapshot=snapshot
+            )
+        except Exception as e:
+            print(f"Erro ao recalcular índices: {e}")
+            status_text.value = f"Erro ao recalcular: {e}"
+        else:
+            if summary["alterados"]:
+                persistence.save_state(self.app_state)
+            status_text.value = (
+                f"{summary['alterados']} de {summary['total']} cálculo(s) atualizado(s). "
+                f"{summary['erros']} com entradas inválidas; {summary['sem_entradas']} sem dados de entrada (mantidos)."
+            )
+        progress_bar.value = 1
+        self.main.recompute_button.disabled = False
+        self.page.update()
+
     def handle_create_backup_click(self, e):
         selected_names = [name for name, cb in self.main.backup_checkboxes.items() if cb.value]
         if not selected_names:
             self.page.open(ft.SnackBar(ft.Text("Nenhum índice selecionado."), bgcolor=ft.Colors.AMBER))
             return
 
-        backup_string = export_manager.backup_to_json_string(self.app_state.calculated_indices, selected_names)
-        self.file_manager.data_to_save = backup_string
-        self.file_manager.fm_initial_filename = f"bovicheck_backup_{datetime.now().strftime('%Y%m%d')}.json"
+        incremental = bool(self.main.backup_incremental_switch and self.main.backup_incremental_switch.value)
+        kind = "backup_incremental" if incremental else "backup"
+        # O manifesto só é atualizado depois que o arquivo foi gravado no caminho escolhido.
+        self.file_manager.data_to_save = partial(self._write_backup, selected_names, incremental)
+        self.file_manager.save_in_background = None
+        self.file_manager.fm_initial_filename = f"bovicheck_{kind}_{datetime.now().strftime('%Y%m%d_%H%M')}.json"
         self.page.go("/file_manager/save_data")
 
+    def _write_backup(self, selected_names, incremental, full_path):
+        previous = persistence.load_backup_manifest() if incremental else None
+        manifest = export_manager.write_backup(self.app_state.calculated_indices, selected_names, full_path, previous)
+        if not persistence.save_backup_manifest(manifest):
+            raise OSError("backup gravado, mas o manifesto para o próximo incremental não pôde ser salvo")
+
     def handle_export_spreadsheet_click(self, e):
         selected_names = [name for name, cb in self.main.spreadsheet_checkboxes.items() if cb.value]
         if not selected_names:
             self.page.open(ft.SnackBar(ft.Text("Nenhum índice selecionado."), bgcolor=ft.Colors.AMBER))
             return
 
-        excel_bytes = export_manager.generate_spreadsheet_bytes(self.app_state.calculated_indices, selected_names)
-        if excel_bytes:
-            self.file_manager.data_to_save = excel_bytes
+        if export_manager.OPENPYXL_AVAILABLE:
+            # A planilha é gravada direto no caminho escolhido, sem passar por um buffer em memória.
+            self.file_manager.data_to_save = partial(export_manager.write_spreadsheet, self.app_state.calculated_indices, selected_names)
+            self.file_manager.save_in_background = None
             self.file_manager.fm_initial_filename = f"bovicheck_planilha_{datetime.now().strftime('%Y%m%d')}.xlsx"
             self.page.go("/file_manager/save_data")
         else:
@@ -85,19 +183,118 @@ class DataController:
         if not selected_names:
             self.page.open(ft.SnackBar(ft.Text("Nenhum índice selecionado."), bgcolor=ft.Colors.AMBER))
             return
+        if not export_manager.FPDF_AVAILABLE:
+            self.page.open(ft.SnackBar(ft.Text("Erro ao gerar PDF. 'fpdf2' está instalado?"), bgcolor=ft.Colors.ERROR))
+            return
 
-        pdf_bytes = export_manager.generate_pdf_bytes(self.app_state.calculated_indices, selected_names)
-        if pdf_bytes:
-            self.file_manager.data_to_save = pdf_bytes
-            self.file_manager.fm_initial_filename = f"bovicheck_relatorio_{datetime.now().strftime('%Y%m%d')}.pdf"
-            self.page.go("/file_manager/save_data")
+        # Cópia das listas: o relatório sai como estava no clique, mesmo com cálculos novos durante a geração.
+        snapshot = {name: list(self.app_state.calculated_indices.get(name, [])) for name in selected_names}
+        self.file_manager.data_to_save = None
+        self.file_manager.save_in_background = partial(self._start_pdf_export, snapshot, selected_names)
+        self.file_manager.fm_initial_filename = f"bovicheck_relatorio_{datetime.now().strftime('%Y%m%d')}.pdf"
+        self.page.go("/file_manager/save_data")
+
+    def _start_pdf_export(self, indices_data, selected_names, full_path):
+        self.main.pdf_cancel_event = threading.Event()
+        self.page.go("/settings/export_pdf/progress")
+        self.page.run_thread(self._run_pdf_export, indices_data, selected_names, full_path, self.main.pdf_cancel_event)
+
+    def _run_pdf_export(self, indices_data, selected_names, full_path, cancel_event):
+        progress_bar, status_text = self.main.pdf_progress_bar, self.main.pdf_status_text
+
+        def report(done, total):
+            progress_bar.value = done / total if total else 1
+            status_text.value = f"{done} de {total} linha(s) gerada(s)..."
+            helpers.refresh_if_mounted(progress_bar)
+            helpers.refresh_if_mounted(status_text)
+
+        # Grava num arquivo temporário ao lado do destino: cancelar ou falhar não deixa PDF pela metade.
+        partial_path = full_path + ".part"
+        try:
+            finished = export_manager.write_pdf(indices_data, selected_names, partial_path, progress=report, cancel=cancel_event)
+            if finished:
+                os.replace(partial_path, full_path)
+        except Exception as ex:
+            print(f"Erro ao gerar PDF: {ex}")
+            finished = False
+            message, color = f"Erro ao gerar PDF: {ex}", ft.Colors.ERROR
         else:
-            self.page.open(ft.SnackBar(ft.Text("Erro ao gerar PDF. 'fpdf2' está instalado?"), bgcolor=ft.Colors.ERROR))
+            if finished:
+                message, color = f"Arquivo salvo com sucesso em: {full_path}", ft.Colors.GREEN_700
+            else:
+                message, color = "Geração do PDF cancelada.", ft.Colors.AMBER
+        if not finished and os.path.exists(partial_path):
+            os.remove(partial_path)
+
+        status_text.value = message
+        if finished:
+            progress_bar.value = 1
+        self.main.pdf_cancel_button.text = "Concluir"
+        self.main.pdf_cancel_button.icon = ft.Icons.CHECK_ROUNDED
+        self.main.pdf_cancel_button.disabled = False
+        self.main.pdf_cancel_event = None
+        self.page.open(ft.SnackBar(ft.Text(message), bgcolor=color))
+        self.page.update()
+
+    def handle_cancel_pdf_export_click(self, e):
+        if self.main.pdf_cancel_event is not None:
+            self.main.pdf_cancel_event.set()
+            self.main.pdf_status_text.value = "Cancelando..."
+            self.main.pdf_cancel_button.disabled = True
+            self.page.update()
+        else:
+            self.page.go("/dashboard")
+
+    def handle_export_tables_click(self, e):
+        selected_names = [name for name, cb in self.main.tables_checkboxes.items() if cb.value]
+        include_herd = bool(self.main.tables_include_herd_checkbox.value)
+        if not selected_names and not include_herd:
+            self.page.open(ft.SnackBar(ft.Text("Nenhum dado selecionado."), bgcolor=ft.Colors.AMBER))
+            return
+
+        fmt = self.main.tables_format_group.value or "csv"
+        # As tabelas são gravadas bloco a bloco numa pasta com o nome escolhido no gerenciador de arquivos.
+        self.file_manager.data_to_save = partial(
+            tabular_io.export_tables, self.app_state.calculated_indices, selected_names, self.app_state.herd,
+            fmt=fmt, include_herd=include_herd,
+        )
+        self.file_manager.save_in_background = None
+        self.file_manager.fm_initial_filename = f"bovicheck_tabelas_{fmt}_{datetime.now().strftime('%Y%m%d')}"
+        self.page.go("/file_manager/save_data")
+
+    def handle_select_tables_files_click(self, e):
+        self.main.view.tables_file_picker.pick_files(
+            dialog_title="Selecionar Tabelas (.csv ou .parquet)",
+            allow_multiple=True,
+            allowed_extensions=["csv", "parquet"]
+        )
+
+    def handle_tables_files_picked(self, e: ft.FilePickerResultEvent):
+        if not e.files:
+            self.page.open(ft.SnackBar(ft.Text("Importação cancelada.")))
+            return
+
+        try:
+            summary = tabular_io.import_tables(self.app_state, [f.path for f in e.files])
+        except Exception as ex:
+            self.page.open(ft.SnackBar(ft.Text(f"Erro ao ler tabelas: {ex}"), bgcolor=ft.Colors.ERROR))
+            return
+
+        if summary["calculos"] or summary["animais"] or summary["registros"]:
+            persistence.save_state(self.app_state)
+        message = (
+            f"Importação concluída: {summary['calculos']} cálculo(s), {summary['animais']} animal(is) "
+            f"e {summary['registros']} registro(s) de histórico."
+        )
+        if summary["ignorados"]:
+            message += f" Arquivos não reconhecidos: {', '.join(summary['ignorados'])}."
+        self.page.open(ft.SnackBar(ft.Text(message), bgcolor=ft.Colors.GREEN_700))
+        self.page.go("/dashboard")
 
     def handle_select_restore_file_click(self, e):
         self.main.view.restore_file_picker.pick_files(
-            dialog_title="Selecionar Arquivo de Backup (.json)",
-            allow_multiple=False,
+            dialog_title="Selecionar Backup (.json) ou Cadeia de Backups",
+            allow_multiple=True,
             allowed_extensions=["json"]
         )
 
@@ -107,21 +304,16 @@ class DataController:
             return
 
         try:
-            with open(e.files[0].path, "r", encoding='utf-8') as f:
-                json_string = f.read()
-            success, message, restored_data = export_manager.restore_from_json_string(json_string)
+            json_strings = []
+            for file in e.files:
+                with open(file.path, "r", encoding='utf-8') as f:
+                    json_strings.append(f.read())
+            success, message, restored_data = export_manager.restore_from_json_strings(json_strings)
 
             if success:
                 items_added = 0
                 for index_name, restored_calcs in restored_data.items():
-                    if index_name not in self.app_state.calculated_indices:
-                        self.app_state.calculated_indices[index_name] = []
-                    existing_ids = {calc.get("id") for calc in self.app_state.calculated_indices[index_name]}
-                    for calc_to_restore in restored_calcs:
-                        if calc_to_restore.get("id") not in existing_ids:
-                            self.app_state.calculated_indices[index_name].append(calc_to_restore)
-                            existing_ids.add(calc_to_restore.get("id"))
-                            items_added += 1
+                    items_added += self.app_state.add_calculations(index_name, restored_calcs)
                 persistence.save_state(self.app_state)
                 final_message = f"Restauração concluída. {items_added} novo(s) registro(s) adicionado(s)."
                 self.page.open(ft.SnackBar(ft.Text(final_message), bgcolor=ft.Colors.GREEN_700))
@@ -130,4 +322,64 @@ class DataController:
                 self.page.open(ft.SnackBar(ft.Text(message), bgcolor=ft.Colors.ERROR))
 
         except Exception as ex:
-            self.page.open(ft.SnackBar(ft.Text(f"Erro ao ler arquivo: {ex}"), bgcolor=ft.Colors.ERROR))
\ No newline at end of file
+            self.page.open(ft.SnackBar(ft.Text(f"Erro ao ler arquivo: {ex}"), bgcolor=ft.Colors.ERROR))
+
+def _normalize_import_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas normalizadas da planilha (nome, resultado, valor, unidade, Data, Hora, timestamp), só com linhas de data/hora válidas."""
+    resultado = df["Índice (Valor e Unidade)"].astype(str).str.strip()
+    # Mesma separação de helpers.parse_result_string: número até o primeiro espaço, unidade no resto.
+    numero = resultado.str.replace(r" .*$", "", regex=True).str.replace(",", ".", regex=False)
+    valor = pd.to_numeric(numero, errors="coerce")
+    unidade = resultado.str.replace(r"^[^ ]*", "", regex=True).str.strip()
+    if "Valor" in df.columns:
+        informed = pd.to_numeric(df["Valor"], errors="coerce")
+        valor = informed.where(informed.notna(), valor)
+
+    days, bad_dates = _normalize_dates(df["Data"])
+    minutes, hora, bad_times = _normalize_times(df["Hora"])
+    ok = ~(bad_dates | bad_times)
+
+    data = pd.Series(np.datetime_as_string(days.astype("datetime64[D]"), unit="D"), index=df.index)
+    frame = pd.DataFrame({
+        "index_name": df["Nome do Índice"].astype(str).str.strip(),
+        "Resultado": resultado,
+        "valor": valor.astype(float),
+        "unidade": unidade,
+        "Data": data.str.slice(8, 10) + "/" + data.str.slice(5, 7) + "/" + data.str.slice(0, 4),
+        "Hora": hora,
+        # Minutos desde o início do calendário, como helpers.calc_timestamp (1970-01-01 é o dia 719163).
+        "timestamp": (days + 719163) * 1440 + minutes,
+    }, index=df.index)
+    return frame[ok]
+
+def _as_text(column: pd.Series, fmt: str) -> pd.Series:
+    """Texto da coluna; células de data/hora vindas do Excel são formatadas com `fmt`."""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column.dt.strftime(fmt)
+    if pd.api.types.infer_dtype(column, skipna=True) == "string":
+        return column.astype(str)
+    is_temporal = column.map(lambda value: hasattr(value, "strftime"))
+    text = column.astype(str)
+    text[is_temporal] = column[is_temporal].map(lambda value: value.strftime(fmt))
+    return text
+
+def _normalize_dates(column: pd.Series):
+    """Dias desde 1970-01-01 e máscara das inválidas; só as fora de DD/MM/AAAA passam pelo parser solto."""
+    text = _as_text(column, "%d/%m/%Y")
+    dates, bad = parse_date_array(text.to_numpy(dtype=str))
+    days = np.where(bad, 0, dates.astype(np.int64))
+    for position in np.flatnonzero(bad):
+        ordinal = parse_date_ordinal(text.iat[position])
+        if ordinal is not None:
+            days[position], bad[position] = ordinal - 719163, False
+    return days, pd.Series(bad, index=column.index)
+
+def _normalize_times(column: pd.Series):
+    """Minutos do dia e texto 'HH:MM' de 'H:MM' / 'HH:MM' (segundos são ignorados), com a máscara das inválidas."""
+    text = _as_text(column, "%H:%M").str.strip()
+    text = text.where(text.str.slice(1, 2) != ":", "0" + text)
+    valid = text.str.match(r"\d{2}:\d{2}")
+    hours = text.str.slice(0, 2).where(valid, "0").astype(np.int64)
+    minutes = text.str.slice(3, 5).where(valid, "0").astype(np.int64)
+    bad = ~valid | (hours > 23) | (minutes > 59)
+    return hours * 60 + minutes, text.str.slice(0, 5), bad
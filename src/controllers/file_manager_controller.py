@@ -14,6 +14,7 @@ class FileManagerController:
         self.fm_filename_input = None
         self.fm_initial_filename = ""
         self.data_to_save = None
+        self.save_in_background = None
 
     def get_fm_display_path(self) -> str:
         max_len = 45
@@ -63,10 +64,19 @@ class FileManagerController:
             return
 
         full_path = os.path.join(self.fm_current_path, filename)
+        if self.save_in_background:
+            # Exportações demoradas rodam numa thread com tela de progresso própria, que avisa o resultado.
+            start, self.save_in_background, self.data_to_save = self.save_in_background, None, None
+            start(full_path)
+            return
         try:
-            mode = "wb" if isinstance(self.data_to_save, bytes) else "w"
-            with open(full_path, mode, encoding=None if mode == "wb" else "utf-8") as f:
-                f.write(self.data_to_save)
+            if callable(self.data_to_save):
+                # Exportações em streaming recebem o caminho e gravam o arquivo elas mesmas.
+                self.data_to_save(full_path)
+            else:
+                mode = "wb" if isinstance(self.data_to_save, bytes) else "w"
+                with open(full_path, mode, encoding=None if mode == "wb" else "utf-8") as f:
+                    f.write(self.data_to_save)
             self.page.open(ft.SnackBar(ft.Text(f"Arquivo salvo com sucesso em: {full_path}"), bgcolor=ft.Colors.GREEN_700))
             self.data_to_save = None
             self.page.go("/dashboard")
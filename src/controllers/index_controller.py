@@ -1,9 +1,14 @@
 import flet as ft
-import re
-from datetime import datetime
 from models import definitions, persistence
 from utils import helpers
-from views import history_view
+from utils.dates import parse_date
+from utils.helpers import is_mounted, refresh_if_mounted
+from views import history_view, dashboard_view
+
+def _parse_date_input(date_str):
+    return parse_date(date_str, strict=True) if date_str else None
+
+CALC_EVENTS = ("calc_add", "calc_add_many", "calc_update", "calc_delete", "index_delete", "calc_recompute")
 
 class IndexController:
     def __init__(self, main_controller):
@@ -19,6 +24,20 @@ class IndexController:
         self.main.history_start_date_input = None
         self.main.history_end_date_input = None
         self.main.history_chart_container = None
+        self.main.dashboard_summary_column = None
+        self.main.dashboard_cards = {}
+        self.main.history_index_name = None
+        self.main.herd_period_start_input = None
+        self.main.herd_period_end_input = None
+
+        self.app_state.subscribe(self._handle_calculations_changed, kinds=CALC_EVENTS)
+
+    def _handle_calculations_changed(self, event):
+        index_names = event.data["index_names"] if event.kind == "batch" else (event.data.get("index_name"),)
+        for index_name in index_names:
+            dashboard_view.update_index_card(self.main, index_name)
+            if index_name == self.main.history_index_name and is_mounted(self.main.history_chart_container):
+                self._refresh_history_chart(index_name)
 
     def get_all_indices(self):
         return definitions.INDICES
@@ -60,10 +79,33 @@ class IndexController:
 
             persistence.save_state(self.app_state)
             self.page.open(ft.SnackBar(ft.Text(msg)))
-            self.page.go(f"/index/{helpers.to_safe_route_param(index_data['Índice'])}/history")
+            self.main.navigation.pop_to(f"/index/{helpers.to_safe_route_param(index_data['Índice'])}/history")
         except (ValueError, NotImplementedError) as e:
             self.page.open(ft.SnackBar(ft.Text(f"Erro: {e}"), bgcolor=ft.Colors.ERROR_CONTAINER))
 
+    def handle_calculate_from_herd(self, index_name: str):
+        start_input, end_input = self.main.herd_period_start_input, self.main.herd_period_end_input
+        start_date = _parse_date_input(start_input.value.strip())
+        end_date = _parse_date_input(end_input.value.strip())
+        start_input.error_text = None if start_date else "Inválida"
+        end_input.error_text = None if end_date else "Inválida"
+        if start_date and end_date and start_date > end_date:
+            start_input.error_text = "Inicial > Final"
+        if start_input.error_text or end_input.error_text:
+            self.page.update(); return
+
+        result = self.app_state.reproduction.window_indices(self.calculator, start_date, end_date)[index_name]
+        if result["valor"] is None:
+            self.page.open(ft.SnackBar(ft.Text("Erro: Sem eventos reprodutivos suficientes no período."), bgcolor=ft.Colors.ERROR_CONTAINER))
+            return
+        entry = self.calculator.make_entry(result["valor"], result["unidade"], result["inputs"])
+        entry["periodo"] = f"{start_input.value.strip()} a {end_input.value.strip()}"
+        entry["amostras"] = result["amostras"]
+        self.app_state.add_new_calculation(index_name, entry)
+        persistence.save_state(self.app_state)
+        self.page.open(ft.SnackBar(ft.Text(f"Índice '{index_name}' calculado pelo rebanho ({result['amostras']} registro(s)).")))
+        self.main.navigation.pop_to(f"/index/{helpers.to_safe_route_param(index_name)}/history")
+
     def handle_history_item_selected(self, calc_data: dict, index_name: str):
         if not self.main.history_details_container: return
         from views.history_view import build_details_card
@@ -73,33 +115,23 @@ class IndexController:
         self.main.history_details_container.update()
 
     def handle_delete_index_confirmed(self, index_name: str):
-        if index_name in self.app_state.calculated_indices:
-            del self.app_state.calculated_indices[index_name]
+        if self.app_state.delete_index_history(index_name):
             persistence.save_state(self.app_state)
             self.page.open(ft.SnackBar(ft.Text(f"Histórico do índice '{index_name}' foi apagado.")))
         self.page.go("/dashboard")
 
     def handle_delete_single_calc_confirmed(self, index_name: str, calc_id: str):
-        calc, index = self.app_state.get_calculation_by_id(index_name, calc_id)
-        if calc is not None:
-            self.app_state.calculated_indices[index_name].pop(index)
-            if not self.app_state.calculated_indices[index_name]:
-                del self.app_state.calculated_indices[index_name]
+        if self.app_state.delete_calculation_by_id(index_name, calc_id):
             persistence.save_state(self.app_state)
             self.page.open(ft.SnackBar(ft.Text("Medição excluída com sucesso.")))
-        self.page.go(f"/index/{helpers.to_safe_route_param(index_name)}/history")
+        self.main.navigation.pop_to(f"/index/{helpers.to_safe_route_param(index_name)}/history")
     
     def _validate_and_filter_history(self, index_name):
         start_date_str = self.main.history_start_date_input.value if self.main.history_start_date_input else ""
         end_date_str = self.main.history_end_date_input.value if self.main.history_end_date_input else ""
 
-        def _validate(date_str):
-            if not date_str or not re.match(r"^\d{2}/\d{2}/\d{4}$", date_str): return None
-            try: return datetime.strptime(date_str, "%d/%m/%Y")
-            except ValueError: return None
-        
-        start_date = _validate(start_date_str)
-        end_date = _validate(end_date_str)
+        start_date = _parse_date_input(start_date_str)
+        end_date = _parse_date_input(end_date_str)
 
         self.main.history_start_date_input.error_text = "Inválida" if start_date_str and not start_date else None
         self.main.history_end_date_input.error_text = "Inválida" if end_date_str and not end_date else None
@@ -113,15 +145,9 @@ class IndexController:
         if self.main.history_start_date_input.error_text or self.main.history_end_date_input.error_text:
             return None
 
-        all_calcs = self.app_state.calculated_indices.get(index_name, [])
         if not (start_date and end_date):
-            return all_calcs
-        
-        filtered = [
-            calc for calc in all_calcs
-            if start_date <= datetime.strptime(calc.get('Data', '01/01/1900'), "%d/%m/%Y") <= end_date
-        ]
-        return filtered
+            return self.app_state.calculated_indices.get(index_name, [])
+        return self.app_state.calculations_between(index_name, start_date, end_date)
 
     def handle_apply_date_filter(self, e, index_name: str):
         if not self.main.history_chart_container: return
@@ -129,15 +155,25 @@ class IndexController:
         filtered_calcs = self._validate_and_filter_history(index_name)
         
         if filtered_calcs is not None:
-            sorted_calcs = sorted(
-                filtered_calcs,
-                key=lambda x: datetime.strptime(f"{x.get('Data','')} {x.get('Hora','')}", "%d/%m/%Y %H:%M"),
-                reverse=True
-            )
+            sorted_calcs = filtered_calcs[::-1]
             new_chart = history_view._build_bar_chart(self.main, sorted_calcs, index_name)
             self.main.history_chart_container.content = new_chart
             self.main.history_chart_container.update()
 
+    def _refresh_history_chart(self, index_name: str):
+        """Redesenha só o gráfico do histórico aberto, mantendo o filtro de período se ele for válido."""
+        start_date = _parse_date_input(self.main.history_start_date_input.value if self.main.history_start_date_input else "")
+        end_date = _parse_date_input(self.main.history_end_date_input.value if self.main.history_end_date_input else "")
+        if start_date and end_date and start_date <= end_date:
+            calcs = self.app_state.calculations_between(index_name, start_date, end_date)[::-1]
+        else:
+            calcs = self.app_state.latest_calculations(index_name)
+        self.main.history_chart_container.content = history_view._build_bar_chart(self.main, calcs, index_name)
+        self.main.history_chart_container.update()
+        if self.main.history_details_container:
+            self.main.history_details_container.content = history_view.build_details_placeholder()
+            refresh_if_mounted(self.main.history_details_container)
+
     def handle_clear_date_filter(self, e, index_name: str):
         if self.main.history_start_date_input:
             self.main.history_start_date_input.value = ""
@@ -149,12 +185,7 @@ class IndexController:
             self.main.history_end_date_input.update()
 
         if not self.main.history_chart_container: return
-        all_calcs = self.app_state.calculated_indices.get(index_name, [])
-        sorted_calcs = sorted(
-            all_calcs,
-            key=lambda x: datetime.strptime(f"{x.get('Data','')} {x.get('Hora','')}", "%d/%m/%Y %H:%M"),
-            reverse=True
-        )
+        sorted_calcs = self.app_state.latest_calculations(index_name)
         new_chart = history_view._build_bar_chart(self.main, sorted_calcs, index_name)
         self.main.history_chart_container.content = new_chart
         self.main.history_chart_container.update()
@@ -1,7 +1,7 @@
 import flet as ft
 import os
 
-from models import app_state, persistence, calculator, definitions
+from models import app_state, persistence, calculator, definitions, herd_analytics
 from views import main_view
 from . import navigation
 from .theme_controller import ThemeController
@@ -15,20 +15,27 @@ class MainController:
     def __init__(self, page: ft.Page):
         self.page = page
         self.app_state = app_state.AppState()
-        persistence.load_state(self.app_state)
+        self.theme_controller = ThemeController(self)
+        persistence.load_state(self.app_state, on_settings_loaded=self.theme_controller.apply_initial_theme)
+        persistence.set_write_failure_handler(self._handle_write_failure)
 
         self.calculator = calculator.IndexCalculator()
+        # Criado antes dos controllers para invalidar o cache antes que as views se atualizem.
+        self.herd_analytics = herd_analytics.HerdAnalytics(self.app_state)
         self.view = main_view.MainView(self)
         self.navigation = navigation.Navigation(self)
 
-        self.theme_controller = ThemeController(self)
         self.index_controller = IndexController(self)
         self.ai_controller = AIController(self)
         self.file_manager_controller = FileManagerController(self)
         self.data_controller = DataController(self)
         self.animal_controller = AnimalController(self)
 
-        self.theme_controller.apply_initial_theme()
+    def _handle_write_failure(self):
+        self.page.open(ft.SnackBar(
+            ft.Text("Não foi possível salvar os dados (disco cheio ou sem permissão?). Nova tentativa na próxima alteração."),
+            bgcolor=ft.Colors.ERROR
+        ))
 
     def go_back(self, e=None):
         if len(self.page.views) > 1:
@@ -43,6 +50,7 @@ class MainController:
         if idx < len(routes):
             self.page.go(routes[idx])
         elif idx == len(routes):
+            persistence.flush()
             os._exit(0)
         self.page.update()
 
@@ -67,6 +75,9 @@ class MainController:
     def handle_calculate_click(self, index_data: dict, editing_id: str | None):
         self.index_controller.handle_calculate_click(index_data, editing_id)
 
+    def handle_calculate_from_herd(self, index_name: str):
+        self.index_controller.handle_calculate_from_herd(index_name)
+
     def handle_history_item_selected(self, calc_data: dict, index_name: str):
         self.index_controller.handle_history_item_selected(calc_data, index_name)
 
@@ -88,12 +99,30 @@ class MainController:
     def handle_delete_all_data_confirmed(self, e):
         self.data_controller.handle_delete_all_data_confirmed(e)
 
+    def handle_recompute_click(self, e):
+        self.data_controller.handle_recompute_click(e)
+
     def handle_create_backup_click(self, e):
         self.data_controller.handle_create_backup_click(e)
 
     def handle_export_spreadsheet_click(self, e):
         self.data_controller.handle_export_spreadsheet_click(e)
 
+    def handle_export_pdf_click(self, e):
+        self.data_controller.handle_export_pdf_click(e)
+
+    def handle_cancel_pdf_export_click(self, e):
+        self.data_controller.handle_cancel_pdf_export_click(e)
+
+    def handle_export_tables_click(self, e):
+        self.data_controller.handle_export_tables_click(e)
+
+    def handle_select_tables_files_click(self, e):
+        self.data_controller.handle_select_tables_files_click(e)
+
+    def handle_tables_files_picked(self, e: ft.FilePickerResultEvent):
+        self.data_controller.handle_tables_files_picked(e)
+
     def handle_select_restore_file_click(self, e):
         self.data_controller.handle_select_restore_file_click(e)
 
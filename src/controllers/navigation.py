@@ -1,11 +1,36 @@
 import flet as ft
 from utils import helpers
+from utils.helpers import is_mounted
 from models import definitions
 
+# Telas de primeiro nível cujo conteúdo é mantido entre visitas e atualizado pelos eventos do AppState.
+CACHED_ROUTES = ("/dashboard", "/herd")
+
 class Navigation:
     def __init__(self, controller):
         self.controller = controller
         self.page = controller.page
+        self._view_cache = {}
+        controller.app_state.subscribe(self._handle_state_change, kinds=("reset", "ai_settings"))
+
+    def _handle_state_change(self, event):
+        self._view_cache.clear()
+
+    def pop_to(self, route_str: str):
+        """Volta para a view de `route_str` se ela estiver na pilha; caso contrário navega normalmente."""
+        routes = [view.route for view in self.page.views]
+        if route_str in routes:
+            del self.page.views[routes.index(route_str) + 1:]
+        self.page.go(route_str)
+
+    def _is_live(self, route: ft.TemplateRoute) -> bool:
+        """Views que se mantêm atualizadas pelos eventos e podem ser reaproveitadas ao voltar para elas."""
+        if route.match("/animal/view/:animal_id"):
+            return route.animal_id == self.controller.animal_controller.current_animal_id
+        if route.match("/index/:name/history"):
+            name = helpers.from_safe_route_param(route.name)
+            return name == self.controller.history_index_name and is_mounted(self.controller.history_chart_container)
+        return False
 
     def route_change_handler(self, route_event: ft.RouteChangeEvent):
         route = ft.TemplateRoute(route_event.route)
@@ -19,6 +44,14 @@ class Navigation:
 
         is_top_level = route.route in ["/dashboard", "/herd", "/indices", "/ai/history", "/settings/general", "/about"]
 
+        if not is_top_level and self.page.views and self.page.views[-1].route == route.route:
+            if self._is_live(route):
+                self.sync_nav_drawer_to_route(route.route)
+                self.page.update()
+                return
+            # Mesma rota no topo (ex.: voltar da view seguinte): substitui em vez de empilhar outra cópia.
+            self.page.views.pop()
+
         current_chat = self.controller.app_state.get_current_chat()
         chat_title = current_chat['title'] if current_chat else "Chat com IA"
         app_bar_title = self.get_app_bar_title(route, chat_title)
@@ -46,6 +79,10 @@ class Navigation:
                     ft.NavigationBarDestination(icon=ft.Icons.MEDICAL_SERVICES_OUTLINED, selected_icon=ft.Icons.MEDICAL_SERVICES, label="Ocorrências"),
                 ]
             )
+        elif route.route in CACHED_ROUTES:
+            view_content = self._view_cache.get(route.route)
+            if view_content is None:
+                view_content = self._view_cache[route.route] = self.build_view_for_route(route)
         else:
             view_content = self.build_view_for_route(route)
 
@@ -60,6 +97,10 @@ class Navigation:
                 padding=0
             )
         )
+        if route.route == "/herd":
+            self.controller.animal_controller.attach_herd_list()
+        else:
+            self.controller.animal_controller.detach_herd_list()
         self.sync_nav_drawer_to_route(route.route)
         self.page.update()
 
@@ -84,6 +125,8 @@ class Navigation:
         
         if route.match("/herd"):
             return herd_list_view.build_herd_list_view(self.controller)
+        if route.match("/herd/gmd"):
+            return herd_list_view.build_lot_gmd_view(self.controller)
         if route.match("/animal/add"):
             return animal_detail_view._build_ficha_content(self.controller, None)
         if route.match("/animal/:animal_id/add/:history_key"):
@@ -128,12 +171,22 @@ class Navigation:
             return settings_view.build_theme_color_view(self.controller)
         if route.match("/settings/delete_all_data"):
             return dialogs_view.create_confirm_delete_all_data_view(self.controller)
+        if route.match("/settings/recompute"):
+            return settings_view.build_recompute_view(self.controller)
         if route.match("/settings/backup_indices"):
             return export_view.build_backup_indices_view(self.controller)
         if route.match("/settings/restore_indices"):
             return export_view.build_restore_indices_view(self.controller)
         if route.match("/settings/export_spreadsheet"):
             return export_view.build_export_spreadsheet_view(self.controller)
+        if route.match("/settings/export_pdf"):
+            return export_view.build_export_pdf_view(self.controller)
+        if route.match("/settings/export_pdf/progress"):
+            return export_view.build_pdf_progress_view(self.controller)
+        if route.match("/settings/export_tables"):
+            return export_view.build_export_tables_view(self.controller)
+        if route.match("/settings/import_tables"):
+            return export_view.build_import_tables_view(self.controller)
         if route.match("/file_manager/save_data"):
             return file_manager_view.build_file_manager_view(self.controller)
         if route.match("/about"):
@@ -152,11 +205,13 @@ class Navigation:
 
         if route.match("/dashboard"): return "Dashboard Principal"
         if route.match("/herd"): return "Gestão do Rebanho"
+        if route.match("/herd/gmd"): return "GMD por Lote"
         if route.match("/animal/add"): return "Adicionar Animal"
         if route.match("/animal/view/:animal_id"): return "Ficha do Animal"
         if route.match("/animal/:animal_id/add/historico_pesagens"): return "Registrar Pesagem"
         if route.match("/animal/:animal_id/add/historico_vacinacao"): return "Registrar Vacina"
         if route.match("/animal/:animal_id/add/historico_doencas"): return "Registrar Ocorrência"
+        if route.match("/animal/:animal_id/add/historico_reproducao"): return "Registrar Evento Reprodutivo"
         if route.match("/animal/:animal_id/edit/:history_key/:record_id"): return "Editar Registro"
         if route.match("/animal/:animal_id/delete_history/:history_key/:record_id"): return "Confirmar Exclusão"
         if route.match("/indices"): return "Índices Zootécnicos"
@@ -170,10 +225,15 @@ class Navigation:
         if route.match("/settings/backup_indices"): return "Backup de Dados"
         if route.match("/settings/restore_indices"): return "Restaurar Dados"
         if route.match("/settings/export_spreadsheet"): return "Exportar Planilha"
+        if route.match("/settings/export_pdf"): return "Exportar Relatório PDF"
+        if route.match("/settings/export_pdf/progress"): return "Gerando PDF"
+        if route.match("/settings/export_tables"): return "Exportar CSV/Parquet"
+        if route.match("/settings/import_tables"): return "Importar CSV/Parquet"
         if route.match("/settings/theme_mode"): return "Modo de Tema"
         if route.match("/settings/theme_color"): return "Cor do Tema"
         if route.match("/ai/settings"): return "Configurações de IA"
         if route.match("/settings/delete_all_data"): return "Apagar Dados"
+        if route.match("/settings/recompute"): return "Recalcular Índices"
 
         return "BoviCheck"
 
@@ -53,13 +53,13 @@ class ThemeController:
 
     def handle_theme_mode_change(self, mode: ft.ThemeMode):
         self.page.theme_mode = mode
-        self.app_state.theme_preference["theme_mode"] = mode
+        self.app_state.set_theme_preference("theme_mode", mode)
         persistence.save_state(self.app_state)
         self.page.update()
         self.main.go_back()
 
     def handle_theme_color_change(self, color_info: dict):
-        self.app_state.theme_preference["primary_color_name"] = color_info["value"]
+        self.app_state.set_theme_preference("primary_color_name", color_info["value"])
         self.apply_initial_theme()
         persistence.save_state(self.app_state)
         self.page.update()
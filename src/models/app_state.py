@@ -1,7 +1,81 @@
 import flet as ft
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 import os
+import threading
 import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from .herd_index import HerdIndex
+from .index_aggregates import IndexAggregates
+from .pedigree import PedigreeIndex
+from .reproduction import ReproductionIndex
+from .records import Animal, Calculation, ChatMessage
+from utils.helpers import calc_timestamp, parse_result_string
+
+SHARDS = ("settings", "indices", "herd", "chats")
+
+OP_SHARDS = {
+    "calc_add": "indices", "calc_add_many": "indices", "calc_update": "indices",
+    "calc_delete": "indices", "index_delete": "indices", "calc_recompute": "indices",
+    "animal_add": "herd", "animal_add_many": "herd", "animal_update": "herd", "animal_delete": "herd",
+    "chat_add": "chats", "chat_delete": "chats", "chat_rename": "chats", "chat_message": "chats",
+    "theme": "settings", "ai_settings": "settings",
+}
+
+def _calc_sort_key(calc) -> int:
+    timestamp = calc.get("timestamp")
+    return -1 if timestamp is None else timestamp
+
+def _ensure_timestamp(calc) -> bool:
+    if "timestamp" in calc:
+        return False
+    calc["timestamp"] = calc_timestamp(calc.get("Data"), calc.get("Hora"))
+    return True
+
+def _ensure_numeric_result(calc) -> bool:
+    """Preenche 'valor' e 'unidade' a partir de 'Resultado' em registros antigos."""
+    if "valor" in calc:
+        return False
+    calc["valor"], calc["unidade"] = parse_result_string(calc.get("Resultado"))
+    return True
+
+HISTORY_KEYS = ("historico_pesagens", "historico_vacinacao", "historico_doencas", "historico_reproducao")
+
+def _ensure_history_ids(animal) -> bool:
+    """Dá um id novo aos registros de histórico sem id ou com id repetido no mesmo histórico."""
+    changed = False
+    for history_key in HISTORY_KEYS:
+        seen = set()
+        for record in animal.get(history_key) or []:
+            if not record.get("id") or record["id"] in seen:
+                record["id"] = str(uuid.uuid4())
+                changed = True
+            seen.add(record["id"])
+    return changed
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """Alteração emitida pelo AppState; `kind` é o nome da operação do journal (ex.: 'animal_update')."""
+    kind: str
+    data: dict = field(default_factory=dict)
+
+    @property
+    def animal_ids(self) -> set:
+        """Ids dos animais afetados ("batch" e "animal_add_many" trazem vários)."""
+        if self.kind == "batch":
+            return self.data["animal_ids"]
+        if self.kind == "animal_add_many":
+            return {animal.get("id") for animal in self.data["animals"]}
+        animal_id = self.data.get("animal_id") or (self.data.get("animal") or {}).get("id")
+        return set() if animal_id is None else {animal_id}
+
+# Diferença mínima para um valor recalculado substituir o salvo.
+RECOMPUTE_TOLERANCE = 1e-9
+
+# Quantidade de conversas (corpo das mensagens) mantidas em memória.
+CHAT_BODY_CACHE_SIZE = 8
 
 class AppState:
     def __init__(self):
@@ -20,79 +94,532 @@ class AppState:
         self.active_file_in_chat = None
         self.herd = []
 
-    def to_dict(self) -> dict:
-        theme_prefs = self.theme_preference.copy()
-        if isinstance(theme_prefs.get("theme_mode"), ft.ThemeMode):
-            theme_prefs["theme_mode"] = theme_prefs["theme_mode"].value
+        # Só os cabeçalhos das conversas ficam residentes; as mensagens são
+        # carregadas sob demanda por chat_body_loader(chat_id) e mantidas num LRU.
+        self.chat_body_loader = None
+        self._chat_bodies = OrderedDict()
+        self._dirty_chat_bodies = set()
 
-        return {
-            "calculated_indices": self.calculated_indices,
-            "theme_preference": theme_prefs,
-            "ai_settings": self.ai_settings,
-            "chat_history": self.chat_history,
-            "herd": self.herd,
-        }
+        # Índices por id: posição na lista (rebanho e cálculos) ou o próprio cabeçalho (conversas).
+        self._animal_positions = {}
+        self._calc_positions = {}
+        self._chats_by_id = {}
+        self.herd_index = HerdIndex()
+        self.pedigree = PedigreeIndex()
+        self.reproduction = ReproductionIndex()
+        self.index_aggregates = IndexAggregates(lambda index_name: self.calculated_indices.get(index_name, []))
+
+        self._pending_ops = []
+        self._dirty_shards = set()
+        self._ops_lock = threading.Lock()
+        self._replaying = False
+        self.needs_full_save = False
+        self._listeners = []
+        # Dentro de batch() os eventos são acumulados e saem num único evento "batch" ao final.
+        self._batch_depth = 0
+        self._batched = None
+
+    def to_dict(self) -> dict:
+        data = {}
+        for shard in SHARDS:
+            data.update(self.shard_to_dict(shard))
+        return data
 
     def from_dict(self, data: dict):
-        self.calculated_indices = data.get("calculated_indices", {})
+        for shard in SHARDS:
+            self.load_shard(shard, data)
+
+    def shard_to_dict(self, shard: str, include_chat_bodies: bool = True) -> dict:
+        if shard == "settings":
+            theme_prefs = self.theme_preference.copy()
+            if isinstance(theme_prefs.get("theme_mode"), ft.ThemeMode):
+                theme_prefs["theme_mode"] = theme_prefs["theme_mode"].value
+            return {"theme_preference": theme_prefs, "ai_settings": self.ai_settings}
+        if shard == "indices":
+            return {"calculated_indices": self.calculated_indices}
+        if shard == "herd":
+            return {"herd": self.herd}
+        if shard == "chats":
+            if not include_chat_bodies:
+                return {"chat_history": self.chat_history}
+            return {"chat_history": [
+                {**chat, "messages": self.get_chat_messages(chat["id"], cache=False)} for chat in self.chat_history
+            ]}
+        raise ValueError(f"Shard desconhecido: {shard}")
+
+    def load_shard(self, shard: str, data: dict):
+        if shard == "settings":
+            theme_prefs = data.get("theme_preference", {})
+            self.theme_preference["primary_color_name"] = theme_prefs.get("primary_color_name", "TEAL_ACCENT_700")
+            theme_mode_str = theme_prefs.get("theme_mode", "system")
+            try:
+                self.theme_preference["theme_mode"] = ft.ThemeMode(theme_mode_str)
+            except (ValueError, AttributeError):
+                self.theme_preference["theme_mode"] = ft.ThemeMode.SYSTEM
+
+            default_ai_settings = {
+                "enabled": False,
+                "api_key": os.getenv("GEMINI_API_KEY"),
+                "suggestions_on_dashboard": False,
+            }
+            loaded_ai_settings = data.get("ai_settings", default_ai_settings)
+            loaded_ai_settings.setdefault("api_key", os.getenv("GEMINI_API_KEY"))
+            self.ai_settings = loaded_ai_settings
+        elif shard == "indices":
+            self.calculated_indices = {
+                index_name: [Calculation.coerce(result) for result in results]
+                for index_name, results in data.get("calculated_indices", {}).items()
+            }
+            for index_name, results in self.calculated_indices.items():
+                for result in results:
+                    backfilled = _ensure_timestamp(result)
+                    backfilled = _ensure_numeric_result(result) or backfilled
+                    if not result.get("id"):
+                        result["id"] = str(uuid.uuid4())
+                        backfilled = True
+                    if backfilled:
+                        self.needs_full_save = True
+                        self._dirty_shards.add("indices")
+                # Cada lista fica ordenada pelo timestamp (mais antigo primeiro).
+                results.sort(key=_calc_sort_key)
+            self._calc_positions = {}
+            for index_name in self.calculated_indices:
+                self._reindex_calculations(index_name)
+            self.index_aggregates.rebuild(self.calculated_indices)
+        elif shard == "herd":
+            self.herd = [Animal.coerce(animal) for animal in data.get("herd", [])]
+            if any([_ensure_history_ids(animal) for animal in self.herd]):
+                self.needs_full_save = True
+                self._dirty_shards.add("herd")
+            self._animal_positions = {}
+            self._reindex_herd()
+            self.herd_index.rebuild(self.herd)
+            self.pedigree.rebuild(self.herd)
+            self.reproduction.rebuild(self.herd)
+        elif shard == "chats":
+            self.chat_history = []
+            with self._ops_lock:
+                self._chat_bodies.clear()
+                self._dirty_chat_bodies.clear()
+                for chat in data.get("chat_history", []):
+                    messages = chat.pop("messages", None)
+                    if messages is not None:
+                        # Formato antigo, com as mensagens junto do cabeçalho.
+                        self._chat_bodies[chat["id"]] = [ChatMessage.coerce(message) for message in messages]
+                        self._dirty_chat_bodies.add(chat["id"])
+                        self._dirty_shards.add("chats")
+                        self.needs_full_save = True
+                    self.chat_history.append(chat)
+            self._chats_by_id = {}
+            for chat in self.chat_history:
+                self._chats_by_id.setdefault(chat.get("id"), chat)
+
+    def _reindex_herd(self, start: int = 0):
+        for position in range(start, len(self.herd)):
+            animal_id = self.herd[position].get("id")
+            if self._animal_positions.get(animal_id, position) >= position:
+                self._animal_positions[animal_id] = position
+
+    def _reindex_calculations(self, index_name: str, start: int = 0):
+        results = self.calculated_indices.get(index_name)
+        if not results:
+            self._calc_positions.pop(index_name, None)
+            return
+        positions = self._calc_positions.setdefault(index_name, {})
+        seen = set()
+        for position in range(start, len(results)):
+            calc_id = results[position].get("id")
+            if calc_id in seen:
+                continue
+            seen.add(calc_id)
+            # Posições anteriores a `start` não mudaram e pertencem a um id repetido.
+            if positions.get(calc_id, start) >= start:
+                positions[calc_id] = position
+
+    def verify_indexes(self) -> list[str]:
+        """Compara os índices por id com as listas e retorna as divergências encontradas."""
+        problems = []
+        expected_animals = {}
+        for position, animal in enumerate(self.herd):
+            expected_animals.setdefault(animal.get("id"), position)
+        if expected_animals != self._animal_positions:
+            problems.append("Índice do rebanho divergente.")
+        for index_name, results in self.calculated_indices.items():
+            numeric = sorted(calc.get("valor") for calc in results if calc.get("valor") is not None)
+            stats = self.index_aggregates.stats(index_name)
+            if stats["numeric_count"] != len(numeric) or (numeric and (stats["min"], stats["max"]) != (numeric[0], numeric[-1])):
+                problems.append(f"Resumo do índice '{index_name}' divergente.")
+        if len(self.herd_index) != len(expected_animals) or set(self.herd_index.search()) != expected_animals.keys():
+            problems.append("Índices secundários do rebanho divergentes.")
+        if len(self.pedigree) != len(expected_animals):
+            problems.append("Índice de pedigree divergente.")
+        if len(self.reproduction) != len(expected_animals):
+            problems.append("Índice reprodutivo divergente.")
+
+        expected_calcs = {}
         for index_name, results in self.calculated_indices.items():
-            for result in results:
-                result.setdefault("id", str(uuid.uuid4()))
+            positions = expected_calcs.setdefault(index_name, {})
+            for position, calc in enumerate(results):
+                positions.setdefault(calc.get("id"), position)
+        expected_calcs = {name: positions for name, positions in expected_calcs.items() if positions}
+        if expected_calcs != self._calc_positions:
+            problems.append("Índice de cálculos divergente.")
 
-        theme_prefs = data.get("theme_preference", {})
-        self.theme_preference["primary_color_name"] = theme_prefs.get("primary_color_name", "TEAL_ACCENT_700")
-        theme_mode_str = theme_prefs.get("theme_mode", "system")
+        expected_chats = {}
+        for chat in self.chat_history:
+            expected_chats.setdefault(chat.get("id"), chat)
+        if expected_chats.keys() != self._chats_by_id.keys() or any(
+            self._chats_by_id[chat_id] is not chat for chat_id, chat in expected_chats.items()
+        ):
+            problems.append("Índice de conversas divergente.")
+        return problems
+
+    def _record(self, op: str, **payload):
+        with self._ops_lock:
+            if op == "reset":
+                self._dirty_shards.update(("indices", "herd", "chats"))
+            else:
+                self._dirty_shards.add(OP_SHARDS[op])
+            if not self._replaying:
+                self._pending_ops.append({"op": op, **payload})
+        self._emit(ChangeEvent(op, payload))
+
+    def subscribe(self, listener, kinds=None):
+        """Registra `listener(event)` para as alterações de `kinds` (todas se None); retorna a função que cancela."""
+        entry = (listener, frozenset(kinds) if kinds else None)
+        self._listeners.append(entry)
+
+        def unsubscribe():
+            if entry in self._listeners:
+                self._listeners.remove(entry)
+        return unsubscribe
+
+    @contextmanager
+    def batch(self):
+        """Agrupa alterações em massa (importação, replay do journal) num único evento "batch" ao final.
+
+        O evento traz os tipos de operação (`kinds`), os índices (`index_names`) e os animais
+        (`animal_ids`) afetados e só chega aos ouvintes inscritos em algum desses tipos.
+        """
+        if not self._batch_depth:
+            self._batched = {"kinds": set(), "index_names": set(), "animal_ids": set()}
+        self._batch_depth += 1
         try:
-            self.theme_preference["theme_mode"] = ft.ThemeMode(theme_mode_str)
-        except (ValueError, AttributeError):
-            self.theme_preference["theme_mode"] = ft.ThemeMode.SYSTEM
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                batched, self._batched = self._batched, None
+                if batched["kinds"]:
+                    self._emit(ChangeEvent("batch", batched))
 
-        default_ai_settings = {
-            "enabled": False,
-            "api_key": os.getenv("GEMINI_API_KEY"),
-            "suggestions_on_dashboard": False,
+    def _emit(self, event: ChangeEvent):
+        if self._batch_depth:
+            self._batched["kinds"].add(event.kind)
+            if event.data.get("index_name") is not None:
+                self._batched["index_names"].add(event.data["index_name"])
+            self._batched["animal_ids"].update(event.animal_ids)
+            return
+        for listener, kinds in list(self._listeners):
+            if kinds is not None and event.kind not in kinds and not (
+                event.kind == "batch" and kinds & event.data["kinds"]
+            ):
+                continue
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Erro ao notificar alteração '{event.kind}': {e}")
+
+    def take_dirty_shards(self) -> set[str]:
+        with self._ops_lock:
+            dirty, self._dirty_shards = self._dirty_shards, set()
+        return dirty
+
+    def mark_shards_dirty(self, shards):
+        with self._ops_lock:
+            self._dirty_shards.update(shards)
+
+    def take_dirty_chat_bodies(self) -> dict[str, list | None]:
+        """Retorna as conversas alteradas desde a última gravação (None = excluída)."""
+        with self._ops_lock:
+            dirty, self._dirty_chat_bodies = self._dirty_chat_bodies, set()
+            bodies = {
+                chat_id: list(self._chat_bodies[chat_id]) if chat_id in self._chat_bodies else None
+                for chat_id in dirty
+            }
+            self._evict_chat_bodies()
+        return bodies
+
+    def restore_chat_bodies(self, bodies: dict[str, list | None]):
+        chat_ids = {chat.get("id") for chat in self.chat_history}
+        with self._ops_lock:
+            for chat_id, messages in bodies.items():
+                if messages is not None and chat_id in chat_ids:
+                    self._chat_bodies.setdefault(chat_id, messages)
+                self._dirty_chat_bodies.add(chat_id)
+
+    def get_chat_messages(self, chat_id: str, cache: bool = True) -> list:
+        with self._ops_lock:
+            messages = self._chat_bodies.get(chat_id)
+            if messages is not None:
+                if cache:
+                    self._chat_bodies.move_to_end(chat_id)
+                return messages
+        messages = (self.chat_body_loader(chat_id) if self.chat_body_loader else None) or []
+        messages = [ChatMessage.coerce(message) for message in messages]
+        if not cache:
+            return messages
+        with self._ops_lock:
+            messages = self._chat_bodies.setdefault(chat_id, messages)
+            self._evict_chat_bodies()
+        return messages
+
+    def _evict_chat_bodies(self):
+        excess = len(self._chat_bodies) - CHAT_BODY_CACHE_SIZE
+        if excess <= 0:
+            return
+        # Conversas com mensagens ainda não gravadas e a mais recente nunca são descartadas.
+        candidates = [
+            chat_id for chat_id in list(self._chat_bodies)[:-1]
+            if chat_id not in self._dirty_chat_bodies and chat_id != self.current_chat_id
+        ]
+        for chat_id in candidates[:excess]:
+            del self._chat_bodies[chat_id]
+
+    def drain_ops(self) -> list[dict]:
+        with self._ops_lock:
+            ops, self._pending_ops = self._pending_ops, []
+        return ops
+
+    def apply_op(self, op: dict):
+        """Reaplica uma operação do journal sem registrá-la novamente."""
+        handlers = {
+            "calc_add": lambda o: self.add_new_calculation(o["index_name"], o["entry"]),
+            "calc_add_many": lambda o: self.add_calculations(o["index_name"], o["entries"]),
+            "calc_update": lambda o: self.update_calculation_by_id(o["index_name"], o["calc_id"], o["entry"]),
+            "calc_delete": lambda o: self.delete_calculation_by_id(o["index_name"], o["calc_id"]),
+            "calc_recompute": lambda o: self.apply_recomputed(
+                o["index_name"], [(entry["id"], entry["valor"], entry["unidade"]) for entry in o["entries"]]
+            ),
+            "index_delete": lambda o: self.delete_index_history(o["index_name"]),
+            "animal_add": lambda o: self.add_animal(o["animal"]),
+            "animal_add_many": lambda o: self.add_animals(o["animals"]),
+            "animal_update": lambda o: self.update_animal_by_id(o["animal_id"], o["animal"]),
+            "animal_delete": lambda o: self.delete_animal_by_id(o["animal_id"]),
+            "chat_add": lambda o: self.add_chat(o["chat"]),
+            "chat_delete": lambda o: self.delete_chat_by_id(o["chat_id"]),
+            "chat_rename": lambda o: self.update_chat_title(o["chat_id"], o["title"]),
+            "chat_message": lambda o: self.append_chat_message(o["chat_id"], o["message"], position=o.get("position")),
+            "theme": lambda o: self.set_theme_preference(o["key"], o["value"]),
+            "ai_settings": lambda o: self.set_ai_setting(o["key"], o["value"]),
+            "reset": lambda o: self.reset(),
         }
-        loaded_ai_settings = data.get("ai_settings", default_ai_settings)
-        loaded_ai_settings.setdefault("api_key", os.getenv("GEMINI_API_KEY"))
-        self.ai_settings = loaded_ai_settings
+        handler = handlers.get(op.get("op"))
+        if handler is None:
+            return
+        self._replaying = True
+        try:
+            handler(op)
+        finally:
+            self._replaying = False
+
+    def set_theme_preference(self, key: str, value):
+        if key == "theme_mode" and not isinstance(value, ft.ThemeMode):
+            try:
+                value = ft.ThemeMode(value)
+            except ValueError:
+                value = ft.ThemeMode.SYSTEM
+        self.theme_preference[key] = value
+        self._record("theme", key=key, value=value.value if isinstance(value, ft.ThemeMode) else value)
 
-        self.chat_history = data.get("chat_history", [])
-        self.herd = data.get("herd", [])
+    def set_ai_setting(self, key: str, value):
+        self.ai_settings[key] = value
+        self._record("ai_settings", key=key, value=value)
 
     def reset(self):
         self.calculated_indices.clear()
+        with self._ops_lock:
+            self._dirty_chat_bodies.update(chat.get("id") for chat in self.chat_history)
+            self._chat_bodies.clear()
         self.chat_history.clear()
         self.active_file_in_chat = None
         self.herd.clear()
+        self._animal_positions.clear()
+        self._calc_positions.clear()
+        self._chats_by_id.clear()
+        self.herd_index.clear()
+        self.pedigree.clear()
+        self.reproduction.clear()
+        self.index_aggregates.clear()
+        self._record("reset")
 
     def get_calculation_by_id(self, index_name: str, calc_id: str):
-        if index_name in self.calculated_indices:
-            for i, calc in enumerate(self.calculated_indices.get(index_name, [])):
-                if calc.get("id") == calc_id:
-                    return calc, i
-        return None, None
+        position = self._calc_positions.get(index_name, {}).get(calc_id)
+        if position is None:
+            return None, None
+        return self.calculated_indices[index_name][position], position
+
+    def calculations_between(self, index_name: str, start_date, end_date) -> list:
+        """Cálculos entre as duas datas (inclusive), do mais antigo para o mais recente."""
+        results = self.calculated_indices.get(index_name, [])
+        low = bisect_left(results, start_date.toordinal() * 1440, key=_calc_sort_key)
+        high = bisect_left(results, (end_date.toordinal() + 1) * 1440, key=_calc_sort_key)
+        return results[low:high]
+
+    def latest_calculations(self, index_name: str, count: int | None = None) -> list:
+        """Cálculos do mais recente para o mais antigo."""
+        results = self.calculated_indices.get(index_name, [])
+        if count is not None:
+            results = results[-count:] if count > 0 else []
+        return results[::-1]
+
+    def index_summary(self, index_name: str, last_n: int = 5) -> dict | None:
+        """Resumo pré-calculado do índice para o dashboard: último valor, estatísticas e tendência."""
+        results = self.calculated_indices.get(index_name)
+        if not results:
+            return None
+        latest = results[-1]
+        previous = results[-2].get("valor") if len(results) > 1 else None
+        trend = None
+        if latest.get("valor") is not None and previous is not None:
+            trend = latest.get("valor") - previous
+        return {
+            "latest": latest,
+            "count": len(results),
+            **self.index_aggregates.stats(index_name),
+            "last_values": [calc.get("valor") for calc in results[-last_n:]],
+            "trend": trend,
+        }
+
+    def _insert_calculation(self, index_name: str, entry: Calculation):
+        results = self.calculated_indices.setdefault(index_name, [])
+        position = bisect_right(results, _calc_sort_key(entry), key=_calc_sort_key)
+        results.insert(position, entry)
+        self._calc_positions.setdefault(index_name, {}).pop(entry.get("id"), None)
+        self._reindex_calculations(index_name, position)
+        self.index_aggregates.add(index_name, entry.get("valor"))
+
+    def _remove_calculation_at(self, index_name: str, position: int):
+        calc = self.calculated_indices[index_name].pop(position)
+        del self._calc_positions[index_name][calc.get("id")]
+        self._reindex_calculations(index_name, position)
+        self.index_aggregates.remove(index_name, calc.get("valor"))
 
     def update_calculation_by_id(self, index_name: str, calc_id: str, new_data: dict):
         calc, index_in_list = self.get_calculation_by_id(index_name, calc_id)
         if calc is not None and index_in_list is not None:
-            updated_entry = {**calc, **new_data, "id": calc_id}
-            self.calculated_indices[index_name][index_in_list] = updated_entry
+            updated_entry = Calculation({**calc, **new_data, "id": calc_id})
+            if "timestamp" not in new_data and ("Data" in new_data or "Hora" in new_data):
+                updated_entry.pop("timestamp", None)
+            if "valor" not in new_data and "Resultado" in new_data:
+                updated_entry.pop("valor", None)
+            _ensure_timestamp(updated_entry)
+            _ensure_numeric_result(updated_entry)
+            self._remove_calculation_at(index_name, index_in_list)
+            self._insert_calculation(index_name, updated_entry)
+            self._record("calc_update", index_name=index_name, calc_id=calc_id, entry=updated_entry)
             return True
         return False
 
     def add_new_calculation(self, index_name: str, calculation_entry: dict):
-        if index_name not in self.calculated_indices:
-            self.calculated_indices[index_name] = []
-        
-        self.calculated_indices[index_name].append(calculation_entry)
+        calculation_entry = Calculation.coerce(calculation_entry)
+        _ensure_timestamp(calculation_entry)
+        _ensure_numeric_result(calculation_entry)
+
+        existing, position = self.get_calculation_by_id(index_name, calculation_entry["id"])
+        if existing is not None:
+            self._remove_calculation_at(index_name, position)
+        self._insert_calculation(index_name, calculation_entry)
+        self._record("calc_add", index_name=index_name, entry=calculation_entry)
         return calculation_entry["id"]
 
+    def add_calculations(self, index_name: str, entries: list[dict]) -> int:
+        results = self.calculated_indices.setdefault(index_name, [])
+        positions = self._calc_positions.setdefault(index_name, {})
+        added = []
+        for entry in entries:
+            if entry.get("id") in positions:
+                continue
+            entry = Calculation.coerce(entry)
+            _ensure_timestamp(entry)
+            _ensure_numeric_result(entry)
+            positions[entry.get("id")] = len(results)
+            results.append(entry)
+            added.append(entry)
+        self.index_aggregates.add_many(index_name, [entry.get("valor") for entry in added])
+        if not results:
+            del self.calculated_indices[index_name]
+            del self._calc_positions[index_name]
+        elif added:
+            first_added = len(results) - len(added)
+            if first_added and _calc_sort_key(results[first_added]) < _calc_sort_key(results[first_added - 1]) \
+                    or any(_calc_sort_key(a) > _calc_sort_key(b) for a, b in zip(added, added[1:])):
+                results.sort(key=_calc_sort_key)
+                self._calc_positions[index_name] = {}
+                self._reindex_calculations(index_name)
+        if added:
+            self._record("calc_add_many", index_name=index_name, entries=added)
+        return len(added)
+
+    def apply_recomputed(self, index_name: str, values: list) -> int:
+        """Aplica [(id, valor, unidade)] recalculados no lugar (data e ordem não mudam); retorna quantos mudaram."""
+        changed = []
+        for calc_id, valor, unidade in values:
+            calc, _ = self.get_calculation_by_id(index_name, calc_id)
+            if calc is None:
+                continue
+            old = calc.get("valor")
+            if old is not None and abs(old - valor) <= RECOMPUTE_TOLERANCE and calc.get("unidade") == unidade:
+                continue
+            changed.append((calc, old))
+            calc["valor"], calc["unidade"] = valor, unidade
+            calc["Resultado"] = f"{valor:.2f} {unidade}"
+        # Poucas mudanças: atualiza o resumo valor a valor; muitas: reordena tudo uma vez.
+        if len(changed) > 64:
+            self.index_aggregates.rebuild_index(index_name, self.calculated_indices[index_name])
+        else:
+            for calc, old in changed:
+                self.index_aggregates.remove(index_name, old)
+                self.index_aggregates.add(index_name, calc.get("valor"))
+        changed = [calc for calc, _ in changed]
+        if changed:
+            self._record("calc_recompute", index_name=index_name, entries=changed)
+        return len(changed)
+
+    def delete_calculation_by_id(self, index_name: str, calc_id: str) -> bool:
+        calc, index = self.get_calculation_by_id(index_name, calc_id)
+        if calc is None:
+            return False
+        self._remove_calculation_at(index_name, index)
+        if not self.calculated_indices[index_name]:
+            del self.calculated_indices[index_name]
+            self._calc_positions.pop(index_name, None)
+        self._record("calc_delete", index_name=index_name, calc_id=calc_id)
+        return True
+
+    def delete_index_history(self, index_name: str) -> bool:
+        if index_name not in self.calculated_indices:
+            return False
+        del self.calculated_indices[index_name]
+        self._calc_positions.pop(index_name, None)
+        self.index_aggregates.drop(index_name)
+        self._record("index_delete", index_name=index_name)
+        return True
+
+    def add_chat(self, chat: dict):
+        header = {key: value for key, value in chat.items() if key != "messages"}
+        messages = [ChatMessage.coerce(message) for message in chat.get("messages", [])]
+        if self.get_chat_by_id(header["id"]) is None:
+            self.chat_history.insert(0, header)
+            self._chats_by_id[header["id"]] = header
+            with self._ops_lock:
+                self._chat_bodies[header["id"]] = messages
+                self._dirty_chat_bodies.add(header["id"])
+        self._record("chat_add", chat={**header, "messages": messages})
+
     def get_chat_by_id(self, chat_id: str) -> dict | None:
-        for chat in self.chat_history:
-            if chat.get("id") == chat_id:
-                return chat
-        return None
-        
+        return self._chats_by_id.get(chat_id)
+
     def get_current_chat(self) -> dict | None:
         return self.get_chat_by_id(self.current_chat_id)
 
@@ -100,29 +627,95 @@ class AppState:
         chat_to_delete = self.get_chat_by_id(chat_id)
         if chat_to_delete:
             self.chat_history.remove(chat_to_delete)
+            del self._chats_by_id[chat_id]
+            with self._ops_lock:
+                self._chat_bodies.pop(chat_id, None)
+                self._dirty_chat_bodies.add(chat_id)
+            self._record("chat_delete", chat_id=chat_id)
             return True
         return False
-        
+
     def update_chat_title(self, chat_id: str, new_title: str) -> bool:
         chat = self.get_chat_by_id(chat_id)
         if chat:
             chat['title'] = new_title
+            self._record("chat_rename", chat_id=chat_id, title=new_title)
             return True
         return False
 
+    def append_chat_message(self, chat_id: str, message: dict, position: int | None = None) -> bool:
+        chat = self.get_chat_by_id(chat_id)
+        if not chat:
+            return False
+        messages = self.get_chat_messages(chat_id)
+        if position is not None and position < len(messages):
+            return False
+        message = ChatMessage.coerce(message)
+        messages.append(message)
+        with self._ops_lock:
+            self._chat_bodies[chat_id] = messages
+            self._dirty_chat_bodies.add(chat_id)
+        self._record("chat_message", chat_id=chat_id, position=len(messages) - 1, message=message)
+        return True
+
     def add_animal(self, animal_data: dict):
-        self.herd.append(animal_data)
+        animal_data = Animal.coerce(animal_data)
+        _ensure_history_ids(animal_data)
+        animal, index = self.get_animal_by_id(animal_data.get("id"))
+        if animal is not None:
+            self.herd[index] = animal_data
+        else:
+            self._animal_positions[animal_data.get("id")] = len(self.herd)
+            self.herd.append(animal_data)
+        self.herd_index.add(animal_data)
+        self.pedigree.add(animal_data)
+        self.reproduction.add(animal_data)
+        self._record("animal_add", animal=animal_data)
+
+    def add_animals(self, animals: list[dict]) -> int:
+        """Inclui ou substitui (pelo id) vários animais numa única operação; retorna quantos foram gravados."""
+        added = []
+        for animal_data in animals:
+            animal_data = Animal.coerce(animal_data)
+            _ensure_history_ids(animal_data)
+            _, index = self.get_animal_by_id(animal_data.get("id"))
+            if index is not None:
+                self.herd[index] = animal_data
+            else:
+                self._animal_positions[animal_data.get("id")] = len(self.herd)
+                self.herd.append(animal_data)
+            added.append(animal_data)
+        if not added:
+            return 0
+        # Boa parte do rebanho mudou: reconstruir os índices secundários sai mais barato que incluir um a um.
+        if len(added) * 8 > len(self.herd):
+            self.herd_index.rebuild(self.herd)
+            self.pedigree.rebuild(self.herd)
+            self.reproduction.rebuild(self.herd)
+        else:
+            for animal_data in added:
+                self.herd_index.add(animal_data)
+                self.pedigree.add(animal_data)
+                self.reproduction.add(animal_data)
+        self._record("animal_add_many", animals=added)
+        return len(added)
 
     def get_animal_by_id(self, animal_id: str) -> tuple[dict | None, int | None]:
-        for i, animal in enumerate(self.herd):
-            if animal.get("id") == animal_id:
-                return animal, i
-        return None, None
+        position = self._animal_positions.get(animal_id)
+        if position is None:
+            return None, None
+        return self.herd[position], position
 
     def update_animal_by_id(self, animal_id: str, new_data: dict):
         animal, index = self.get_animal_by_id(animal_id)
         if animal is not None:
+            new_data = Animal.coerce(new_data)
+            _ensure_history_ids(new_data)
             self.herd[index] = new_data
+            self.herd_index.add(new_data)
+            self.pedigree.add(new_data)
+            self.reproduction.add(new_data)
+            self._record("animal_update", animal_id=animal_id, animal=new_data)
             return True
         return False
 
@@ -130,5 +723,11 @@ class AppState:
         animal, index = self.get_animal_by_id(animal_id)
         if animal is not None:
             self.herd.pop(index)
+            del self._animal_positions[animal_id]
+            self._reindex_herd(index)
+            self.herd_index.remove(animal_id)
+            self.pedigree.remove(animal_id)
+            self.reproduction.remove(animal_id)
+            self._record("animal_delete", animal_id=animal_id)
             return True
-        return False
\ No newline at end of file
+        return False
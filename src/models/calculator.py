@@ -1,6 +1,24 @@
-import re
 from datetime import datetime
+import threading
 import uuid
+from collections import OrderedDict
+from utils.dates import is_valid_date, parse_date_array, parse_date_ordinal
+from utils.helpers import calc_timestamp, parse_number_array
+from .definitions import INDICES
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DATE_INDICES = ("Idade ao Primeiro Parto", "Intervalo entre Partos")
+# Resultados memorizados por calculate(); os mais antigos saem primeiro.
+MEMO_SIZE = 4096
+
+def _raise_if(condition, message: str):
+    if condition:
+        raise ValueError(message)
 
 class IndexCalculator:
     def __init__(self):
@@ -18,85 +36,91 @@ class IndexCalculator:
             "Conversão Alimentar": self._calculate_conversao_alimentar,
             "Rendimento de Carcaça": self._calculate_rendimento_carcaca,
         }
+        self._inputs_by_index = {index["Índice"]: index["Inputs"].split(", ") for index in INDICES}
+        # Versão da fórmula de cada índice; entra na chave da memória, então mudar a fórmula nunca reaproveita resultado antigo.
+        self.formula_versions = {index_name: 1 for index_name in self.calculation_methods}
+        # Índices cuja fórmula aceita colunas NumPy e `reject`; os demais vão linha a linha em calculate_batch.
+        self._vectorized = set(self.calculation_methods)
+        self._memo = OrderedDict()  # (índice, versão, entradas normalizadas) -> (valor, unidade)
+        self._memo_lock = threading.Lock()
+        self._memo_hits = 0
+        self._memo_misses = 0
+
+    # Cada fórmula existe uma vez só e serve aos dois caminhos: em calculate() recebe números e
+    # `reject` lança ValueError; em calculate_batch() recebe arrays NumPy e `reject` marca as linhas inválidas.
 
-    def _calculate_taxa_prenhez(self, femeas_prenhes, femeas_aptas):
-        if femeas_aptas == 0: raise ValueError("Nº de fêmeas aptas não pode ser zero.")
+    def _calculate_taxa_prenhez(self, femeas_prenhes, femeas_aptas, reject=_raise_if):
+        reject(femeas_aptas == 0, "Nº de fêmeas aptas não pode ser zero.")
         resultado = (femeas_prenhes / femeas_aptas) * 100
         return resultado, "%"
 
-    def _calculate_taxa_natalidade(self, nascidos_vivos, femeas_aptas):
-        if femeas_aptas == 0: raise ValueError("Nº de fêmeas aptas não pode ser zero.")
+    def _calculate_taxa_natalidade(self, nascidos_vivos, femeas_aptas, reject=_raise_if):
+        reject(femeas_aptas == 0, "Nº de fêmeas aptas não pode ser zero.")
         resultado = (nascidos_vivos / femeas_aptas) * 100
         return resultado, "%"
 
-    def _calculate_taxa_desmame(self, bezerros_desmamados, bezerros_nascidos):
-        if bezerros_nascidos == 0: raise ValueError("Nº de bezerros nascidos não pode ser zero.")
+    def _calculate_taxa_desmame(self, bezerros_desmamados, bezerros_nascidos, reject=_raise_if):
+        reject(bezerros_nascidos == 0, "Nº de bezerros nascidos não pode ser zero.")
         resultado = (bezerros_desmamados / bezerros_nascidos) * 100
         return resultado, "%"
 
-    def _calculate_peso_ajustado_p205(self, peso_nascer, peso_desmama, idade_desmama):
-        if idade_desmama == 0: raise ValueError("Idade ao desmame não pode ser zero.")
-        if peso_desmama < peso_nascer: raise ValueError("Peso à desmama menor que peso ao nascer.")
+    def _calculate_peso_ajustado_p205(self, peso_nascer, peso_desmama, idade_desmama, reject=_raise_if):
+        reject(idade_desmama == 0, "Idade ao desmame não pode ser zero.")
+        reject(peso_desmama < peso_nascer, "Peso à desmama menor que peso ao nascer.")
         resultado = peso_nascer + ((peso_desmama - peso_nascer) / idade_desmama) * 205
         return resultado, "kg"
 
-    def _calculate_gmd(self, peso_inicial, peso_final, num_dias):
-        if num_dias == 0: raise ValueError("Nº de dias não pode ser zero.")
+    def _calculate_gmd(self, peso_inicial, peso_final, num_dias, reject=_raise_if):
+        reject(num_dias == 0, "Nº de dias não pode ser zero.")
         resultado = (peso_final - peso_inicial) / num_dias
         return resultado, "kg/dia"
 
-    def _calculate_taxa_mortalidade(self, animais_mortos, total_animais):
-        if total_animais == 0: raise ValueError("Nº total de animais não pode ser zero.")
+    def _calculate_taxa_mortalidade(self, animais_mortos, total_animais, reject=_raise_if):
+        reject(total_animais == 0, "Nº total de animais não pode ser zero.")
         resultado = (animais_mortos / total_animais) * 100
         return resultado, "%"
 
-    def _calculate_idade_primeiro_parto(self, data_nascimento, data_parto):
-        d1 = datetime.strptime(data_nascimento, "%d/%m/%Y")
-        d2 = datetime.strptime(data_parto, "%d/%m/%Y")
-        if d2 < d1: raise ValueError("Parto não pode ser antes do nascimento.")
-        resultado = (d2 - d1).days / 30.4375
+    def _calculate_idade_primeiro_parto(self, data_nascimento, data_parto, reject=_raise_if):
+        d1, d2 = _date_pair(data_nascimento, data_parto)
+        reject(d2 < d1, "Parto não pode ser antes do nascimento.")
+        resultado = (d2 - d1) / 30.4375
         return resultado, "meses"
 
-    def _calculate_intervalo_entre_partos(self, data_parto_anterior, data_parto_atual):
-        d1 = datetime.strptime(data_parto_anterior, "%d/%m/%Y")
-        d2 = datetime.strptime(data_parto_atual, "%d/%m/%Y")
-        if d2 < d1: raise ValueError("Parto atual não pode ser antes do anterior.")
-        resultado = (d2 - d1).days
+    def _calculate_intervalo_entre_partos(self, data_parto_anterior, data_parto_atual, reject=_raise_if):
+        d1, d2 = _date_pair(data_parto_anterior, data_parto_atual)
+        reject(d2 < d1, "Parto atual não pode ser antes do anterior.")
+        resultado = d2 - d1
         return resultado, "dias"
 
-    def _calculate_lotacao_animal(self, total_animais, peso_medio, area_pastagem):
-        if area_pastagem == 0: raise ValueError("Área de pastagem não pode ser zero.")
-        if peso_medio <= 0: raise ValueError("Peso vivo médio deve ser positivo.")
+    def _calculate_lotacao_animal(self, total_animais, peso_medio, area_pastagem, reject=_raise_if):
+        reject(area_pastagem == 0, "Área de pastagem não pode ser zero.")
+        reject(peso_medio <= 0, "Peso vivo médio deve ser positivo.")
         total_ua = (total_animais * peso_medio) / 450.0
         resultado = total_ua / area_pastagem
         return resultado, "UA/ha"
 
-    def _calculate_producao_leite(self, producao_total, num_vacas):
-        if num_vacas == 0: raise ValueError("Nº de vacas em lactação não pode ser zero.")
+    def _calculate_producao_leite(self, producao_total, num_vacas, reject=_raise_if):
+        reject(num_vacas == 0, "Nº de vacas em lactação não pode ser zero.")
         resultado = producao_total / num_vacas
         return resultado, "L/vaca/dia"
 
-    def _calculate_conversao_alimentar(self, consumo_ms, ganho_pv):
-        if ganho_pv == 0: raise ValueError("Ganho de peso não pode ser zero.")
+    def _calculate_conversao_alimentar(self, consumo_ms, ganho_pv, reject=_raise_if):
+        reject(ganho_pv == 0, "Ganho de peso não pode ser zero.")
         resultado = consumo_ms / ganho_pv
         return resultado, "kg MS/kg PV"
 
-    def _calculate_rendimento_carcaca(self, peso_vivo_abate, peso_carcaca):
-        if peso_vivo_abate == 0: raise ValueError("Peso vivo antes do abate não pode ser zero.")
+    def _calculate_rendimento_carcaca(self, peso_vivo_abate, peso_carcaca, reject=_raise_if):
+        reject(peso_vivo_abate == 0, "Peso vivo antes do abate não pode ser zero.")
         resultado = (peso_carcaca / peso_vivo_abate) * 100
         return resultado, "%"
 
     def _validar_data(self, data_str: str) -> bool:
-        if not re.match(r"^\d{2}/\d{2}/\d{4}$", data_str): return False
-        try:
-            datetime.strptime(data_str, "%d/%m/%Y")
-            return True
-        except ValueError: return False
+        return is_valid_date(data_str)
 
     def _parse_and_validate(self, index_data: dict, values: list) -> list:
         parsed_vals = []
         input_descs = index_data["Inputs"].split(", ")
-        is_date_idx = index_data["Índice"] in ["Idade ao Primeiro Parto", "Intervalo entre Partos"]
+        is_date_idx = index_data["Índice"] in DATE_INDICES
         
         for i, val_str in enumerate(values):
             desc = input_descs[i] if i < len(input_descs) else f"entrada #{i+1}"
@@ -120,15 +144,170 @@ class IndexCalculator:
         if not calculation_func:
             raise NotImplementedError(f"Cálculo para '{index_name}' não implementado.")
 
-        parsed_values = self._parse_and_validate(index_data, values)
-        
-        result_val, unit = calculation_func(*parsed_values)
-        
+        key = (index_name, self.formula_versions.get(index_name, 1), _normalize_inputs(index_name, values))
+        with self._memo_lock:
+            cached = self._memo.get(key)
+            if cached is not None:
+                self._memo.move_to_end(key)
+                self._memo_hits += 1
+            else:
+                self._memo_misses += 1
+        if cached is None:
+            parsed_values = self._parse_and_validate(index_data, values)
+            cached = calculation_func(*parsed_values)
+            with self._memo_lock:
+                self._memo[key] = cached
+                if len(self._memo) > MEMO_SIZE:
+                    self._memo.popitem(last=False)
+
+        result_val, unit = cached
+        return self.make_entry(result_val, unit, values)
+
+    def set_formula(self, index_name: str, calculation_func, version: int | None = None, vectorized: bool = False):
+        """Troca a fórmula de um índice, sobe a versão e descarta os resultados memorizados dele.
+
+        A fórmula nova vale também para calculate_batch: linha a linha, ou sobre as colunas inteiras
+        se `vectorized` (aceita arrays NumPy e o parâmetro `reject`, como as fórmulas embutidas).
+        """
+        self.calculation_methods[index_name] = calculation_func
+        if vectorized:
+            self._vectorized.add(index_name)
+        else:
+            self._vectorized.discard(index_name)
+        with self._memo_lock:
+            current = self.formula_versions.get(index_name, 0)
+            self.formula_versions[index_name] = version if version is not None and version > current else current + 1
+            for key in [key for key in self._memo if key[0] == index_name]:
+                del self._memo[key]
+
+    def clear_memo(self):
+        with self._memo_lock:
+            self._memo.clear()
+            self._memo_hits = self._memo_misses = 0
+
+    def memo_stats(self) -> dict:
+        with self._memo_lock:
+            total = self._memo_hits + self._memo_misses
+            return {
+                "hits": self._memo_hits,
+                "misses": self._memo_misses,
+                "size": len(self._memo),
+                "hit_rate": self._memo_hits / total if total else 0.0,
+            }
+
+    def make_entry(self, result_val: float, unit: str, values: list) -> dict:
         now = datetime.now()
+        hora = now.strftime("%H:%M")
         return {
             "id": str(uuid.uuid4()),
             "Resultado": f"{result_val:.2f} {unit}",
+            "valor": float(result_val),
+            "unidade": unit,
             "Data": now.strftime("%d/%m/%Y"),
-            "Hora": now.strftime("%H:%M"),
+            "Hora": hora,
+            "timestamp": calc_timestamp(now, hora),
             "inputs": values,
-        }
\ No newline at end of file
+        }
+
+    def calculate_batch(self, index_name: str, columns) -> dict:
+        """Calcula o índice para muitas linhas de uma vez (ex.: uma planilha importada).
+
+        `columns` traz uma sequência por entrada do índice (lista ou array NumPy), na ordem de
+        definitions.INDICES; nos índices de data aceita texto DD/MM/AAAA ou datetime64.
+        Usa a mesma fórmula de calculate(), aplicada às colunas inteiras.
+        Retorna {"valor": valores (NaN nas linhas inválidas), "unidade": ..., "erros": {linha: mensagem}}.
+        """
+        calculation_func = self.calculation_methods.get(index_name)
+        if calculation_func is None:
+            raise NotImplementedError(f"Cálculo para '{index_name}' não implementado.")
+        input_descs = self._inputs_by_index.get(index_name, [])
+        if len(columns) != len(input_descs):
+            raise ValueError(f"'{index_name}' espera {len(input_descs)} coluna(s), recebeu {len(columns)}.")
+        row_counts = {len(column) for column in columns}
+        if len(row_counts) > 1:
+            raise ValueError("Todas as colunas devem ter o mesmo número de linhas.")
+        if not NUMPY_AVAILABLE or index_name not in self._vectorized:
+            return self._calculate_batch_rows(index_name, columns)
+
+        row_count = row_counts.pop() if row_counts else 0
+        invalid = np.zeros(row_count, dtype=bool)
+        errors = {}
+        parsed = []
+        for i, (column, desc) in enumerate(zip(columns, input_descs)):
+            if index_name in DATE_INDICES and i < 2:
+                values, bad = parse_date_array(column)
+                _flag_rows(errors, invalid, bad, f"Data inválida para '{desc}'. Use DD/MM/AAAA.")
+                # A fórmula recebe dias (como os ordinais de _date_pair); as datas inválidas viram 0.
+                values = np.where(bad, 0, values.astype(np.int64))
+            else:
+                values, bad = parse_number_array(column)
+                _flag_rows(errors, invalid, bad, f"O valor para '{desc}' deve ser um número não negativo.")
+            parsed.append(values)
+
+        def reject(condition, message):
+            _flag_rows(errors, invalid, np.broadcast_to(np.asarray(condition, dtype=bool), invalid.shape), message)
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            valores, unit = calculation_func(*parsed, reject=reject)
+            valores = np.array(np.broadcast_to(np.asarray(valores, dtype=float), invalid.shape))
+        valores[invalid] = np.nan
+        return {"valor": valores, "unidade": unit, "erros": errors}
+
+    def unit_of(self, index_name: str) -> str:
+        """Unidade do resultado do índice, tirada da própria fórmula."""
+        input_count = len(self._inputs_by_index[index_name])
+        if NUMPY_AVAILABLE and index_name in self._vectorized:
+            return self.calculate_batch(index_name, [[] for _ in range(input_count)])["unidade"]
+        # Sem colunas para avaliar: roda a fórmula numa linha de exemplo válida.
+        sample = [1.0] * input_count
+        if index_name in DATE_INDICES:
+            sample[:2] = ["01/01/2000", "01/01/2000"]
+        try:
+            return self.calculation_methods[index_name](*sample)[1]
+        except (ValueError, ZeroDivisionError, TypeError):
+            return ""
+
+    def _calculate_batch_rows(self, index_name: str, columns) -> dict:
+        """Alternativa sem NumPy: aplica o cálculo linha a linha, guardando o erro de cada uma."""
+        index_data = {"Índice": index_name, "Inputs": ", ".join(self._inputs_by_index[index_name])}
+        calculation_func = self.calculation_methods[index_name]
+        valores, errors, unit = [], {}, None
+        for row, values in enumerate(zip(*columns)):
+            values = [value.strftime("%d/%m/%Y") if hasattr(value, "strftime") else str(value) for value in values]
+            try:
+                valor, unit = calculation_func(*self._parse_and_validate(index_data, values))
+                valores.append(float(valor))
+            except ValueError as e:
+                valores.append(float("nan"))
+                errors[row] = str(e)
+        return {"valor": valores, "unidade": unit if unit is not None else self.unit_of(index_name), "erros": errors}
+
+def _normalize_inputs(index_name: str, values: list) -> tuple:
+    """Entradas como o cálculo as enxerga: datas sem espaços e números pelo valor ("80", " 80,0" e "80.00" são iguais)."""
+    is_date_idx = index_name in DATE_INDICES
+    normalized = []
+    for i, value in enumerate(values):
+        text = str(value).strip()
+        if not (is_date_idx and i < 2):
+            try:
+                text = float(text.replace(",", "."))
+            except ValueError:
+                pass
+        normalized.append(text)
+    return tuple(normalized)
+
+def _date_pair(first, second) -> tuple:
+    """Datas do cálculo em dias: texto DD/MM/AAAA vira ordinal; colunas de calculate_batch já chegam em dias."""
+    if not isinstance(first, str) and not isinstance(second, str):
+        return first, second
+    d1, d2 = parse_date_ordinal(first), parse_date_ordinal(second)
+    if d1 is None or d2 is None:
+        raise ValueError("Data inválida. Use DD/MM/AAAA.")
+    return d1, d2
+
+def _flag_rows(errors: dict, invalid, bad, message: str):
+    """Registra `message` nas linhas de `bad` que ainda não tinham erro (vale o primeiro, como em calculate)."""
+    new_rows = bad & ~invalid
+    if new_rows.any():
+        errors.update(dict.fromkeys(np.flatnonzero(new_rows).tolist(), message))
+        invalid |= new_rows
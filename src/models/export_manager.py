@@ -1,8 +1,12 @@
 import json
 import io
+import uuid
+import zlib
 from datetime import datetime
+from itertools import islice
 try:
     import openpyxl
+    from openpyxl.cell import WriteOnlyCell
     from openpyxl.styles import Font, Alignment
     from openpyxl.utils import get_column_letter
     OPENPYXL_AVAILABLE = True
@@ -16,6 +20,7 @@ except ImportError:
     FPDF_AVAILABLE = False
 
 from .definitions import VERSION_NUMBER
+from .records import encode_record
 
 def backup_to_json_string(indices_data: dict, selected_names: list[str]) -> str:
     to_backup = {name: indices_data[name] for name in selected_names if name in indices_data}
@@ -25,102 +30,275 @@ def backup_to_json_string(indices_data: dict, selected_names: list[str]) -> str:
         "backup_timestamp": datetime.now().isoformat(),
         "selected_indices_data": to_backup
     }
-    return json.dumps(backup_content, ensure_ascii=False, indent=4)
+    return json.dumps(backup_content, ensure_ascii=False, indent=4, default=encode_record)
+
+# Campos que entram na impressão digital de um cálculo (o id é a chave do manifesto).
+_FINGERPRINT_FIELDS = ("Resultado", "valor", "unidade", "Data", "Hora", "timestamp", "inputs")
+
+def _fingerprint(calc) -> int:
+    """crc32 do conteúdo do cálculo: muda quando qualquer campo salvo muda."""
+    return zlib.crc32("\x1f".join([repr(calc.get(key)) for key in _FINGERPRINT_FIELDS]).encode())
+
+def write_backup(indices_data: dict, selected_names: list[str], destination, manifest: dict | None = None) -> dict:
+    """Grava o backup em `destination` e retorna o manifesto novo (ids e impressões digitais por índice).
+
+    Sem `manifest` o backup é completo e inicia uma cadeia. Com o manifesto do último backup, o
+    arquivo é incremental: só cálculos novos ou alterados, os ids removidos e os índices apagados,
+    ligado ao anterior por `base_backup_id`. Índices fora da seleção seguem no manifesto como estavam.
+    """
+    selected = [name for name in selected_names if name in indices_data]
+    current = {name: {calc.get("id"): _fingerprint(calc) for calc in indices_data[name]} for name in selected}
+    content = {
+        "app_version": VERSION_NUMBER,
+        "backup_timestamp": datetime.now().isoformat(),
+        "backup_type": "incremental" if manifest else "full",
+        "backup_id": str(uuid.uuid4()),
+    }
+    if manifest:
+        previous = manifest.get("indices", {})
+        content["base_backup_id"] = manifest.get("backup_id")
+        content["selected_indices_data"] = {}
+        content["removed_ids"] = {}
+        for name in selected:
+            known, fingerprints = previous.get(name, {}), current[name]
+            changed = [calc for calc in indices_data[name] if known.get(calc.get("id")) != fingerprints[calc.get("id")]]
+            removed = [calc_id for calc_id in known if calc_id not in fingerprints]
+            if changed:
+                content["selected_indices_data"][name] = changed
+            if removed:
+                content["removed_ids"][name] = removed
+        content["removed_indices"] = [name for name in previous if name not in indices_data]
+        indices = {name: known for name, known in previous.items() if name in indices_data}
+        indices.update(current)
+        # Incremental é lido pela máquina: sem indentação, o arquivo fica do tamanho das mudanças.
+        text = json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=encode_record)
+    else:
+        content["selected_indices_data"] = {name: indices_data[name] for name in selected}
+        indices = current
+        text = json.dumps(content, ensure_ascii=False, indent=4, default=encode_record)
+
+    if isinstance(destination, str):
+        with open(destination, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        destination.write(text)
+    return {"backup_id": content["backup_id"], "backup_timestamp": content["backup_timestamp"], "indices": indices}
+
+def _fill_missing_ids(indices_to_restore: dict):
+    for index_name, results in indices_to_restore.items():
+        for i, result in enumerate(results):
+            if "id" not in result or not result["id"]:
+                result["id"] = f"restored_{datetime.now().timestamp()}_{index_name}_{i}"
 
 def restore_from_json_string(json_string: str) -> tuple[bool, str, dict]:
+    return restore_from_json_strings([json_string])
+
+def restore_from_json_strings(json_strings: list[str]) -> tuple[bool, str, dict]:
+    """Restaura um backup completo ou uma cadeia (o completo e os incrementais seguintes, em qualquer ordem).
+
+    Os incrementais são aplicados a partir do completo pelo `base_backup_id`; retorna os índices
+    no estado do último arquivo da cadeia.
+    """
     try:
-        data = json.loads(json_string)
-        indices_to_restore = data.get("selected_indices_data")
-        if not isinstance(indices_to_restore, dict):
-            return False, "Erro: Formato de backup inválido.", {}
-        
-        for index_name, results in indices_to_restore.items():
-            for i, result in enumerate(results):
-                if "id" not in result or not result["id"]:
-                    result["id"] = f"restored_{datetime.now().timestamp()}_{index_name}_{i}"
-        
-        count = len(indices_to_restore)
-        msg = f"{count} índice(s) restaurado(s) com sucesso." if count > 0 else "Nenhum dado válido para restaurar."
-        return True, msg, indices_to_restore
+        backups = []
+        for json_string in json_strings:
+            data = json.loads(json_string)
+            if not isinstance(data, dict) or not isinstance(data.get("selected_indices_data"), dict):
+                return False, "Erro: Formato de backup inválido.", {}
+            backups.append(data)
     except json.JSONDecodeError:
         return False, "Erro: Arquivo de backup não é um JSON válido.", {}
     except Exception as e:
         return False, f"Erro inesperado: {e}", {}
+    if not backups:
+        return False, "Nenhum arquivo de backup selecionado.", {}
 
-def generate_spreadsheet_bytes(indices_data: dict, selected_names: list[str]) -> bytes | None:
-    if not OPENPYXL_AVAILABLE:
-        return None
-    
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Dados dos Índices"
-    header = ["Nome do Índice", "Índice (Valor e Unidade)", "Hora", "Data"]
-    sheet.append(header)
-    for cell in sheet[1]:
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal='center')
+    by_id = {data.get("backup_id"): data for data in backups}
+    bases = {data.get("base_backup_id") for data in backups}
+    tips = [data for data in backups if data.get("backup_id") is None or data.get("backup_id") not in bases]
+    if len(tips) != 1 or len(by_id) != len(backups):
+        return False, "Erro: Selecione os arquivos de uma única cadeia de backup, sem pular nenhum incremental.", {}
+
+    chain = [tips[0]]
+    while chain[-1].get("backup_type") == "incremental":
+        base = by_id.get(chain[-1].get("base_backup_id"))
+        if base is None or base in chain:
+            return False, "Erro: Falta um arquivo anterior da cadeia de backup (comece pelo backup completo).", {}
+        chain.append(base)
+    if len(chain) != len(backups):
+        return False, "Erro: Há arquivos que não pertencem a esta cadeia de backup.", {}
 
-    indices_to_export = sorted([name for name in selected_names if name in indices_data])
+    restored = {}
+    for data in reversed(chain):
+        for index_name in data.get("removed_indices", []):
+            restored.pop(index_name, None)
+        for index_name, calc_ids in data.get("removed_ids", {}).items():
+            results = restored.get(index_name, {})
+            for calc_id in calc_ids:
+                results.pop(calc_id, None)
+        changes = data["selected_indices_data"]
+        _fill_missing_ids(changes)
+        for index_name, results in changes.items():
+            by_calc_id = restored.setdefault(index_name, {})
+            for result in results:
+                by_calc_id[result["id"]] = result
+    indices_to_restore = {name: list(results.values()) for name, results in restored.items() if results}
 
-    for name in indices_to_export:
+    count = len(indices_to_restore)
+    if count == 0:
+        msg = "Nenhum dado válido para restaurar."
+    elif len(chain) > 1:
+        msg = f"{count} índice(s) restaurado(s) com sucesso ({len(chain)} arquivos da cadeia de backup)."
+    else:
+        msg = f"{count} índice(s) restaurado(s) com sucesso."
+    return True, msg, indices_to_restore
+
+SPREADSHEET_HEADER = ["Nome do Índice", "Índice (Valor e Unidade)", "Hora", "Data", "Valor", "Unidade"]
+
+def _spreadsheet_rows(indices_data: dict, selected_names: list[str]):
+    for name in sorted(name for name in selected_names if name in indices_data):
         for result in indices_data.get(name, []):
-            row = [name, result.get("Resultado", "N/A"), result.get("Hora", "N/A"), result.get("Data", "N/A")]
-            sheet.append(row)
+            yield [
+                name, result.get("Resultado", "N/A"), result.get("Hora", "N/A"), result.get("Data", "N/A"),
+                result.get("valor"), result.get("unidade", ""),
+            ]
 
-    for col_idx, column_cells in enumerate(sheet.columns, 1):
-        max_len = max((len(str(cell.value)) for cell in column_cells if cell.value), default=0)
-        sheet.column_dimensions[get_column_letter(col_idx)].width = max_len + 2
-    
+def write_spreadsheet(indices_data: dict, selected_names: list[str], destination) -> bool:
+    """Grava a planilha em modo write-only direto no destino (caminho ou arquivo aberto), linha a linha.
+
+    A planilha write-only grava as larguras das colunas antes da primeira linha, então elas são medidas
+    numa passada só sobre os valores (sem criar células); a memória não cresce com o número de linhas.
+    """
+    if not OPENPYXL_AVAILABLE:
+        return False
+
+    widths = [len(title) for title in SPREADSHEET_HEADER]
+    for row in _spreadsheet_rows(indices_data, selected_names):
+        for i, value in enumerate(row):
+            if value:
+                size = len(str(value))
+                if size > widths[i]:
+                    widths[i] = size
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Dados dos Índices")
+    for col_idx, width in enumerate(widths, 1):
+        sheet.column_dimensions[get_column_letter(col_idx)].width = width + 2
+    header = []
+    for title in SPREADSHEET_HEADER:
+        cell = WriteOnlyCell(sheet, value=title)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal='center')
+        header.append(cell)
+    sheet.append(header)
+    for row in _spreadsheet_rows(indices_data, selected_names):
+        sheet.append(row)
+    workbook.save(destination)
+    return True
+
+def generate_spreadsheet_bytes(indices_data: dict, selected_names: list[str]) -> bytes | None:
     with io.BytesIO() as excel_bytes_io:
-        workbook.save(excel_bytes_io)
+        if not write_spreadsheet(indices_data, selected_names, excel_bytes_io):
+            return None
         return excel_bytes_io.getvalue()
 
-def generate_pdf_bytes(indices_data: dict, selected_names: list[str]) -> bytes | None:
-    if not FPDF_AVAILABLE:
-        return None
+PDF_COLUMNS = (("Nome do Índice", 80, "LEFT"), ("Resultado", 45, "LEFT"), ("Hora", 25, "CENTER"), ("Data", 25, "CENTER"))
+# Linhas por bloco desenhado; é o passo do progresso e do cancelamento.
+PDF_BATCH_ROWS = 500
+PDF_ROW_HEIGHT = 6
 
-    pdf = FPDF()
-    pdf.add_page()
-    
-    pdf.set_font("helvetica", "B", 16)
-    pdf.cell(0, 10, "Relatório de Índices - BoviCheck", ln=True, align='C')
-    pdf.ln(5)
+if FPDF_AVAILABLE:
+    class _ReportPDF(FPDF):
+        """Título na primeira página e cabeçalho das colunas repetido no topo de todas."""
 
-    pdf.set_font("helvetica", "B", 10)
-    col_widths = [80, 45, 25, 25]
-    header = ["Nome do Índice", "Resultado", "Hora", "Data"]
-    for i, item in enumerate(header):
-        pdf.cell(col_widths[i], 8, item, border=1, align='C')
-    pdf.ln()
+        def header(self):
+            if self.page_no() == 1:
+                self.set_font("helvetica", "B", 16)
+                self.cell(0, 10, "Relatório de Índices - BoviCheck", new_x="LMARGIN", new_y="NEXT", align='C')
+                self.ln(5)
+            self.set_font("helvetica", "B", 10)
+            for title, width, _ in PDF_COLUMNS:
+                self.cell(width, 8, title, border=1, align='C')
+            self.ln()
+            self.set_font("helvetica", "", 9)
 
+        def footer(self):
+            self.set_y(-12)
+            self.set_font("helvetica", "I", 8)
+            self.set_text_color(128)
+            self.cell(0, 8, f"Página {self.page_no()}", align='C')
+            self.set_text_color(0)
+            self.set_font("helvetica", "", 9)
+
+def _draw_wrapped_rows(pdf, rows: list, widths: tuple, aligns: tuple):
+    """Linhas com texto longo vão pela API de tabelas do fpdf2, que quebra o texto e não divide a linha entre páginas."""
+    if not rows:
+        return
+    # O cabeçalho das colunas sai do header() da página, então a tabela entra sem linha de títulos.
+    with pdf.table(col_widths=widths, width=sum(widths), align="LEFT", text_align=aligns,
+                   first_row_as_headings=False, line_height=PDF_ROW_HEIGHT) as table:
+        for row in rows:
+            table.row(row)
+    rows.clear()
+
+def write_pdf(indices_data: dict, selected_names: list[str], destination, progress=None, cancel=None) -> bool:
+    """Gera o relatório paginado, com o cabeçalho das colunas em toda página, e grava em `destination`
+    (caminho ou arquivo aberto).
+
+    `progress(feitas, total)` é chamado a cada bloco de PDF_BATCH_ROWS linhas; se o `cancel`
+    (threading.Event) for acionado, para no bloco seguinte sem gravar nada e retorna False.
+    """
+    if not FPDF_AVAILABLE:
+        return False
+
+    indices_to_export = sorted(name for name in selected_names if name in indices_data)
+    total = sum(len(indices_data.get(name, [])) for name in indices_to_export)
+    rows = (
+        (name, str(result.get("Resultado", "N/A")), str(result.get("Hora", "N/A")), str(result.get("Data", "N/A")))
+        for name in indices_to_export for result in indices_data.get(name, [])
+    )
+
+    pdf = _ReportPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    widths = tuple(width for _, width, _ in PDF_COLUMNS)
+    aligns = tuple(align for _, _, align in PDF_COLUMNS)
+    cell_aligns = tuple(align[0] for align in aligns)
+    # Margem interna da célula dos dois lados: o texto que passa disso quebraria linha.
+    limits = tuple(width - 2 * pdf.c_margin for width in widths)
     pdf.set_font("helvetica", "", 9)
-    indices_to_export = sorted([name for name in selected_names if name in indices_data])
+    done = 0
+    if progress:
+        progress(0, total)
+    while chunk := list(islice(rows, PDF_BATCH_ROWS)):
+        if cancel is not None and cancel.is_set():
+            return False
+        wrapped = []
+        for row in chunk:
+            if all(pdf.get_string_width(value) <= limit for value, limit in zip(row, limits)):
+                _draw_wrapped_rows(pdf, wrapped, widths, aligns)
+                # Linha de uma altura só: cell() é bem mais barato que a tabela e quebra a página sozinho.
+                for value, width, align in zip(row, widths, cell_aligns):
+                    pdf.cell(width, PDF_ROW_HEIGHT, value, border=1, align=align)
+                pdf.ln()
+            else:
+                wrapped.append(row)
+        _draw_wrapped_rows(pdf, wrapped, widths, aligns)
+        done += len(chunk)
+        if progress:
+            progress(done, total)
 
-    for name in indices_to_export:
-        for result in indices_data.get(name, []):
-            row = [
-                name,
-                result.get("Resultado", "N/A"),
-                result.get("Hora", "N/A"),
-                result.get("Data", "N/A")
-            ]
-            y_before = pdf.get_y()
-            pdf.multi_cell(col_widths[0], 6, row[0], border='L', align='L')
-            x_after_multi_cell = pdf.get_x()
-            y_after_multi_cell = pdf.get_y()
-            
-            pdf.set_xy(x_after_multi_cell + col_widths[0], y_before)
-            
-            pdf.cell(col_widths[1], (y_after_multi_cell - y_before), row[1], border=0)
-            pdf.cell(col_widths[2], (y_after_multi_cell - y_before), row[2], border=0, align='C')
-            pdf.cell(col_widths[3], (y_after_multi_cell - y_before), row[3], border='R', align='C')
-            pdf.ln()
-
-    pdf.cell(sum(col_widths), 0, '', 'T')
     pdf.ln(10)
-
     pdf.set_font("helvetica", "I", 8)
     pdf.set_text_color(128)
     pdf.cell(0, 10, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')} com BoviCheck v{VERSION_NUMBER}", align='C')
+    if cancel is not None and cancel.is_set():
+        return False
+    pdf.output(destination)
+    return True
 
-    return pdf.output(dest='S').encode('latin-1')
\ No newline at end of file
+def generate_pdf_bytes(indices_data: dict, selected_names: list[str]) -> bytes | None:
+    with io.BytesIO() as pdf_bytes_io:
+        if not write_pdf(indices_data, selected_names, pdf_bytes_io):
+            return None
+        return pdf_bytes_io.getvalue()
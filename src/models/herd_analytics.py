@@ -0,0 +1,207 @@
+from utils.dates import parse_date_array, parse_date_ordinal
+from utils.helpers import parse_number_array
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+HERD_EVENTS = ("animal_add", "animal_add_many", "animal_update", "animal_delete", "reset")
+PERCENTILES = (("p25", 0.25), ("mediana", 0.5), ("p75", 0.75))
+
+def _weighings_signature(animal) -> tuple:
+    return tuple((item.get("data"), item.get("peso")) for item in animal.get("historico_pesagens") or [])
+
+def _parse_weighing(data, peso) -> tuple[int, float] | None:
+    # Estrito como o parse_date_array do caminho NumPy: o GMD não depende de o NumPy estar instalado.
+    ordinal = parse_date_ordinal(data, strict=True)
+    try:
+        peso = float(str(peso).strip().replace(",", "."))
+    except ValueError:
+        return None
+    if ordinal is None or peso != peso or peso < 0:
+        return None
+    return ordinal, peso
+
+class HerdAnalytics:
+    """GMD de cada animal a partir de `historico_pesagens`, calculado em lote e guardado até as pesagens do animal mudarem."""
+
+    def __init__(self, app_state):
+        self.app_state = app_state
+        self._cache = {}  # id do animal -> (assinatura das pesagens, resultado)
+        app_state.subscribe(self._handle_herd_changed, kinds=HERD_EVENTS)
+
+    def _handle_herd_changed(self, event):
+        if event.kind == "reset" or event.kind == "batch" and "reset" in event.data["kinds"]:
+            self._cache.clear()
+            return
+        if event.kind in ("batch", "animal_add_many"):
+            for animal_id in event.animal_ids:
+                self._cache.pop(animal_id, None)
+            return
+        animal_id = event.data.get("animal_id") or event.data["animal"].get("id")
+        cached = self._cache.get(animal_id)
+        if cached is None:
+            return
+        animal = event.data.get("animal")
+        if animal is None or _weighings_signature(animal) != cached[0]:
+            del self._cache[animal_id]
+
+    def animal_gmd(self, animal_id: str) -> dict | None:
+        """GMD do animal: {'gmd_periodo', 'dias', 'peso_inicial', 'peso_final', 'intervalos': [{'inicio', 'fim', 'dias', 'gmd'}]}."""
+        animal, _ = self.app_state.get_animal_by_id(animal_id)
+        if animal is None:
+            return None
+        if animal_id not in self._cache:
+            self._compute([animal])
+        return self._cache[animal_id][1]
+
+    def herd_gmd(self) -> dict[str, dict]:
+        """GMD de todo o rebanho (id -> resultado de animal_gmd); só os animais alterados são recalculados."""
+        stale = [animal for animal in self.app_state.herd if animal.get("id") not in self._cache]
+        if stale:
+            self._compute(stale)
+        return {animal.get("id"): self._cache[animal.get("id")][1] for animal in self.app_state.herd}
+
+    def lot_distribution(self) -> dict[str, dict]:
+        """Distribuição do GMD do período por lote: animais, média, desvio, mínimo, quartis e máximo."""
+        results = self.herd_gmd()
+        lots, values = [], []
+        for animal in self.app_state.herd:
+            gmd = results[animal.get("id")]["gmd_periodo"]
+            if gmd is not None:
+                lots.append(animal.get("lote_atual") or "Sem lote")
+                values.append(gmd)
+        if not values:
+            return {}
+        if NUMPY_AVAILABLE:
+            return _lot_distribution_arrays(lots, values)
+        groups = {}
+        for lot, gmd in zip(lots, values):
+            groups.setdefault(lot, []).append(gmd)
+        return {lot: _distribution(sorted(gmds)) for lot, gmds in sorted(groups.items())}
+
+    def _compute(self, animals: list):
+        signatures = [_weighings_signature(animal) for animal in animals]
+        owners, raw_dates, raw_weights = [], [], []
+        for position, signature in enumerate(signatures):
+            if signature:
+                owners.extend([position] * len(signature))
+                dates, weights = zip(*signature)
+                raw_dates.extend(dates)
+                raw_weights.extend(weights)
+
+        if NUMPY_AVAILABLE:
+            results = _gmd_arrays(len(animals), owners, raw_dates, raw_weights)
+        else:
+            results = _gmd_rows(len(animals), owners, raw_dates, raw_weights)
+        for animal, signature, result in zip(animals, signatures, results):
+            self._cache[animal.get("id")] = (signature, result)
+
+def _empty_result() -> dict:
+    return {"gmd_periodo": None, "dias": 0, "peso_inicial": None, "peso_final": None, "intervalos": []}
+
+def _gmd_arrays(count: int, owners: list, raw_dates: list, raw_weights: list) -> list[dict]:
+    results = [_empty_result() for _ in range(count)]
+    if not owners:
+        return results
+    parsed_dates, bad_dates = parse_date_array(np.asarray(raw_dates, dtype=object).astype(str))
+    weights, bad_weights = parse_number_array(np.asarray(raw_weights, dtype=object).astype(str))
+    keep = np.flatnonzero(~(bad_dates | bad_weights))
+    owner = np.asarray(owners)[keep]
+    days = parsed_dates[keep].astype(np.int64)
+    order = np.lexsort((days, owner))
+    owner, day, weight = owner[order], days[order], weights[keep][order]
+    if not len(owner):
+        return results
+    dates = [raw_dates[i] for i in keep[order].tolist()]
+
+    # Intervalo i vai da pesagem i à i+1; só vale dentro do mesmo animal e com dias > 0.
+    interval_days = np.diff(day)
+    valid = (owner[1:] == owner[:-1]) & (interval_days > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        interval_gmd = np.where(valid, np.diff(weight) / interval_days, np.nan)
+
+    starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+    ends = np.r_[starts[1:] - 1, len(owner) - 1]
+    period_days = day[ends] - day[starts]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        period_gmd = np.where(period_days > 0, (weight[ends] - weight[starts]) / period_days, np.nan)
+
+    valid_intervals = np.flatnonzero(valid)
+    interval_owner = owner[valid_intervals].tolist()
+    interval_rows = zip(valid_intervals.tolist(), interval_days[valid_intervals].tolist(), interval_gmd[valid_intervals].tolist())
+    for position, (i, dias, gmd) in zip(interval_owner, interval_rows):
+        results[position]["intervalos"].append({"inicio": dates[i], "fim": dates[i + 1], "dias": dias, "gmd": gmd})
+
+    for position, start, end, dias, gmd in zip(
+        owner[starts].tolist(), starts.tolist(), ends.tolist(), period_days.tolist(), period_gmd.tolist()
+    ):
+        result = results[position]
+        result["peso_inicial"], result["peso_final"] = float(weight[start]), float(weight[end])
+        if dias > 0:
+            result["gmd_periodo"], result["dias"] = gmd, dias
+    return results
+
+def _gmd_rows(count: int, owners: list, raw_dates: list, raw_weights: list) -> list[dict]:
+    """Alternativa sem NumPy, animal por animal."""
+    results = [_empty_result() for _ in range(count)]
+    by_owner = {}
+    for position, data, peso in zip(owners, raw_dates, raw_weights):
+        parsed = _parse_weighing(data, peso)
+        if parsed is not None:
+            by_owner.setdefault(position, []).append((*parsed, data))
+    for rows in by_owner.values():
+        rows.sort(key=lambda row: row[0])
+    for position, rows in by_owner.items():
+        result = results[position]
+        for (day_a, weight_a, date_a), (day_b, weight_b, date_b) in zip(rows, rows[1:]):
+            if day_b > day_a:
+                result["intervalos"].append({"inicio": date_a, "fim": date_b, "dias": day_b - day_a, "gmd": (weight_b - weight_a) / (day_b - day_a)})
+        result["peso_inicial"], result["peso_final"] = rows[0][1], rows[-1][1]
+        dias = rows[-1][0] - rows[0][0]
+        if dias > 0:
+            result["gmd_periodo"], result["dias"] = (rows[-1][1] - rows[0][1]) / dias, dias
+    return results
+
+def _lot_distribution_arrays(lots: list, values: list) -> dict[str, dict]:
+    names, lot_ids = np.unique(np.asarray(lots, dtype=str), return_inverse=True)
+    gmd = np.asarray(values, dtype=float)
+    order = np.lexsort((gmd, lot_ids))
+    lot_ids, gmd = lot_ids[order], gmd[order]
+
+    starts = np.flatnonzero(np.r_[True, lot_ids[1:] != lot_ids[:-1]])
+    counts = np.diff(np.r_[starts, len(gmd)])
+    ends = starts + counts - 1
+    means = np.add.reduceat(gmd, starts) / counts
+    deviations = np.sqrt(np.maximum(np.add.reduceat(gmd * gmd, starts) / counts - means * means, 0.0))
+    stats = {"animais": counts, "media": means, "desvio": deviations, "min": gmd[starts], "max": gmd[ends]}
+    for key, q in PERCENTILES:
+        position = (counts - 1) * q
+        low = np.floor(position).astype(int)
+        high = np.minimum(low + 1, counts - 1)
+        stats[key] = gmd[starts + low] + (gmd[starts + high] - gmd[starts + low]) * (position - low)
+
+    columns = {key: column.tolist() for key, column in stats.items()}
+    return {
+        str(names[lot_ids[start]]): {key: column[group] for key, column in columns.items()}
+        for group, start in enumerate(starts.tolist())
+    }
+
+def _distribution(values: list) -> dict:
+    count = len(values)
+    mean = sum(values) / count
+    stats = {
+        "animais": count,
+        "media": mean,
+        "desvio": max(sum(value * value for value in values) / count - mean * mean, 0.0) ** 0.5,
+        "min": values[0],
+        "max": values[-1],
+    }
+    for key, q in PERCENTILES:
+        position = (count - 1) * q
+        low = int(position)
+        high = min(low + 1, count - 1)
+        stats[key] = values[low] + (values[high] - values[low]) * (position - low)
+    return stats
@@ -0,0 +1,112 @@
+import bisect
+
+SEARCH_FIELDS = ("brinco_interno", "nome", "lote_atual")
+HASH_FIELDS = ("lote_atual", "status_animal", "sexo", "raca")
+NGRAM_SIZE = 3
+
+class HerdIndex:
+    """Índices secundários do rebanho: brinco ordenado, campos categóricos e n-gramas para busca."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._by_brinco = []  # (brinco_interno, id), sempre ordenada
+        self._entries = {}  # id -> (brinco_interno, texto de busca, valores dos campos categóricos)
+        self._hash = {field: {} for field in HASH_FIELDS}
+        self._ngrams = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self, herd: list[dict]):
+        self.clear()
+        for animal in herd:
+            if animal.get("id") not in self._entries:
+                self._index(animal)
+        self._by_brinco = sorted((entry[0], animal_id) for animal_id, entry in self._entries.items())
+
+    def add(self, animal: dict):
+        animal_id = animal.get("id")
+        self.remove(animal_id)
+        brinco = self._index(animal)
+        bisect.insort(self._by_brinco, (brinco, animal_id))
+
+    def remove(self, animal_id: str):
+        entry = self._entries.pop(animal_id, None)
+        if entry is None:
+            return
+        brinco, text, values = entry
+        position = bisect.bisect_left(self._by_brinco, (brinco, animal_id))
+        if position < len(self._by_brinco) and self._by_brinco[position] == (brinco, animal_id):
+            self._by_brinco.pop(position)
+        for field, value in zip(HASH_FIELDS, values):
+            self._discard(self._hash[field], value, animal_id)
+        for gram in _ngrams(text):
+            self._discard(self._ngrams, gram, animal_id)
+
+    def find_by_brinco(self, brinco: str) -> list[str]:
+        start = bisect.bisect_left(self._by_brinco, (brinco,))
+        ids = []
+        for entry_brinco, animal_id in self._by_brinco[start:]:
+            if entry_brinco != brinco:
+                break
+            ids.append(animal_id)
+        return ids
+
+    def matches(self, animal_id: str, query: str = "") -> bool:
+        """Se o animal aparece em search(query), sem percorrer o rebanho."""
+        entry = self._entries.get(animal_id)
+        return entry is not None and query.lower().strip() in entry[1]
+
+    def values(self, field: str) -> list:
+        return sorted(value for value in self._hash[field] if value)
+
+    def search(self, query: str = "", **filters) -> list[str]:
+        """Retorna os ids que contêm `query` (brinco, nome ou lote) e atendem aos filtros, ordenados por brinco."""
+        candidates = None
+        for field, value in filters.items():
+            ids = self._hash[field].get(value, set())
+            candidates = ids if candidates is None else candidates & ids
+
+        query = query.lower().strip()
+        if query:
+            if len(query) >= NGRAM_SIZE:
+                grams = sorted(_ngrams(query), key=lambda gram: len(self._ngrams.get(gram, ())))
+                for gram in grams:
+                    ids = self._ngrams.get(gram, set())
+                    candidates = ids if candidates is None else candidates & ids
+                    if not candidates:
+                        break
+            # Os n-gramas só reduzem os candidatos; a substring é confirmada no texto.
+            pool = self._entries if candidates is None else candidates
+            candidates = {animal_id for animal_id in pool if query in self._entries[animal_id][1]}
+
+        if candidates is None:
+            return [animal_id for _, animal_id in self._by_brinco]
+        if len(candidates) * 8 < len(self._by_brinco):
+            return sorted(candidates, key=lambda animal_id: (self._entries[animal_id][0], animal_id))
+        return [animal_id for _, animal_id in self._by_brinco if animal_id in candidates]
+
+    def _index(self, animal: dict) -> str:
+        animal_id = animal.get("id")
+        brinco = animal.get("brinco_interno") or ""
+        text = "\n".join(str(animal.get(field) or "").lower() for field in SEARCH_FIELDS)
+        values = tuple(animal.get(field) for field in HASH_FIELDS)
+        self._entries[animal_id] = (brinco, text, values)
+        for field, value in zip(HASH_FIELDS, values):
+            self._hash[field].setdefault(value, set()).add(animal_id)
+        for gram in _ngrams(text):
+            self._ngrams.setdefault(gram, set()).add(animal_id)
+        return brinco
+
+    @staticmethod
+    def _discard(index: dict, key, animal_id: str):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(animal_id)
+            if not ids:
+                del index[key]
+
+def _ngrams(text: str) -> set[str]:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
@@ -0,0 +1,80 @@
+class IndexAggregates:
+    """Contagem, mínimo, máximo e média de cada índice, atualizados a cada inclusão ou remoção.
+
+    Soma e contagem mudam em O(1). Remover o valor que era o mínimo ou o máximo só marca o
+    extremo como desatualizado; ele é recalculado de `source(índice)` na próxima consulta.
+    """
+
+    def __init__(self, source=None):
+        self._source = source  # índice -> lista de cálculos atual
+        self.clear()
+
+    def clear(self):
+        self._stats = {}  # índice -> [contagem, soma, mínimo, máximo]
+        self._stale = set()
+
+    def rebuild(self, calculated_indices: dict):
+        self.clear()
+        for index_name, results in calculated_indices.items():
+            self.rebuild_index(index_name, results)
+
+    def rebuild_index(self, index_name: str, results: list):
+        self.drop(index_name)
+        values = [calc.get("valor") for calc in results if calc.get("valor") is not None]
+        if values:
+            self._stats[index_name] = [len(values), sum(values), min(values), max(values)]
+
+    def add(self, index_name: str, valor: float | None):
+        if valor is None:
+            return
+        stats = self._stats.get(index_name)
+        if stats is None:
+            self._stats[index_name] = [1, valor, valor, valor]
+            return
+        stats[0] += 1
+        stats[1] += valor
+        if valor < stats[2]:
+            stats[2] = valor
+        if valor > stats[3]:
+            stats[3] = valor
+
+    def add_many(self, index_name: str, valores: list):
+        valores = [valor for valor in valores if valor is not None]
+        if not valores:
+            return
+        low, high = min(valores), max(valores)
+        stats = self._stats.get(index_name)
+        if stats is None:
+            self._stats[index_name] = [len(valores), sum(valores), low, high]
+            return
+        stats[0] += len(valores)
+        stats[1] += sum(valores)
+        stats[2] = min(stats[2], low)
+        stats[3] = max(stats[3], high)
+
+    def remove(self, index_name: str, valor: float | None):
+        stats = self._stats.get(index_name)
+        if valor is None or stats is None:
+            return
+        if stats[0] <= 1:
+            self.drop(index_name)
+            return
+        stats[0] -= 1
+        stats[1] -= valor
+        if valor <= stats[2] or valor >= stats[3]:
+            self._stale.add(index_name)
+
+    def drop(self, index_name: str):
+        self._stats.pop(index_name, None)
+        self._stale.discard(index_name)
+
+    def stats(self, index_name: str) -> dict:
+        if index_name in self._stale:
+            self._stale.discard(index_name)
+            if self._source is not None:
+                self.rebuild_index(index_name, self._source(index_name))
+        stats = self._stats.get(index_name)
+        if not stats:
+            return {"min": None, "max": None, "mean": None, "numeric_count": 0}
+        count, total, low, high = stats
+        return {"min": low, "max": high, "mean": total / count, "numeric_count": count}
@@ -0,0 +1,245 @@
+import heapq
+from collections import deque
+
+class PedigreeIndex:
+    """Grafo de parentesco por brinco (id_mae / id_pai), com parentesco e endogamia memorizados.
+
+    Pais citados que não estão no rebanho (ex.: touro de central) entram como fundadores, então
+    meio-irmãos por um mesmo touro externo continuam aparentados. Tudo é iterativo: rebanhos
+    grandes não esbarram no limite de recursão.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._entries = {}  # id do animal -> (brinco, mãe, pai)
+        self._ids_by_brinco = {}  # brinco -> {id: None}, na ordem de inclusão
+        self._parents = {}  # brinco -> (mãe, pai) do primeiro animal com esse brinco
+        self._children = {}  # brinco -> {brincos dos filhos}
+        # Memórias por brinco, descartadas para o animal e a descendência quando a filiação muda.
+        self._depth = {}
+        self._known = {}  # pais válidos para o cálculo (sem ciclos)
+        self._inbreeding = {}
+        self._variance = {}  # variância mendeliana d = 0.5 - 0.25 (F_mãe + F_pai)
+        self._kinship = {}
+        self._kinship_keys = {}  # brinco -> chaves de _kinship que o envolvem
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self, herd: list[dict]):
+        self.clear()
+        for animal in herd:
+            if animal.get("id") not in self._entries:
+                self._index(animal)
+
+    def add(self, animal: dict):
+        animal_id = animal.get("id")
+        entry = _entry(animal)
+        if self._entries.get(animal_id) == entry:
+            return
+        self.remove(animal_id)
+        self._index(animal)
+
+    def remove(self, animal_id: str):
+        entry = self._entries.pop(animal_id, None)
+        if entry is None:
+            return
+        brinco = entry[0]
+        if not brinco:
+            return
+        ids = self._ids_by_brinco[brinco]
+        del ids[animal_id]
+        if not ids:
+            del self._ids_by_brinco[brinco]
+        self._sync_parents(brinco)
+
+    def animal_ids(self, brinco: str) -> list[str]:
+        return list(self._ids_by_brinco.get(brinco, ()))
+
+    def parents(self, brinco: str) -> tuple[str | None, str | None]:
+        return self._parents.get(brinco, (None, None))
+
+    def offspring(self, brinco: str) -> list[str]:
+        return sorted(self._children.get(brinco, ()))
+
+    def ancestors(self, brinco: str, max_generations: int | None = None) -> dict[str, int]:
+        """Ancestrais de `brinco` -> geração mais próxima em que aparecem (1 = pais)."""
+        return self._walk(brinco, lambda node: [p for p in self.parents(node) if p], max_generations)
+
+    def descendants(self, brinco: str, max_generations: int | None = None) -> dict[str, int]:
+        """Descendentes de `brinco` -> geração mais próxima (1 = filhos)."""
+        return self._walk(brinco, lambda node: self._children.get(node, ()), max_generations)
+
+    def kinship(self, a: str, b: str) -> float:
+        """Coeficiente de parentesco (coancestria) entre dois brincos = endogamia de um filho hipotético deles."""
+        if not a or not b:
+            return 0.0
+        key = _pair(a, b)
+        if key not in self._kinship:
+            # A endogamia de cada ancestral entra no cálculo; garante todas, dos mais antigos para os mais novos.
+            pending = {a, b} | self.ancestors(a).keys() | self.ancestors(b).keys()
+            self._fill_inbreeding(sorted(pending, key=self._get_depth))
+            self._store(key, self._meuwissen_luo(a, b))
+        return self._kinship[key]
+
+    def inbreeding(self, brinco: str) -> float:
+        mae, pai = self._known_parents(brinco)
+        return self.kinship(mae, pai) if mae and pai else 0.0
+
+    def bulk_inbreeding(self, brincos=None) -> dict[str, float]:
+        """Endogamia de vários animais (todos por padrão), calculada em ordem de geração para reaproveitar a memória."""
+        nodes = set(self._ids_by_brinco) | self._children.keys()
+        self._fill_inbreeding(sorted(nodes, key=self._get_depth))
+        wanted = self._ids_by_brinco if brincos is None else brincos
+        return {brinco: self._node_inbreeding(brinco) for brinco in wanted}
+
+    def _fill_inbreeding(self, nodes_by_depth: list[str]):
+        for node in nodes_by_depth:
+            mae, pai = self._known_parents(node)
+            if mae and pai and _pair(mae, pai) not in self._kinship:
+                self._store(_pair(mae, pai), self._meuwissen_luo(mae, pai))
+
+    def _node_inbreeding(self, brinco: str) -> float:
+        value = self._inbreeding.get(brinco)
+        if value is None:
+            mae, pai = self._known_parents(brinco)
+            value = self._inbreeding[brinco] = self._kinship[_pair(mae, pai)] if mae and pai else 0.0
+        return value
+
+    def _meuwissen_luo(self, sire: str, dam: str) -> float:
+        """Endogamia de um filho de `sire` x `dam` pelo método de Meuwissen & Luo (1992).
+
+        Percorre os ancestrais do mais novo para o mais antigo acumulando a linha de L
+        (A = L D L'); exige a endogamia de todos os ancestrais já memorizada.
+        """
+        contributions = {}
+        heap = []
+        for parent in (sire, dam):
+            if parent not in contributions:
+                contributions[parent] = 0.0
+                heapq.heappush(heap, (-self._get_depth(parent), parent))
+            contributions[parent] += 0.5
+
+        total = 0.0
+        depth, known_parents, variance = self._depth, self._known_parents, self._mendelian_variance
+        while heap:
+            _, node = heapq.heappop(heap)
+            share = contributions.pop(node)
+            total += share * share * variance(node)
+            for parent in known_parents(node):
+                if parent:
+                    if parent not in contributions:
+                        contributions[parent] = 0.0
+                        heapq.heappush(heap, (-depth[parent], parent))
+                    contributions[parent] += 0.5 * share
+        # O próprio filho entra com L = 1 e variância 0.5 - 0.25 (F_pai + F_mãe).
+        own = 0.5 - 0.25 * (self._node_inbreeding(sire) + self._node_inbreeding(dam))
+        return total + own - 1.0
+
+    def _mendelian_variance(self, brinco: str) -> float:
+        value = self._variance.get(brinco)
+        if value is None:
+            # Pai desconhecido conta como F = -1 (d = 1 para fundadores).
+            mae, pai = self._known_parents(brinco)
+            f_mae = self._node_inbreeding(mae) if mae else -1.0
+            f_pai = self._node_inbreeding(pai) if pai else -1.0
+            value = self._variance[brinco] = 0.5 - 0.25 * (f_mae + f_pai)
+        return value
+
+    def _walk(self, start: str, neighbours, max_generations: int | None) -> dict[str, int]:
+        found = {}
+        queue = deque([(start, 0)])
+        while queue:
+            node, generation = queue.popleft()
+            if max_generations is not None and generation >= max_generations:
+                continue
+            for neighbour in neighbours(node):
+                if neighbour not in found and neighbour != start:
+                    found[neighbour] = generation + 1
+                    queue.append((neighbour, generation + 1))
+        return found
+
+    def _known_parents(self, brinco: str) -> tuple[str | None, str | None]:
+        """Pais usados no cálculo; ligações que formariam ciclo (dados inconsistentes) são ignoradas."""
+        known = self._known.get(brinco)
+        if known is None:
+            depth = self._get_depth(brinco)
+            known = self._known[brinco] = tuple(
+                parent if parent and self._get_depth(parent) < depth else None for parent in self.parents(brinco)
+            )
+        return known
+
+    def _get_depth(self, brinco: str) -> int:
+        """Profundidade no pedigree (fundadores = 0), calculada com pilha explícita."""
+        depth = self._depth.get(brinco)
+        if depth is not None:
+            return depth
+        stack, visiting = [brinco], set()
+        while stack:
+            node = stack[-1]
+            if node in self._depth:
+                stack.pop()
+                continue
+            visiting.add(node)
+            pending = [p for p in self.parents(node) if p and p not in self._depth and p not in visiting]
+            if pending:
+                stack.extend(pending)
+                continue
+            # Pais ainda em `visiting` fecham um ciclo e não contam.
+            self._depth[node] = 1 + max((self._depth[p] for p in self.parents(node) if p in self._depth), default=-1)
+            visiting.discard(node)
+            stack.pop()
+        return self._depth[brinco]
+
+    def _store(self, key: tuple[str, str], value: float):
+        self._kinship[key] = value
+        self._kinship_keys.setdefault(key[0], []).append(key)
+        if key[1] != key[0]:
+            self._kinship_keys.setdefault(key[1], []).append(key)
+
+    def _index(self, animal: dict):
+        entry = _entry(animal)
+        self._entries[animal.get("id")] = entry
+        if entry[0]:
+            self._ids_by_brinco.setdefault(entry[0], {})[animal.get("id")] = None
+            self._sync_parents(entry[0])
+
+    def _sync_parents(self, brinco: str):
+        ids = self._ids_by_brinco.get(brinco)
+        new_parents = self._entries[next(iter(ids))][1:] if ids else (None, None)
+        old_parents = self._parents.get(brinco, (None, None))
+        if new_parents == old_parents:
+            return
+        # Parentesco e profundidade do animal e de toda a descendência deixam de valer.
+        if self._depth:
+            self._invalidate([brinco, *self.descendants(brinco)])
+        for parent in old_parents:
+            if parent:
+                children = self._children[parent]
+                children.discard(brinco)
+                if not children:
+                    del self._children[parent]
+        for parent in new_parents:
+            if parent:
+                self._children.setdefault(parent, set()).add(brinco)
+        if new_parents == (None, None):
+            self._parents.pop(brinco, None)
+        else:
+            self._parents[brinco] = new_parents
+
+    def _invalidate(self, brincos):
+        for brinco in brincos:
+            for memo in (self._depth, self._known, self._inbreeding, self._variance):
+                memo.pop(brinco, None)
+            for key in self._kinship_keys.pop(brinco, ()):
+                self._kinship.pop(key, None)
+
+def _entry(animal: dict) -> tuple[str, str | None, str | None]:
+    def clean(value):
+        return str(value).strip() or None if value is not None else None
+    return (clean(animal.get("brinco_interno")) or "", clean(animal.get("id_mae")), clean(animal.get("id_pai")))
+
+def _pair(a: str, b: str) -> tuple[str, str]:
+    return (a, b) if a <= b else (b, a)
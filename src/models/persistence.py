@@ -1,22 +1,246 @@
+import atexit
 import json
 import os
-from .app_state import AppState
+import threading
+import time
+from .app_state import AppState, SHARDS, OP_SHARDS
+from .sqlite_store import SQLiteStore, DB_FILENAME
+from .records import encode_record
 
-DATA_FILENAME = "bovicheck_data.json"
+SHARDS_DIRNAME = "bovicheck_data"
+JOURNAL_FILENAME = "journal.jsonl"
+CHATS_DIRNAME = "chats"
+LEGACY_DATA_FILENAME = "bovicheck_data.json"
+LEGACY_JOURNAL_FILENAME = "bovicheck_data.journal"
+MIGRATED_SUFFIX = ".migrated"
+BACKUP_MANIFEST_FILENAME = "bovicheck_backup_manifest.json"
+
+# "json" (arquivos por domínio + journal) ou "sqlite" (tabelas indexadas).
+STORAGE_BACKEND = os.getenv("BOVICHECK_STORAGE_BACKEND", "json").lower()
+
+JOURNAL_ENABLED = True
+JOURNAL_COMPACT_THRESHOLD = 256 * 1024
+
+# Janela em que várias chamadas a save_state são agrupadas numa única gravação.
+WRITE_COALESCE_WINDOW = float(os.getenv("BOVICHECK_WRITE_COALESCE_MS", "400")) / 1000
+# Gravações que falham (disco cheio, pasta sem permissão) são repetidas com espera dobrando até
+# WRITE_RETRY_MAX_DELAY; depois de WRITE_MAX_RETRIES falhas seguidas o gravador avisa e espera o próximo save_state.
+WRITE_MAX_RETRIES = 5
+WRITE_RETRY_MAX_DELAY = 30.0
+
+_journal_lock = threading.Lock()
+_store = None
+
+class _BackgroundWriter:
+    def __init__(self):
+        self._state = None
+        self._compact_requested = False
+        self._dirty = threading.Event()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._failures = 0
+        self.on_failure = None
+
+    def mark_dirty(self, state: AppState, compact: bool = False):
+        self._state = state
+        self._compact_requested = self._compact_requested or compact
+        self._dirty.set()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="bovicheck-writer", daemon=True)
+            self._thread.start()
+
+    def flush(self):
+        if self._state is None:
+            return
+        self._dirty.clear()
+        with self._write_lock:
+            _write_state(self._state, allow_compaction=False)
+
+    def _run(self):
+        while True:
+            self._dirty.wait()
+            time.sleep(WRITE_COALESCE_WINDOW)
+            self._dirty.clear()
+            compact, self._compact_requested = self._compact_requested, False
+            with self._write_lock:
+                written = _write_state(self._state, allow_compaction=True, force_compaction=compact)
+            if written:
+                self._failures = 0
+                continue
+            self._failures += 1
+            if self._failures >= WRITE_MAX_RETRIES:
+                self._failures = 0
+                if self.on_failure:
+                    self.on_failure()
+                continue
+            time.sleep(min(WRITE_RETRY_MAX_DELAY, WRITE_COALESCE_WINDOW * 2 ** self._failures))
+            self._dirty.set()
+
+_writer = _BackgroundWriter()
 
 def save_state(state: AppState):
-    data_dir = _get_data_dir()
-    filepath = os.path.join(data_dir, DATA_FILENAME)
-    data_to_save = state.to_dict()
-    _save_json(filepath, data_to_save)
+    _writer.mark_dirty(state)
+
+def flush():
+    _writer.flush()
+
+def set_write_failure_handler(handler):
+    """`handler()` é chamado (na thread do gravador) quando as tentativas de gravação se esgotam."""
+    _writer.on_failure = handler
+
+atexit.register(flush)
 
-def load_state(state: AppState):
+def load_state(state: AppState, on_settings_loaded=None):
+    if STORAGE_BACKEND == "sqlite":
+        _load_from_store(state)
+        if on_settings_loaded:
+            on_settings_loaded()
+        return
+    _load_from_json(state, on_settings_loaded)
+
+def _write_state(state: AppState, allow_compaction: bool, force_compaction: bool = False) -> bool:
+    if _store is not None:
+        return _save_to_store(state)
+
+    shards_dir = os.path.join(_get_data_dir(), SHARDS_DIRNAME)
+    journal_path = os.path.join(shards_dir, JOURNAL_FILENAME)
+
+    if not JOURNAL_ENABLED or state.needs_full_save or not os.path.isdir(shards_dir):
+        state.drain_ops()
+        return _write_dirty_shards(state, shards_dir, journal_path, keep_journal_tail=False)
+
+    ops = state.drain_ops()
+    if ops:
+        journal_size = _append_journal(journal_path, ops)
+        if journal_size is None:
+            state.needs_full_save = True
+            return False
+    else:
+        journal_size = os.path.getsize(journal_path) if os.path.exists(journal_path) else 0
+
+    if allow_compaction and (force_compaction or journal_size > JOURNAL_COMPACT_THRESHOLD):
+        return _write_dirty_shards(state, shards_dir, journal_path, keep_journal_tail=True)
+    return True
+
+def _load_from_json(state: AppState, on_settings_loaded=None):
     data_dir = _get_data_dir()
-    filepath = os.path.join(data_dir, DATA_FILENAME)
-    
-    loaded_data = _load_json(filepath)
+    shards_dir = os.path.join(data_dir, SHARDS_DIRNAME)
+    if not os.path.isdir(shards_dir) and os.path.exists(os.path.join(data_dir, LEGACY_DATA_FILENAME)):
+        _migrate_legacy_file(state, data_dir)
+        if on_settings_loaded:
+            on_settings_loaded()
+        return
+
+    state.chat_body_loader = lambda chat_id: _load_chat_body(shards_dir, chat_id)
+    journal_path = os.path.join(shards_dir, JOURNAL_FILENAME)
+    pending_ops = {shard: [] for shard in SHARDS}
+    replayed = 0
+    for op in _read_journal(journal_path):
+        shard = OP_SHARDS.get(op.get("op"))
+        # "reset" afeta todos os shards de dados e é reaplicado junto com eles.
+        pending_ops["settings" if shard == "settings" else "indices"].append(op)
+        replayed += 1
+
+    # As configurações são aplicadas antes de o restante ser lido e interpretado.
+    state.load_shard("settings", _load_json(_shard_path(shards_dir, "settings")) or {})
+    with state.batch():
+        for op in pending_ops["settings"]:
+            state.apply_op(op)
+    if on_settings_loaded:
+        on_settings_loaded()
+
+    for shard in ("indices", "herd", "chats"):
+        shard_data = _load_json(_shard_path(shards_dir, shard))
+        if shard_data is not None:
+            state.load_shard(shard, shard_data)
+    with state.batch():
+        for op in pending_ops["indices"]:
+            state.apply_op(op)
+
+    if state.needs_full_save:
+        _write_dirty_shards(state, shards_dir, journal_path, keep_journal_tail=False)
+    elif replayed:
+        _writer.mark_dirty(state, compact=True)
+
+def _migrate_legacy_file(state: AppState, data_dir: str):
+    shards_dir = os.path.join(data_dir, SHARDS_DIRNAME)
+    state.chat_body_loader = lambda chat_id: _load_chat_body(shards_dir, chat_id)
+    legacy_path = os.path.join(data_dir, LEGACY_DATA_FILENAME)
+    legacy_journal_path = os.path.join(data_dir, LEGACY_JOURNAL_FILENAME)
+
+    loaded_data = _load_json(legacy_path)
     if loaded_data:
         state.from_dict(loaded_data)
+    with state.batch():
+        for op in _read_journal(legacy_journal_path):
+            state.apply_op(op)
+
+    state.drain_ops()
+    state.mark_shards_dirty(SHARDS)
+    if _write_dirty_shards(state, shards_dir, os.path.join(shards_dir, JOURNAL_FILENAME), keep_journal_tail=False):
+        for path in (legacy_path, legacy_journal_path):
+            if os.path.exists(path):
+                os.replace(path, path + MIGRATED_SUFFIX)
+
+def _load_from_store(state: AppState):
+    global _store
+    data_dir = _get_data_dir()
+    try:
+        _store = SQLiteStore(os.path.join(data_dir, DB_FILENAME))
+    except Exception as e:
+        print(f"Erro ao abrir banco SQLite, usando JSON: {e}")
+        _store = None
+        _load_from_json(state)
+        return
+
+    has_json_data = os.path.isdir(os.path.join(data_dir, SHARDS_DIRNAME)) or os.path.exists(os.path.join(data_dir, LEGACY_DATA_FILENAME))
+    if _store.is_empty() and has_json_data:
+        _migrate_json_to_store(state, data_dir)
+    else:
+        state.chat_body_loader = _store.chat_messages
+        _store.load_into(state)
+        if state.needs_full_save:
+            _save_to_store(state)
+
+def _migrate_json_to_store(state: AppState, data_dir: str):
+    _load_from_json(state)
+    state.drain_ops()
+    state.take_dirty_shards()
+    _store.import_state(state)
+    state.take_dirty_chat_bodies()
+    state.chat_body_loader = _store.chat_messages
+    state.needs_full_save = False
+    shards_dir = os.path.join(data_dir, SHARDS_DIRNAME)
+    if os.path.isdir(shards_dir):
+        os.replace(shards_dir, shards_dir + MIGRATED_SUFFIX)
+
+def _save_to_store(state: AppState) -> bool:
+    state.take_dirty_shards()
+    try:
+        if state.needs_full_save:
+            state.drain_ops()
+            _store.import_state(state)
+            state.needs_full_save = False
+        else:
+            _store.apply_ops(state.drain_ops())
+        state.take_dirty_chat_bodies()
+        return True
+    except Exception as e:
+        print(f"Erro ao salvar no banco SQLite: {e}")
+        state.needs_full_save = True
+        return False
+
+def load_backup_manifest() -> dict | None:
+    """Manifesto do último backup (base do próximo incremental); None se ainda não houve backup."""
+    manifest = _load_json(os.path.join(_get_data_dir(), BACKUP_MANIFEST_FILENAME))
+    return manifest if isinstance(manifest, dict) and manifest.get("backup_id") else None
+
+def has_backup_manifest() -> bool:
+    return os.path.exists(os.path.join(_get_data_dir(), BACKUP_MANIFEST_FILENAME))
+
+def save_backup_manifest(manifest: dict) -> bool:
+    content = json.dumps(manifest, ensure_ascii=False, separators=(",", ":"))
+    return _atomic_write(os.path.join(_get_data_dir(), BACKUP_MANIFEST_FILENAME), content)
 
 def _get_data_dir() -> str:
     if os.name == 'posix': # Android
@@ -25,13 +249,123 @@ def _get_data_dir() -> str:
     else: # Windows, etc.
         return "."
 
-def _save_json(filepath: str, data: dict):
+def _append_journal(journal_path: str, ops: list[dict]) -> int | None:
+    with _journal_lock:
+        try:
+            lines = "".join(json.dumps(op, ensure_ascii=False, default=encode_record) + "\n" for op in ops)
+            with open(journal_path, "a", encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+                return f.tell()
+        except Exception as e:
+            print(f"Erro ao gravar journal {journal_path}: {e}")
+            return None
+
+def _read_journal(journal_path: str):
+    if not os.path.exists(journal_path):
+        return
     try:
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, "w", encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        with open(journal_path, "r", encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Última linha truncada por uma gravação interrompida.
+                    return
+    except IOError as e:
+        print(f"Erro ao ler journal {journal_path}: {e}")
+
+def _shard_path(shards_dir: str, shard: str) -> str:
+    return os.path.join(shards_dir, f"{shard}.json")
+
+def _chat_body_path(shards_dir: str, chat_id: str) -> str:
+    return os.path.join(shards_dir, CHATS_DIRNAME, f"{chat_id}.json")
+
+def _load_chat_body(shards_dir: str, chat_id: str) -> list:
+    body = _load_json(_chat_body_path(shards_dir, chat_id))
+    return body.get("messages", []) if body else []
+
+def _write_dirty_shards(state: AppState, shards_dir: str, journal_path: str, keep_journal_tail: bool) -> bool:
+    with _journal_lock:
+        compacted_upto = os.path.getsize(journal_path) if os.path.exists(journal_path) else 0
+
+    dirty = state.take_dirty_shards()
+    chat_bodies = state.take_dirty_chat_bodies()
+
+    def requeue() -> bool:
+        state.mark_shards_dirty(dirty)
+        state.restore_chat_bodies(chat_bodies)
+        state.needs_full_save = state.needs_full_save or not keep_journal_tail
+        return False
+
+    try:
+        payloads = {
+            shard: json.dumps(state.shard_to_dict(shard, include_chat_bodies=False), ensure_ascii=False, default=encode_record)
+            for shard in dirty
+        }
+        body_payloads = {
+            chat_id: None if messages is None else json.dumps({"messages": messages}, ensure_ascii=False, default=encode_record)
+            for chat_id, messages in chat_bodies.items()
+        }
+    except RuntimeError:
+        # O estado mudou durante a serialização; tenta de novo na próxima gravação.
+        return requeue()
+
+    with _journal_lock:
+        try:
+            os.makedirs(os.path.join(shards_dir, CHATS_DIRNAME), exist_ok=True)
+        except OSError as e:
+            print(f"Erro ao criar {shards_dir}: {e}")
+        # As mensagens são gravadas antes dos cabeçalhos que as referenciam.
+        for chat_id, content in body_payloads.items():
+            body_path = _chat_body_path(shards_dir, chat_id)
+            if content is not None:
+                if not _atomic_write(body_path, content):
+                    return requeue()
+            elif os.path.exists(body_path):
+                try:
+                    os.remove(body_path)
+                except OSError as e:
+                    print(f"Erro ao remover {body_path}: {e}")
+        for shard, content in payloads.items():
+            if not _atomic_write(_shard_path(shards_dir, shard), content):
+                return requeue()
+        if not keep_journal_tail:
+            state.needs_full_save = False
+        if not os.path.exists(journal_path):
+            return True
+        try:
+            if not keep_journal_tail:
+                os.remove(journal_path)
+                return True
+            # As operações gravadas após o início da compactação são idempotentes
+            # e continuam no journal para serem reaplicadas sobre os novos shards.
+            with open(journal_path, "r", encoding='utf-8') as f:
+                f.seek(compacted_upto)
+                tail = f.read()
+            if tail:
+                _atomic_write(journal_path, tail)
+            else:
+                os.remove(journal_path)
+        except Exception as e:
+            print(f"Erro ao compactar journal {journal_path}: {e}")
+    return True
+
+def _atomic_write(filepath: str, content: str) -> bool:
+    tmp_path = f"{filepath}.tmp"
+    try:
+        with open(tmp_path, "w", encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+        return True
     except Exception as e:
         print(f"Erro ao salvar {filepath}: {e}")
+        return False
 
 def _load_json(filepath: str) -> dict | None:
     if not os.path.exists(filepath):
@@ -41,4 +375,4 @@ def _load_json(filepath: str) -> dict | None:
             return json.load(f)
     except (json.JSONDecodeError, IOError, Exception) as e:
         print(f"Erro ao carregar {filepath}: {e}")
-        return None
\ No newline at end of file
+        return None
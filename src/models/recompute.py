@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from .calculator import IndexCalculator
+
+# Linhas por tarefa enviada aos processos; cada tarefa é um calculate_batch.
+RECOMPUTE_CHUNK_SIZE = 5000
+# Abaixo disso, subir processos custa mais do que recalcular aqui mesmo.
+POOL_MIN_ROWS = 50000
+_worker_calculator = None
+
+def snapshot_indices(app_state) -> dict:
+    """Cópia rasa das listas de cálculos, tirada na thread da interface antes de abrir a do recálculo."""
+    return {index_name: list(results) for index_name, results in app_state.calculated_indices.items()}
+
+def collect_chunks(calculated_indices: dict, chunk_size: int = RECOMPUTE_CHUNK_SIZE) -> tuple[list, int]:
+    """Divide os cálculos com `inputs` em blocos (índice, [(id, inputs)]); os importados sem inputs ficam de fora."""
+    chunks, skipped = [], 0
+    for index_name, results in calculated_indices.items():
+        rows = []
+        for calc in results:
+            inputs = calc.get("inputs")
+            if not inputs:
+                skipped += 1
+                continue
+            rows.append((calc.get("id"), inputs))
+        for start in range(0, len(rows), chunk_size):
+            chunks.append((index_name, rows[start:start + chunk_size]))
+    return chunks, skipped
+
+def recompute_chunk(index_name: str, rows: list, calculator: IndexCalculator | None = None) -> tuple[list, int]:
+    """Recalcula um bloco com a fórmula atual do índice (roda num processo de trabalho, ou no atual).
+
+    Sem `calculator`, usa as fórmulas do código. Retorna [(id, valor, unidade)] das linhas válidas
+    e a quantidade de linhas com erro.
+    """
+    global _worker_calculator
+    if calculator is None:
+        if _worker_calculator is None:
+            _worker_calculator = IndexCalculator()
+        calculator = _worker_calculator
+    if index_name not in calculator.calculation_methods:
+        return [], len(rows)
+
+    input_count = len(calculator._inputs_by_index.get(index_name, []))
+    usable = [(calc_id, inputs) for calc_id, inputs in rows if len(inputs) == input_count]
+    errors = len(rows) - len(usable)
+    if not usable:
+        return [], errors
+    columns = [list(column) for column in zip(*(inputs for _, inputs in usable))]
+    batch = calculator.calculate_batch(index_name, columns)
+    unit = batch["unidade"]
+    results = []
+    for (calc_id, _), valor in zip(usable, [float(valor) for valor in batch["valor"]]):
+        if valor == valor:
+            results.append((calc_id, valor, unit))
+    return results, errors + len(usable) - len(results)
+
+def recompute_all(app_state, progress=None, max_workers: int | None = None, calculator: IndexCalculator | None = None,
+                  snapshot: dict | None = None) -> dict:
+    """Recalcula todos os cálculos salvos com a fórmula atual, em paralelo, e aplica as mudanças de uma vez.
+
+    Lê `snapshot` (de snapshot_indices) em vez das listas vivas do AppState; cálculos editados ou
+    excluídos durante o recálculo não recebem o valor calculado a partir das entradas antigas.
+
+    Se `calculator` teve fórmulas trocadas (set_formula), o recálculo roda neste processo com ele,
+    já que os processos de trabalho só conhecem as fórmulas do código.
+    `progress(feitos, total)` é chamado a cada bloco concluído. Retorna
+    {"total", "alterados", "erros", "sem_entradas"}; a gravação fica com quem chamou (uma só).
+    """
+    if snapshot is None:
+        snapshot = snapshot_indices(app_state)
+    chunks, skipped = collect_chunks(snapshot)
+    total = sum(len(rows) for _, rows in chunks)
+    summary = {"total": total, "alterados": 0, "erros": 0, "sem_entradas": skipped}
+    if progress:
+        progress(0, total)
+    if not chunks:
+        return summary
+
+    results = {}
+    done = 0
+
+    def collect(index_name, rows, outcome):
+        nonlocal done
+        values, errors = outcome
+        results.setdefault(index_name, []).extend(values)
+        summary["erros"] += errors
+        done += len(rows)
+        if progress:
+            progress(done, total)
+
+    cpus = getattr(os, "process_cpu_count", os.cpu_count)() or 1
+    workers = min(len(chunks), max_workers or cpus)
+    if workers > 1 and total < POOL_MIN_ROWS and max_workers is None:
+        workers = 1
+    custom_formulas = calculator is not None and any(version > 1 for version in calculator.formula_versions.values())
+    if custom_formulas:
+        workers = 1
+    if workers > 1:
+        try:
+            # "spawn" evita copiar as threads da interface e do gravador para os processos.
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = {pool.submit(recompute_chunk, index_name, rows): (index_name, rows) for index_name, rows in chunks}
+                for future in as_completed(futures):
+                    collect(*futures[future], future.result())
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            # Plataformas sem multiprocessing (ex.: mobile): refaz tudo neste processo.
+            print(f"Erro ao iniciar processos de recálculo, usando o processo atual: {e}")
+            results, done, summary["erros"] = {}, 0, 0
+            workers = 1
+    if workers <= 1:
+        for index_name, rows in chunks:
+            collect(index_name, rows, recompute_chunk(index_name, rows, calculator if custom_formulas else None))
+
+    for index_name, values in results.items():
+        originals = {}
+        for calc in snapshot[index_name]:
+            originals.setdefault(calc.get("id"), calc)
+        values = [
+            value for value in values
+            if app_state.get_calculation_by_id(index_name, value[0])[0] is originals[value[0]]
+        ]
+        summary["alterados"] += app_state.apply_recomputed(index_name, values)
+    return summary
@@ -0,0 +1,154 @@
+import sys
+from collections.abc import Mapping, MutableMapping
+
+_MISSING = object()
+
+class Record(MutableMapping):
+    """Registro compacto com __slots__ que se comporta como dict para views e controllers.
+
+    Chaves desconhecidas ficam em `_extra`, então to_dict/from_dict não perdem dados.
+    """
+    __slots__ = ("_extra",)
+    FIELDS = ()
+    _field_set = frozenset()
+    INTERNED = frozenset()
+    NESTED = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = tuple(cls.__dict__.get("__slots__", ()))
+        cls._field_set = frozenset(cls.FIELDS)
+
+    def __init__(self, data: Mapping | None = None):
+        self._extra = None
+        if data:
+            for key, value in data.items():
+                self[key] = value
+
+    @classmethod
+    def from_dict(cls, data: Mapping):
+        return cls(data)
+
+    @classmethod
+    def coerce(cls, data: Mapping):
+        if type(data) is cls:
+            data._coerce_nested()
+            return data
+        return cls(data)
+
+    def to_dict(self) -> dict:
+        data = {}
+        for key in self.FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is _MISSING:
+                continue
+            if key in self.NESTED and isinstance(value, list):
+                value = [item.to_dict() if isinstance(item, Record) else item for item in value]
+            data[key] = value
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def copy(self):
+        return type(self)(self)
+
+    def _coerce_nested(self):
+        for key, item_cls in self.NESTED.items():
+            items = getattr(self, key, _MISSING)
+            if isinstance(items, list):
+                for i, item in enumerate(items):
+                    if type(item) is not item_cls and isinstance(item, Mapping):
+                        items[i] = item_cls(item)
+
+    def get(self, key, default=None):
+        if key in self._field_set:
+            value = getattr(self, key, _MISSING)
+            return default if value is _MISSING else value
+        if self._extra:
+            return self._extra.get(key, default)
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self._field_set:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+            return
+        if key in self.INTERNED and type(value) is str:
+            value = sys.intern(value)
+        elif key in self.NESTED and isinstance(value, list):
+            item_cls = self.NESTED[key]
+            value = [item_cls(item) if type(item) is not item_cls and isinstance(item, Mapping) else item for item in value]
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key in self._field_set:
+            if getattr(self, key, _MISSING) is _MISSING:
+                raise KeyError(key)
+            delattr(self, key)
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if getattr(self, key, _MISSING) is not _MISSING:
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        count = sum(1 for key in self.FIELDS if getattr(self, key, _MISSING) is not _MISSING)
+        return count + (len(self._extra) if self._extra else 0)
+
+    def __reduce__(self):
+        return (type(self), (self.to_dict(),))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class WeighingRecord(Record):
+    __slots__ = ("id", "data", "peso")
+    INTERNED = frozenset({"data"})
+
+class VaccinationRecord(Record):
+    __slots__ = ("id", "data", "vacina", "dose")
+    INTERNED = frozenset({"data", "vacina", "dose"})
+
+class ReproductionRecord(Record):
+    __slots__ = ("id", "data", "evento", "resultado", "observacao")
+    INTERNED = frozenset({"data", "evento", "resultado"})
+
+class Animal(Record):
+    __slots__ = (
+        "id", "brinco_interno", "nome", "data_nascimento", "raca", "sexo", "lote_atual",
+        "status_animal", "id_mae", "id_pai", "historico_pesagens", "historico_vacinacao", "historico_doencas",
+        "historico_reproducao",
+    )
+    INTERNED = frozenset({"raca", "sexo", "lote_atual", "status_animal"})
+    NESTED = {"historico_pesagens": WeighingRecord, "historico_vacinacao": VaccinationRecord,
+              "historico_reproducao": ReproductionRecord}
+
+class Calculation(Record):
+    __slots__ = ("id", "Resultado", "valor", "unidade", "Data", "Hora", "timestamp", "inputs")
+    INTERNED = frozenset({"Data", "unidade"})
+
+class ChatMessage(Record):
+    __slots__ = ("role", "type", "content", "caption")
+    INTERNED = frozenset({"role", "type"})
+
+def encode_record(value):
+    """Usado como `default` do json.dumps para serializar registros."""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Objeto do tipo {type(value).__name__} não é serializável em JSON")
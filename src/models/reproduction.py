@@ -0,0 +1,247 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from utils.dates import parse_date_ordinal
+
+BREEDING_EVENTS = ("Cobertura", "Inseminação")
+DIAGNOSIS_EVENT = "Diagnóstico de Gestação"
+CALVING_EVENT = "Parto"
+EVENT_TYPES = (*BREEDING_EVENTS, DIAGNOSIS_EVENT, CALVING_EVENT)
+RESULTS = ("Positivo", "Negativo", "Vivo", "Natimorto")
+
+# Estação de monta de outubro a setembro; a estação 2024 vai de 01/10/2024 a 30/09/2025.
+SEASON_START_MONTH = 10
+GESTATION_DAYS = 285
+DAYS_PER_MONTH = 30.4375
+# Janela para ligar um parto à cobertura que o originou (dias antes do parto).
+CONCEPTION_WINDOW = (240, 320)
+# Janela para ligar um diagnóstico à cobertura avaliada (dias antes do diagnóstico).
+DIAGNOSIS_WINDOW = (0, 150)
+
+# Posições dos totais de cada estação.
+EXPOSTAS, PRENHES, PARTOS, NASCIDOS_VIVOS, IPP_DIAS, IPP_N, IEP_DIAS, IEP_N = range(8)
+
+COUNT_INDICES = ("Taxa de Prenhez", "Taxa de Natalidade")
+
+# Listas ordenadas por data usadas nas consultas por período.
+KINDS = ("exposicao", "prenhez", "parto", "primeiro_parto", "intervalo")
+
+def season_of(ordinal: int) -> int:
+    day = date.fromordinal(ordinal)
+    return day.year if day.month >= SEASON_START_MONTH else day.year - 1
+
+def season_bounds(season: int) -> tuple[date, date]:
+    return date(season, SEASON_START_MONTH, 1), date.fromordinal(date(season + 1, SEASON_START_MONTH, 1).toordinal() - 1)
+
+def season_label(season: int) -> str:
+    return f"{season}/{season + 1}"
+
+def _signature(animal) -> tuple:
+    events = tuple(
+        (item.get("id"), item.get("data"), item.get("evento"), item.get("resultado"))
+        for item in animal.get("historico_reproducao") or []
+    )
+    return (animal.get("data_nascimento"), events) if events else ()
+
+def _last_before(ordinals: list[int], ordinal: int, window: tuple[int, int]) -> int | None:
+    """Última data de `ordinals` (ordenada) entre `window` dias antes de `ordinal`."""
+    position = bisect_right(ordinals, ordinal - window[0])
+    if position and ordinals[position - 1] >= ordinal - window[1]:
+        return ordinals[position - 1]
+    return None
+
+def _derive(animal, signature: tuple) -> tuple[list, dict]:
+    """Eventos indexáveis do animal e a contribuição dele para os totais de cada estação."""
+    animal_id = animal.get("id")
+    events = []
+    for record_id, data, evento, resultado in signature[1]:
+        ordinal = parse_date_ordinal(data, strict=True)
+        if ordinal is not None and evento in EVENT_TYPES:
+            events.append((ordinal, evento, resultado, str(record_id or ""), data))
+    events.sort(key=lambda event: event[0])
+
+    breedings = [event[0] for event in events if event[1] in BREEDING_EVENTS]
+    rows = []
+    exposed, pregnant = set(), set()
+    seasons = {}
+
+    def totals(season):
+        return seasons.setdefault(season, [0] * 8)
+
+    birth = parse_date_ordinal(signature[0], strict=True) if signature[0] else None
+    previous_calving = None
+    for ordinal, evento, resultado, record_id, data in events:
+        if evento in BREEDING_EVENTS:
+            exposed.add(season_of(ordinal))
+            rows.append(("exposicao", ordinal, record_id, animal_id))
+        elif evento == DIAGNOSIS_EVENT:
+            bred = _last_before(breedings, ordinal, DIAGNOSIS_WINDOW)
+            season = season_of(bred if bred is not None else ordinal)
+            exposed.add(season)
+            rows.append(("exposicao", ordinal, record_id, animal_id))
+            if resultado == "Positivo":
+                pregnant.add(season)
+                rows.append(("prenhez", ordinal, record_id, animal_id))
+        else:
+            bred = _last_before(breedings, ordinal, CONCEPTION_WINDOW)
+            season = season_of(bred if bred is not None else ordinal - GESTATION_DAYS)
+            row = totals(season)
+            row[PARTOS] += 1
+            live = resultado != "Natimorto"
+            row[NASCIDOS_VIVOS] += live
+            rows.append(("parto", ordinal, record_id, live))
+            if previous_calving is None:
+                if birth is not None and birth <= ordinal:
+                    row[IPP_DIAS] += ordinal - birth
+                    row[IPP_N] += 1
+                    rows.append(("primeiro_parto", ordinal, record_id, (signature[0], data)))
+            elif ordinal > previous_calving[0]:
+                row[IEP_DIAS] += ordinal - previous_calving[0]
+                row[IEP_N] += 1
+                rows.append(("intervalo", ordinal, record_id, (previous_calving[1], data)))
+            previous_calving = (ordinal, data)
+
+    for season in exposed | pregnant:
+        totals(season)[EXPOSTAS] += 1
+    for season in pregnant:
+        totals(season)[PRENHES] += 1
+    return rows, seasons
+
+class ReproductionIndex:
+    """Eventos reprodutivos do rebanho (`historico_reproducao`) indexados por data, com totais por estação de monta.
+
+    Cada alteração de um animal troca só a contribuição dele: as linhas nas listas por data
+    e os totais das estações que ele afeta. Relatórios por estação saem direto dos totais.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._entries = {}  # id do animal -> (assinatura, linhas indexadas, contribuição por estação)
+        self._by_date = {kind: [] for kind in KINDS}  # (data ordinal, id do registro, id do animal, valor)
+        self._seasons = {}  # estação -> totais (EXPOSTAS ... IEP_N)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self, herd: list[dict]):
+        self.clear()
+        for animal in herd:
+            if animal.get("id") not in self._entries:
+                self._index(animal, sort=False)
+        for rows in self._by_date.values():
+            rows.sort(key=lambda row: row[:3])
+
+    def add(self, animal: dict):
+        animal_id = animal.get("id")
+        entry = self._entries.get(animal_id)
+        if entry is not None and entry[0] == _signature(animal):
+            return
+        self.remove(animal_id)
+        self._index(animal)
+
+    def remove(self, animal_id: str):
+        entry = self._entries.pop(animal_id, None)
+        if entry is None:
+            return
+        _, rows, seasons = entry
+        for kind, ordinal, record_id, value in rows:
+            by_date = self._by_date[kind]
+            position = bisect_left(by_date, (ordinal, record_id, animal_id), key=lambda row: row[:3])
+            if position < len(by_date) and by_date[position][:3] == (ordinal, record_id, animal_id):
+                by_date.pop(position)
+        for season, contribution in seasons.items():
+            totals = self._seasons[season]
+            for i, value in enumerate(contribution):
+                totals[i] -= value
+            if not any(totals):
+                del self._seasons[season]
+
+    def seasons(self) -> list[int]:
+        return sorted(self._seasons, reverse=True)
+
+    def season_report(self, season: int) -> dict:
+        """Totais da estação: partos e diagnósticos contam na estação da cobertura que os originou."""
+        totals = self._seasons.get(season, [0] * 8)
+        inicio, fim = season_bounds(season)
+        return {
+            "estacao": season_label(season),
+            "inicio": inicio,
+            "fim": fim,
+            "femeas_expostas": totals[EXPOSTAS],
+            "femeas_prenhes": totals[PRENHES],
+            "partos": totals[PARTOS],
+            "nascidos_vivos": totals[NASCIDOS_VIVOS],
+            "ipp_dias": totals[IPP_DIAS] / totals[IPP_N] if totals[IPP_N] else None,
+            "iep_dias": totals[IEP_DIAS] / totals[IEP_N] if totals[IEP_N] else None,
+        }
+
+    def season_indices(self, calculator, season: int) -> dict:
+        """Valores dos quatro índices na estação, a partir dos totais mantidos (sem varrer o rebanho)."""
+        report = self.season_report(season)
+        results = {}
+        for index_name, numerator in zip(COUNT_INDICES, ("femeas_prenhes", "nascidos_vivos")):
+            try:
+                results[index_name] = calculator.calculation_methods[index_name](float(report[numerator]), float(report["femeas_expostas"]))[0]
+            except ValueError:
+                results[index_name] = None
+        results["Idade ao Primeiro Parto"] = report["ipp_dias"] / DAYS_PER_MONTH if report["ipp_dias"] is not None else None
+        results["Intervalo entre Partos"] = report["iep_dias"]
+        return results
+
+    def window_inputs(self, start_date, end_date) -> dict:
+        """Entradas dos índices reprodutivos para eventos entre as datas (inclusive), cada um pela própria data.
+
+        Retorna as colunas no formato de IndexCalculator.calculate_batch, por índice.
+        """
+        start, end = start_date.toordinal(), end_date.toordinal()
+        rows = {kind: self._between(kind, start, end) for kind in KINDS}
+        expostas = len({animal_id for _, _, animal_id, _ in rows["exposicao"]})
+        prenhes = len({animal_id for _, _, animal_id, _ in rows["prenhez"]})
+        nascidos_vivos = sum(1 for row in rows["parto"] if row[3])
+        first_calvings = [row[3] for row in rows["primeiro_parto"]]
+        intervals = [row[3] for row in rows["intervalo"]]
+        return {
+            "Taxa de Prenhez": [[prenhes], [expostas]],
+            "Taxa de Natalidade": [[nascidos_vivos], [expostas]],
+            "Idade ao Primeiro Parto": [[pair[0] for pair in first_calvings], [pair[1] for pair in first_calvings]],
+            "Intervalo entre Partos": [[pair[0] for pair in intervals], [pair[1] for pair in intervals]],
+        }
+
+    def window_indices(self, calculator, start_date, end_date) -> dict:
+        """Taxa de Prenhez, Natalidade, IPP e IEP do rebanho no período, calculados pelo IndexCalculator.
+
+        Índice -> {"valor" (média nos de data; None sem dados), "unidade", "amostras", "inputs"}.
+        """
+        results = {}
+        for index_name, columns in self.window_inputs(start_date, end_date).items():
+            batch = calculator.calculate_batch(index_name, columns)
+            valid = [float(valor) for valor in batch["valor"] if valor == valor]
+            counts = index_name in COUNT_INDICES
+            results[index_name] = {
+                "valor": sum(valid) / len(valid) if valid else None,
+                "unidade": batch["unidade"],
+                "amostras": columns[1][0] if counts else len(valid),
+                "inputs": [str(columns[0][0]), str(columns[1][0])] if counts else [],
+            }
+        return results
+
+    def _between(self, kind: str, start: int, end: int) -> list:
+        rows = self._by_date[kind]
+        return rows[bisect_left(rows, start, key=lambda row: row[0]):bisect_right(rows, end, key=lambda row: row[0])]
+
+    def _index(self, animal: dict, sort: bool = True):
+        animal_id = animal.get("id")
+        signature = _signature(animal)
+        rows, seasons = _derive(animal, signature) if signature else ([], {})
+        self._entries[animal_id] = (signature, rows, seasons)
+        for kind, ordinal, record_id, value in rows:
+            row = (ordinal, record_id, animal_id, value)
+            if sort:
+                insort(self._by_date[kind], row, key=lambda item: item[:3])
+            else:
+                self._by_date[kind].append(row)
+        for season, contribution in seasons.items():
+            totals = self._seasons.setdefault(season, [0] * 8)
+            for i, value in enumerate(contribution):
+                totals[i] += value
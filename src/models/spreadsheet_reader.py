@@ -0,0 +1,112 @@
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+# Linhas por bloco lido do arquivo; cada bloco vira um DataFrame.
+READ_CHUNK_ROWS = 20000
+# Linhas de cada aba enviadas para a IA; o resto só entra na contagem.
+PREVIEW_ROWS = 200
+
+class SpreadsheetReader:
+    """Leitor de .xlsx em modo read-only do openpyxl, em blocos de linhas.
+
+    Cada aba é lida do arquivo uma vez só: a tabela completa fica guardada no leitor, então
+    a prévia para a IA e a importação confirmada depois usam a mesma leitura.
+    """
+
+    def __init__(self, file_path: str, chunk_size: int = READ_CHUNK_ROWS):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self._sheet_names = None
+        self._frames = {}  # aba -> DataFrame já lido
+
+    def sheet_names(self) -> list[str]:
+        if self._sheet_names is None:
+            workbook = openpyxl.load_workbook(self.file_path, read_only=True, data_only=True)
+            try:
+                self._sheet_names = list(workbook.sheetnames)
+            finally:
+                workbook.close()
+        return self._sheet_names
+
+    def iter_rows(self, sheet_name: str | None = None):
+        """Valores de cada linha não vazia da aba (a primeira é o cabeçalho), direto do arquivo."""
+        workbook = openpyxl.load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+            for row in sheet.iter_rows(values_only=True):
+                if any(value is not None and value != "" for value in row):
+                    yield row
+        finally:
+            workbook.close()
+
+    def iter_frames(self, sheet_name: str | None = None):
+        """Blocos de até `chunk_size` linhas como DataFrames com as colunas do cabeçalho.
+
+        Se a aba já foi lida, os blocos saem da tabela guardada, sem abrir o arquivo de novo.
+        """
+        sheet_name = sheet_name or self.sheet_names()[0]
+        frame = self._frames.get(sheet_name)
+        if frame is not None:
+            for start in range(0, max(len(frame), 1), self.chunk_size):
+                yield frame.iloc[start:start + self.chunk_size]
+            return
+
+        rows = self.iter_rows(sheet_name)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _column_names(header)
+        width = len(columns)
+        chunk = []
+        emitted = False
+        for row in rows:
+            chunk.append(row[:width] if len(row) >= width else row + (None,) * (width - len(row)))
+            if len(chunk) == self.chunk_size:
+                yield pd.DataFrame.from_records(chunk, columns=columns)
+                chunk, emitted = [], True
+        if chunk or not emitted:
+            yield pd.DataFrame.from_records(chunk, columns=columns)
+
+    def frame(self, sheet_name: str | None = None) -> "pd.DataFrame":
+        """A aba inteira (a primeira por padrão), lida uma vez e guardada."""
+        sheet_name = sheet_name or self.sheet_names()[0]
+        frame = self._frames.get(sheet_name)
+        if frame is None:
+            chunks = list(self.iter_frames(sheet_name))
+            frame = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0] if chunks else pd.DataFrame()
+            self._frames[sheet_name] = frame
+        return frame
+
+    def to_text(self, preview_rows: int = PREVIEW_ROWS) -> str:
+        """Conteúdo para a IA: as primeiras linhas de cada aba em markdown, com o total de linhas."""
+        full_text = ""
+        for sheet_name in self.sheet_names():
+            frame = self.frame(sheet_name)
+            full_text += f"--- Planilha: {sheet_name} ---\n"
+            full_text += frame.head(preview_rows).to_markdown(index=False)
+            if len(frame) > preview_rows:
+                full_text += f"\n({preview_rows} de {len(frame)} linhas exibidas)"
+            full_text += "\n\n"
+        return full_text
+
+def _column_names(header: tuple) -> list[str]:
+    """Nomes como no pd.read_excel: vazios viram 'Unnamed: i' e repetidos ganham sufixo '.1', '.2'..."""
+    names, seen = [], {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None or value == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
@@ -0,0 +1,292 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from .records import encode_record
+
+DB_FILENAME = "bovicheck_data.db"
+# Versão 2: sem as colunas brinco/lote/data (não consultadas) e históricos com posição contada do fim.
+SCHEMA_VERSION = 2
+
+HISTORY_TABLES = {
+    "historico_pesagens": "weighings",
+    "historico_vacinacao": "vaccinations",
+    "historico_doencas": "diseases",
+    "historico_reproducao": "reproduction",
+}
+
+_HISTORY_TABLE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    animal_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (animal_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_{table}_animal ON {table}(animal_id, position);
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    section TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (section, key)
+);
+CREATE TABLE IF NOT EXISTS animals (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS calculations (
+    index_name TEXT NOT NULL,
+    id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (index_name, id)
+);
+CREATE TABLE IF NOT EXISTS chats (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    timestamp TEXT
+);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    chat_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (chat_id, position)
+);
+""" + "".join(_HISTORY_TABLE_SCHEMA.format(table=table) for table in HISTORY_TABLES.values())
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=encode_record)
+
+class SQLiteStore:
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(filepath, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION and self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'animals'").fetchone():
+            self._migrate_v1()
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _migrate_v1(self):
+        """Copia as tabelas da versão 1 sem as colunas calculadas e com a posição dos históricos invertida."""
+        copies = [
+            ("animals", "id TEXT PRIMARY KEY, payload TEXT NOT NULL",
+             "SELECT id, payload FROM animals ORDER BY rowid"),
+            ("calculations", "index_name TEXT NOT NULL, id TEXT NOT NULL, payload TEXT NOT NULL, PRIMARY KEY (index_name, id)",
+             "SELECT index_name, id, payload FROM calculations ORDER BY rowid"),
+        ] + [
+            (table, "animal_id TEXT NOT NULL, id TEXT NOT NULL, position INTEGER NOT NULL, payload TEXT NOT NULL, "
+                    "PRIMARY KEY (animal_id, id)",
+             f"SELECT animal_id, id, (SELECT COUNT(*) FROM {table} AS other WHERE other.animal_id = {table}.animal_id) "
+             f"- 1 - position, payload FROM {table}")
+            for table in HISTORY_TABLES.values()
+        ]
+        with self._transaction() as cur:
+            for table, columns, select in copies:
+                cur.execute(f"CREATE TABLE {table}_v2 ({columns})")
+                cur.execute(f"INSERT INTO {table}_v2 {select}")
+                # Remove a tabela antiga com seus índices; os novos vêm do SCHEMA.
+                cur.execute(f"DROP TABLE {table}")
+                cur.execute(f"ALTER TABLE {table}_v2 RENAME TO {table}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            for table in ("settings", "animals", "calculations", "chats"):
+                if self._conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                    return False
+            return True
+
+    def load_into(self, state):
+        with self._lock:
+            data = {
+                "calculated_indices": self._load_calculations(),
+                "herd": self._load_herd(),
+                "chat_history": self._load_chats(),
+            }
+            for section in ("theme_preference", "ai_settings"):
+                rows = self._conn.execute("SELECT key, value FROM settings WHERE section = ?", (section,)).fetchall()
+                if rows:
+                    data[section] = {key: json.loads(value) for key, value in rows}
+        state.from_dict(data)
+
+    def import_state(self, state):
+        data = state.to_dict()
+        with self._transaction() as cur:
+            self._clear_data(cur)
+            for section in ("theme_preference", "ai_settings"):
+                for key, value in data[section].items():
+                    self._put_setting(cur, section, key, value)
+            for index_name, entries in data["calculated_indices"].items():
+                for entry in entries:
+                    self._put_calculation(cur, index_name, entry)
+            for animal in data["herd"]:
+                self._put_animal(cur, animal)
+            for chat in reversed(data["chat_history"]):
+                self._put_chat(cur, chat)
+
+    def apply_ops(self, ops: list[dict]):
+        if not ops:
+            return
+        with self._transaction() as cur:
+            for op in ops:
+                self._apply_op(cur, op)
+
+    def chat_messages(self, chat_id: str) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM chat_messages WHERE chat_id = ? ORDER BY position", (chat_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                yield cur
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            cur.execute("COMMIT")
+
+    def _apply_op(self, cur, op: dict):
+        kind = op.get("op")
+        if kind == "calc_add":
+            self._put_calculation(cur, op["index_name"], op["entry"])
+        elif kind in ("calc_add_many", "calc_recompute"):
+            for entry in op["entries"]:
+                self._put_calculation(cur, op["index_name"], entry)
+        elif kind == "calc_update":
+            entry = op["entry"]
+            cur.execute(
+                "UPDATE calculations SET payload = ? WHERE index_name = ? AND id = ?",
+                (_dumps(entry), op["index_name"], op["calc_id"])
+            )
+        elif kind == "calc_delete":
+            cur.execute("DELETE FROM calculations WHERE index_name = ? AND id = ?", (op["index_name"], op["calc_id"]))
+        elif kind == "index_delete":
+            cur.execute("DELETE FROM calculations WHERE index_name = ?", (op["index_name"],))
+        elif kind in ("animal_add", "animal_update"):
+            self._put_animal(cur, op["animal"])
+        elif kind == "animal_add_many":
+            for animal in op["animals"]:
+                self._put_animal(cur, animal)
+        elif kind == "animal_delete":
+            self._delete_animal(cur, op["animal_id"])
+        elif kind == "chat_add":
+            self._put_chat(cur, op["chat"])
+        elif kind == "chat_delete":
+            cur.execute("DELETE FROM chats WHERE id = ?", (op["chat_id"],))
+            cur.execute("DELETE FROM chat_messages WHERE chat_id = ?", (op["chat_id"],))
+        elif kind == "chat_rename":
+            cur.execute("UPDATE chats SET title = ? WHERE id = ?", (op["title"], op["chat_id"]))
+        elif kind == "chat_message":
+            cur.execute(
+                "INSERT OR IGNORE INTO chat_messages (chat_id, position, payload) VALUES (?, ?, ?)",
+                (op["chat_id"], op["position"], _dumps(op["message"]))
+            )
+        elif kind == "theme":
+            self._put_setting(cur, "theme_preference", op["key"], op["value"])
+        elif kind == "ai_settings":
+            self._put_setting(cur, "ai_settings", op["key"], op["value"])
+        elif kind == "reset":
+            self._clear_data(cur)
+
+    def _clear_data(self, cur):
+        for table in ("animals", "calculations", "chats", "chat_messages", *HISTORY_TABLES.values()):
+            cur.execute(f"DELETE FROM {table}")
+
+    def _put_setting(self, cur, section: str, key: str, value):
+        cur.execute(
+            "INSERT INTO settings (section, key, value) VALUES (?, ?, ?) "
+            "ON CONFLICT(section, key) DO UPDATE SET value = excluded.value",
+            (section, key, _dumps(value))
+        )
+
+    def _put_calculation(self, cur, index_name: str, entry: dict):
+        cur.execute(
+            "INSERT INTO calculations (index_name, id, payload) VALUES (?, ?, ?) "
+            "ON CONFLICT(index_name, id) DO UPDATE SET payload = excluded.payload",
+            (index_name, entry.get("id"), _dumps(entry))
+        )
+
+    def _put_animal(self, cur, animal: dict):
+        animal_id = animal.get("id")
+        base = {key: value for key, value in animal.items() if key not in HISTORY_TABLES}
+        cur.execute(
+            "INSERT INTO animals (id, payload) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET payload = excluded.payload",
+            (animal_id, _dumps(base))
+        )
+        for history_key, table in HISTORY_TABLES.items():
+            records = animal.get(history_key) or []
+            # A posição conta do fim da lista: o formulário inclui no início sem mudar a dos demais.
+            rows = {record.get("id"): (len(records) - 1 - index, _dumps(record)) for index, record in enumerate(records)}
+            if None in rows or len(rows) != len(records):
+                raise ValueError(f"Histórico '{history_key}' do animal {animal_id} com registro sem id ou id repetido.")
+            stored = {
+                record_id: (position, payload) for record_id, position, payload in
+                cur.execute(f"SELECT id, position, payload FROM {table} WHERE animal_id = ?", (animal_id,))
+            }
+            cur.executemany(
+                f"DELETE FROM {table} WHERE animal_id = ? AND id = ?",
+                [(animal_id, record_id) for record_id in stored.keys() - rows.keys()]
+            )
+            cur.executemany(
+                f"INSERT INTO {table} (animal_id, id, position, payload) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(animal_id, id) DO UPDATE SET position = excluded.position, payload = excluded.payload",
+                [(animal_id, record_id, *row) for record_id, row in rows.items() if stored.get(record_id) != row]
+            )
+
+    def _delete_animal(self, cur, animal_id: str):
+        cur.execute("DELETE FROM animals WHERE id = ?", (animal_id,))
+        for table in HISTORY_TABLES.values():
+            cur.execute(f"DELETE FROM {table} WHERE animal_id = ?", (animal_id,))
+
+    def _put_chat(self, cur, chat: dict):
+        cur.execute(
+            "INSERT INTO chats (id, title, timestamp) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET title = excluded.title, timestamp = excluded.timestamp",
+            (chat.get("id"), chat.get("title"), chat.get("timestamp"))
+        )
+        cur.executemany(
+            "INSERT OR IGNORE INTO chat_messages (chat_id, position, payload) VALUES (?, ?, ?)",
+            [(chat.get("id"), position, _dumps(message)) for position, message in enumerate(chat.get("messages", []))]
+        )
+
+    def _load_calculations(self) -> dict:
+        calculated_indices = {}
+        for index_name, payload in self._conn.execute("SELECT index_name, payload FROM calculations ORDER BY rowid"):
+            calculated_indices.setdefault(index_name, []).append(json.loads(payload))
+        return calculated_indices
+
+    def _load_herd(self) -> list:
+        herd = []
+        by_id = {}
+        for (payload,) in self._conn.execute("SELECT payload FROM animals ORDER BY rowid"):
+            animal = json.loads(payload)
+            for history_key in HISTORY_TABLES:
+                animal[history_key] = []
+            herd.append(animal)
+            by_id[animal.get("id")] = animal
+        for history_key, table in HISTORY_TABLES.items():
+            for animal_id, payload in self._conn.execute(f"SELECT animal_id, payload FROM {table} ORDER BY animal_id, position DESC"):
+                if animal_id in by_id:
+                    by_id[animal_id][history_key].append(json.loads(payload))
+        return herd
+
+    def _load_chats(self) -> list:
+        # Apenas os cabeçalhos; as mensagens são lidas por chat_messages() sob demanda.
+        return [
+            {"id": chat_id, "title": title, "timestamp": timestamp}
+            for chat_id, title, timestamp in self._conn.execute("SELECT id, title, timestamp FROM chats ORDER BY rowid DESC")
+        ]
@@ -0,0 +1,243 @@
+import csv
+import json
+import os
+import uuid
+from itertools import islice
+from .records import VaccinationRecord, WeighingRecord, ReproductionRecord
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Linhas por bloco gravado ou lido; a memória fica limitada a um bloco por tabela.
+CHUNK_ROWS = 50000
+FORMATS = {"csv": ".csv", "parquet": ".parquet"}
+
+INDICES_TABLE = "indices"
+ANIMALS_TABLE = "animais"
+INDEX_COLUMNS = ("indice", "id", "Resultado", "valor", "unidade", "Data", "Hora", "timestamp", "inputs")
+ANIMAL_COLUMNS = (
+    "id", "brinco_interno", "nome", "data_nascimento", "raca", "sexo", "lote_atual", "status_animal", "id_mae", "id_pai",
+)
+# Históricos do animal em tabelas normalizadas, ligadas pela coluna animal_id (na ordem da ficha).
+HISTORY_TABLES = {
+    "historico_pesagens": ("pesagens", WeighingRecord.FIELDS),
+    "historico_vacinacao": ("vacinacoes", VaccinationRecord.FIELDS),
+    "historico_doencas": ("doencas", ("id", "data", "doenca", "tratamento")),
+    "historico_reproducao": ("reproducao", ReproductionRecord.FIELDS),
+}
+_HISTORY_BY_TABLE = {table: (history_key, fields) for history_key, (table, fields) in HISTORY_TABLES.items()}
+# Campos numéricos dos históricos, gravados como float64 no Parquet. Na ficha continuam texto, como o
+# formulário grava; ao importar do Parquet o número volta a texto (o CSV já guarda o texto original).
+HISTORY_NUMERIC = {"historico_pesagens": {"peso": float}}
+
+def _text(value):
+    return value if value is None or isinstance(value, str) else str(value)
+
+def _number(value, kind):
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = value.strip().replace(",", ".")
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+def _number_text(value):
+    if not isinstance(value, float):
+        return value
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def _write_table(path: str, fmt: str, columns: tuple, rows, numeric: dict | None = None) -> int:
+    """Grava `rows` (iterável de tuplas) em blocos de CHUNK_ROWS; retorna quantas linhas foram gravadas."""
+    total = 0
+    if fmt == "csv":
+        # utf-8-sig: o Excel reconhece a acentuação ao abrir o arquivo.
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            while chunk := list(islice(rows, CHUNK_ROWS)):
+                writer.writerows(chunk)
+                total += len(chunk)
+        return total
+
+    numeric = numeric or {}
+    schema = pa.schema([(column, numeric.get(column, pa.string())) for column in columns])
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        while chunk := list(islice(rows, CHUNK_ROWS)):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            total += len(chunk)
+        if not total:
+            writer.write_table(schema.empty_table())
+    return total
+
+def _iter_chunks(path: str):
+    """Blocos (colunas, [linhas]) de um .csv ou .parquet; no CSV todos os valores chegam como texto."""
+    if path.lower().endswith(".parquet"):
+        parquet = pq.ParquetFile(path)
+        columns = parquet.schema_arrow.names
+        for batch in parquet.iter_batches(batch_size=CHUNK_ROWS):
+            yield columns, list(zip(*(column.to_pylist() for column in batch.columns)))
+        return
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        columns = next(reader, None)
+        if columns is None:
+            return
+        while chunk := list(islice(reader, CHUNK_ROWS)):
+            yield columns, chunk
+
+def _index_rows(indices_data: dict, selected_names: list[str]):
+    for name in sorted(name for name in selected_names if name in indices_data):
+        for calc in indices_data.get(name, []):
+            yield (
+                name, _text(calc.get("id")), _text(calc.get("Resultado")), _number(calc.get("valor"), float),
+                _text(calc.get("unidade")), _text(calc.get("Data")), _text(calc.get("Hora")),
+                _number(calc.get("timestamp"), int), json.dumps(calc.get("inputs") or [], ensure_ascii=False),
+            )
+
+def _history_rows(herd: list, history_key: str, fields: tuple, typed: bool):
+    numeric = HISTORY_NUMERIC.get(history_key, {}) if typed else {}
+    convert = [(field, numeric[field]) if field in numeric else (field, None) for field in fields]
+    for animal in herd:
+        animal_id = _text(animal.get("id"))
+        for record in animal.get(history_key) or []:
+            yield (animal_id, *(_number(record.get(field), kind) if kind else _text(record.get(field)) for field, kind in convert))
+
+def export_tables(indices_data: dict, selected_names: list[str], herd: list, destination: str,
+                  fmt: str = "csv", include_herd: bool = True) -> dict:
+    """Grava índices e rebanho como tabelas (.csv ou .parquet) na pasta `destination`, bloco a bloco.
+
+    Os históricos de pesagem, vacinação, doenças e reprodução vão em tabelas próprias com
+    a coluna animal_id. Retorna {arquivo: linhas}.
+    """
+    if fmt == "parquet" and not PYARROW_AVAILABLE:
+        raise RuntimeError("A exportação em Parquet exige a biblioteca 'pyarrow'.")
+    os.makedirs(destination, exist_ok=True)
+    extension = FORMATS[fmt]
+    written = {}
+
+    def write(table, columns, rows, numeric=None):
+        path = os.path.join(destination, table + extension)
+        written[path] = _write_table(path, fmt, columns, rows, numeric)
+
+    if selected_names:
+        numeric = {"valor": pa.float64(), "timestamp": pa.int64()} if fmt == "parquet" else None
+        write(INDICES_TABLE, INDEX_COLUMNS, _index_rows(indices_data, selected_names), numeric)
+    if include_herd:
+        write(ANIMALS_TABLE, ANIMAL_COLUMNS, (tuple(_text(animal.get(c)) for c in ANIMAL_COLUMNS) for animal in herd))
+        for history_key, (table, fields) in HISTORY_TABLES.items():
+            numeric = None
+            if fmt == "parquet":
+                numeric = {field: pa.float64() for field in HISTORY_NUMERIC.get(history_key, {})}
+            write(table, ("animal_id", *fields), _history_rows(herd, history_key, fields, fmt == "parquet"), numeric)
+    return written
+
+def table_of(path: str) -> str | None:
+    """Tabela de um arquivo pelo nome: 'pesagens.csv', 'fazenda_pesagens.parquet'..."""
+    stem, extension = os.path.splitext(os.path.basename(path))
+    if extension.lower() not in FORMATS.values():
+        return None
+    stem = stem.lower()
+    for table in (INDICES_TABLE, ANIMALS_TABLE, *_HISTORY_BY_TABLE):
+        if stem == table or stem.endswith("_" + table):
+            return table
+    return None
+
+def import_tables(app_state, paths: list[str]) -> dict:
+    """Importa tabelas exportadas por export_tables (em qualquer combinação de arquivos).
+
+    Cálculos entram por add_calculations (ids já existentes são ignorados). Animais da tabela
+    substituem os dados cadastrais mantendo os históricos; registros de histórico entram no
+    animal pelo animal_id, pulando ids que ele já tem. Retorna as contagens por tipo.
+    """
+    summary = {"calculos": 0, "animais": 0, "registros": 0, "ignorados": []}
+    by_table = {}
+    for path in paths:
+        table = table_of(path)
+        if table is None or (path.lower().endswith(".parquet") and not PYARROW_AVAILABLE):
+            summary["ignorados"].append(os.path.basename(path))
+        else:
+            by_table.setdefault(table, []).append(path)
+
+    # Um único evento para os ouvintes ao final, em vez de um por cálculo ou animal.
+    with app_state.batch():
+        _import_indices(app_state, by_table.get(INDICES_TABLE, []), summary)
+        _import_herd(app_state, by_table, summary)
+    return summary
+
+def _import_indices(app_state, paths: list[str], summary: dict):
+    for path in paths:
+        for columns, rows in _iter_chunks(path):
+            grouped = {}
+            for row in rows:
+                entry = dict(zip(columns, row))
+                index_name = entry.pop("indice", None)
+                if not index_name:
+                    continue
+                entry["id"] = entry.get("id") or f"imported_{uuid.uuid4()}"
+                entry["valor"] = _number(entry.get("valor"), float)
+                entry["timestamp"] = _number(entry.get("timestamp"), int)
+                entry["inputs"] = json.loads(entry.get("inputs") or "[]")
+                # Sem valor/timestamp a chave fica de fora, para add_calculations recalcular a partir de Resultado, Data e Hora.
+                entry = {key: value for key, value in entry.items() if value is not None}
+                grouped.setdefault(index_name, []).append(entry)
+            for index_name, entries in grouped.items():
+                summary["calculos"] += app_state.add_calculations(index_name, entries)
+
+def _import_herd(app_state, by_table: dict, summary: dict):
+    pending = {}  # id do animal -> ficha a gravar
+
+    def target(animal_id):
+        animal = pending.get(animal_id)
+        if animal is None:
+            existing, _ = app_state.get_animal_by_id(animal_id)
+            if existing is not None:
+                animal = pending[animal_id] = existing.to_dict()
+        return animal
+
+    for path in by_table.get(ANIMALS_TABLE, []):
+        for columns, rows in _iter_chunks(path):
+            for row in rows:
+                fields = dict(zip(columns, row))
+                animal_id = fields.get("id")
+                if not animal_id:
+                    continue
+                animal = target(animal_id)
+                if animal is None:
+                    animal = pending[animal_id] = {key: [] for key in HISTORY_TABLES}
+                animal.update(fields)
+                summary["animais"] += 1
+
+    for table, (history_key, _) in _HISTORY_BY_TABLE.items():
+        numeric = HISTORY_NUMERIC.get(history_key, {})
+        known_ids = {}
+        for path in by_table.get(table, []):
+            for columns, rows in _iter_chunks(path):
+                for row in rows:
+                    record = dict(zip(columns, row))
+                    animal_id = record.pop("animal_id", None)
+                    for field in numeric:
+                        if field in record:
+                            record[field] = _number_text(record[field])
+                    animal = target(animal_id)
+                    if animal is None:
+                        continue
+                    history = animal.setdefault(history_key, [])
+                    ids = known_ids.get(animal_id)
+                    if ids is None:
+                        ids = known_ids[animal_id] = {item.get("id") for item in history}
+                    if not record.get("id"):
+                        record["id"] = str(uuid.uuid4())
+                    elif record["id"] in ids:
+                        continue
+                    ids.add(record["id"])
+                    history.append(record)
+                    summary["registros"] += 1
+
+    app_state.add_animals(list(pending.values()))
@@ -0,0 +1,104 @@
+from datetime import date
+from functools import lru_cache
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Datas repetem muito (pesagens do mesmo dia, lotes inteiros); o cache cobre décadas de dias distintos.
+DATE_CACHE_SIZE = 65536
+
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# Dias antes do 1º de cada mês num ano não bissexto.
+_DAYS_BEFORE_MONTH = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+_ZERO = ord("0")
+
+def _ordinal(day: int, month: int, year: int) -> int | None:
+    if not (1 <= month <= 12 and 1 <= year <= 9999 and day >= 1):
+        return None
+    leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if day > _DAYS_IN_MONTH[month - 1] + (month == 2 and leap):
+        return None
+    y = year - 1
+    return y * 365 + y // 4 - y // 100 + y // 400 + _DAYS_BEFORE_MONTH[month - 1] + (month > 2 and leap) + day
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_text(text: str, strict: bool) -> int | None:
+    text = text.strip()
+    if len(text) == 10 and text[2] == "/" and text[5] == "/":
+        d0, d1, _, m0, m1, _, y0, y1, y2, y3 = map(ord, text)
+        digits = (d0, d1, m0, m1, y0, y1, y2, y3)
+        if min(digits) < _ZERO or max(digits) > _ZERO + 9:
+            return None
+        return _ordinal(
+            (d0 - _ZERO) * 10 + d1 - _ZERO,
+            (m0 - _ZERO) * 10 + m1 - _ZERO,
+            (y0 - _ZERO) * 1000 + (y1 - _ZERO) * 100 + (y2 - _ZERO) * 10 + y3 - _ZERO,
+        )
+    if strict:
+        return None
+    # Formato solto (ex.: 1/2/2024), aceito como no strptime.
+    parts = text.split("/")
+    if len(parts) != 3 or not all(part.isdigit() and part.isascii() for part in parts) or len(parts[2]) != 4 or max(map(len, parts[:2])) > 2:
+        return None
+    return _ordinal(int(parts[0]), int(parts[1]), int(parts[2]))
+
+def parse_date_ordinal(value, strict: bool = False) -> int | None:
+    """Converte 'DD/MM/AAAA' (ou date/datetime) no ordinal do dia; None se inválida.
+
+    Substitui datetime.strptime nos pontos quentes; `strict` exige exatamente dois dígitos de dia e mês.
+    """
+    if isinstance(value, str):
+        return _parse_text(value, strict)
+    if hasattr(value, "toordinal"):
+        return value.toordinal()
+    return None if value is None else _parse_text(str(value), strict)
+
+def parse_date(value, strict: bool = False) -> date | None:
+    ordinal = parse_date_ordinal(value, strict)
+    return None if ordinal is None else date.fromordinal(ordinal)
+
+def is_valid_date(value) -> bool:
+    """Validação do formulário: exatamente DD/MM/AAAA e data existente."""
+    return parse_date_ordinal(value, strict=True) is not None
+
+def parse_date_array(column):
+    """Converte uma coluna de datas (texto DD/MM/AAAA, datetime64 ou date) em datetime64[D], com NaT nas inválidas.
+
+    Exige NumPy; quem chama verifica NUMPY_AVAILABLE e usa parse_date_ordinal item a item sem ele.
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("parse_date_array exige a biblioteca 'numpy'.")
+    values = np.asarray(column)
+    if values.dtype.kind == "M":
+        values = values.astype("datetime64[D]")
+        return values, np.isnat(values)
+    if values.dtype.kind == "O" and not all(isinstance(item, str) for item in values.tolist()):
+        try:
+            values = values.astype("datetime64[D]")
+            return values, np.isnat(values)
+        except (ValueError, TypeError):
+            values = values.astype(str)
+
+    text = np.char.strip(values.astype(str))
+    lengths = np.char.str_len(text)
+    # Cada texto vira uma linha de 10 códigos de caractere; dígitos e barras são conferidos por posição.
+    codes = text.astype("U10").view(np.uint32).reshape(len(text), 10).astype(np.int64) - _ZERO
+    digits = codes[:, [0, 1, 3, 4, 6, 7, 8, 9]]
+    slash = ord("/") - _ZERO
+    ok = (lengths == 10) & (codes[:, 2] == slash) & (codes[:, 5] == slash) & ((digits >= 0) & (digits <= 9)).all(axis=1)
+
+    day = codes[:, 0] * 10 + codes[:, 1]
+    month = codes[:, 3] * 10 + codes[:, 4]
+    year = codes[:, 6] * 1000 + codes[:, 7] * 100 + codes[:, 8] * 10 + codes[:, 9]
+    ok &= (month >= 1) & (month <= 12) & (year >= 1) & (day >= 1)
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = np.asarray(_DAYS_IN_MONTH)[np.clip(month - 1, 0, 11)] + ((month == 2) & leap)
+    ok &= day <= month_days
+
+    months = np.where(ok, (year - 1970) * 12 + month - 1, 0).astype("datetime64[M]")
+    dates = months.astype("datetime64[D]") + np.where(ok, day - 1, 0).astype("timedelta64[D]")
+    dates[~ok] = np.datetime64("NaT")
+    return dates, ~ok
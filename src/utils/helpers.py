@@ -1,4 +1,12 @@
+from datetime import date
 from urllib.parse import quote, unquote
+from utils.dates import parse_date_ordinal
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 def to_safe_route_param(name: str) -> str:
     processed_name = name.replace(" ", "_").replace("/", "__SLASH__")
@@ -6,4 +14,71 @@ def to_safe_route_param(name: str) -> str:
 
 def from_safe_route_param(param: str) -> str:
     decoded_param = unquote(param)
-    return decoded_param.replace("__SLASH__", "/").replace("_", " ")
\ No newline at end of file
+    return decoded_param.replace("__SLASH__", "/").replace("_", " ")
+
+def calc_timestamp(data, hora="00:00") -> int | None:
+    """Converte 'DD/MM/AAAA' e 'HH:MM' em minutos desde o início do calendário (ordinal * 1440)."""
+    day_ordinal = parse_date_ordinal(data)
+    if day_ordinal is None:
+        return None
+    if not hora or hora == "00:00":
+        return day_ordinal * 1440
+    try:
+        hours, minutes = (int(part) for part in str(hora).strip().split(":")[:2])
+    except (ValueError, TypeError):
+        return None
+    if not (0 <= hours <= 23 and 0 <= minutes <= 59):
+        return None
+    return day_ordinal * 1440 + hours * 60 + minutes
+
+def timestamp_to_date(timestamp: int) -> date:
+    return date.fromordinal(timestamp // 1440)
+
+def parse_result_string(resultado) -> tuple[float | None, str]:
+    """Separa '12.34 kg/dia' em (12.34, 'kg/dia')."""
+    parts = str(resultado or "").strip().split(" ", 1)
+    unidade = parts[1].strip() if len(parts) > 1 else ""
+    try:
+        return float(parts[0].replace(",", ".")), unidade
+    except ValueError:
+        return None, unidade
+
+def format_result(valor: float | None, unidade: str = "", decimals: int = 2) -> str:
+    if valor is None:
+        return "N/A"
+    return f"{valor:.{decimals}f} {unidade}".strip()
+
+def is_mounted(control) -> bool:
+    """True se o controle Flet está na árvore exibida (views removidas mantêm `page`, mas saem do índice)."""
+    page = getattr(control, "page", None)
+    return page is not None and control.uid is not None and page.get_control(control.uid) is control
+
+def refresh_if_mounted(control):
+    """Envia as alterações do controle se ele estiver na tela; senão elas vão junto quando ele voltar a ser exibido."""
+    if is_mounted(control):
+        control.update()
+
+def parse_number_array(column):
+    """Converte uma coluna de números (aceita vírgula decimal) em float64; inválidos e negativos ficam marcados.
+
+    Exige NumPy; quem chama verifica NUMPY_AVAILABLE e usa a conversão item a item sem ele.
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("parse_number_array exige a biblioteca 'numpy'.")
+    values = np.asarray(column)
+    if values.dtype.kind in "biuf":
+        values = values.astype(float)
+    else:
+        text = np.char.replace(np.char.strip(values.astype(str)), ",", ".")
+        try:
+            values = text.astype(float)
+        except ValueError:
+            values = np.array([_to_float(item) for item in text.tolist()], dtype=float)
+    with np.errstate(invalid="ignore"):
+        return values, np.isnan(values) | (values < 0)
+
+def _to_float(text: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return float("nan")
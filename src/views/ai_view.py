@@ -20,6 +20,7 @@ def build_ai_chat_view(controller, chat_id: str) -> ft.Container:
     
     controller.app_state.current_chat_id = chat_id
     current_chat = controller.app_state.get_current_chat()
+    messages = controller.app_state.get_chat_messages(current_chat['id']) if current_chat else []
     
     cs = controller.page.theme.color_scheme if controller.page.theme else None
     controller.ai_chat_messages_list.controls.clear()
@@ -27,8 +28,8 @@ def build_ai_chat_view(controller, chat_id: str) -> ft.Container:
     if not controller.app_state.ai_settings.get("enabled", False):
         msg = "A funcionalidade de IA está desabilitada. Ative-a em Configurações."
         controller.ai_chat_messages_list.controls.append(_create_chat_message_control(msg, "system", cs))
-    elif current_chat and current_chat.get('messages'):
-        for message in current_chat['messages']:
+    elif messages:
+        for message in messages:
             content = message.get("content", "")
             role = message.get("role", "system")
             caption = message.get("caption", "")
@@ -62,6 +62,7 @@ class FichaView(ft.Column):
                     ft.Divider(height=1),
                     create_info_tile(ft.Icons.FEMALE, self.animal_data.get("id_mae"), "Brinco da Mãe"),
                     create_info_tile(ft.Icons.MALE, self.animal_data.get("id_pai"), "Brinco/ID do Pai"),
+                    *self.build_pedigree_tiles(create_info_tile),
                 ]), padding=ft.padding.symmetric(vertical=10)
             )
         )
@@ -78,6 +79,17 @@ class FichaView(ft.Column):
             spacing=10
         )
 
+    def build_pedigree_tiles(self, create_info_tile) -> list:
+        brinco = (self.animal_data.get("brinco_interno") or "").strip()
+        if not brinco:
+            return []
+        pedigree = self.controller.app_state.pedigree
+        offspring = pedigree.offspring(brinco)
+        return [
+            create_info_tile(ft.Icons.ACCOUNT_TREE_OUTLINED, f"{pedigree.inbreeding(brinco) * 100:.2f}%", "Coeficiente de Endogamia (F)"),
+            create_info_tile(ft.Icons.CHILD_CARE_OUTLINED, str(len(offspring)), "Filhos registrados"),
+        ]
+
     def build_edit_mode(self) -> ft.Column:
         animal_controller = self.controller.animal_controller
         animal_id = self.animal_data.get("id")
@@ -155,6 +167,7 @@ class AnimalDetailView(ft.Column):
                 ft.NavigationBarDestination(icon=ft.Icons.SCALE_OUTLINED, selected_icon=ft.Icons.SCALE, label="Pesagens"),
                 ft.NavigationBarDestination(icon=ft.Icons.VACCINES_OUTLINED, selected_icon=ft.Icons.VACCINES, label="Vacinas"),
                 ft.NavigationBarDestination(icon=ft.Icons.MEDICAL_SERVICES_OUTLINED, selected_icon=ft.Icons.MEDICAL_SERVICES, label="Ocorrências"),
+                ft.NavigationBarDestination(icon=ft.Icons.FAVORITE_OUTLINE, selected_icon=ft.Icons.FAVORITE, label="Reprodução"),
             ]
         )
         
@@ -173,6 +186,8 @@ class AnimalDetailView(ft.Column):
             self.content_area.content = _build_vacinas_section(self.controller, self.animal_data)
         elif selected_index == 3:
             self.content_area.content = _build_doencas_section(self.controller, self.animal_data)
+        elif selected_index == 4:
+            self.content_area.content = _build_reproducao_section(self.controller, self.animal_data)
         
         if self.page:
             self.update()
@@ -209,100 +224,122 @@ def _create_history_item_menu(controller, animal_id, history_key, record_id):
         ]
     )
 
-def _build_pesagens_content(controller, animal_data: dict) -> ft.Container:
-    history = animal_data.get("historico_pesagens", [])
-    
-    pesagens_list_controls = []
+def _pesagem_card(controller, animal_id: str, item: dict) -> ft.Card:
+    return ft.Card(
+        content=ft.ListTile(
+            leading=ft.Icon(ft.Icons.SCALE_OUTLINED, color="primary"),
+            title=ft.Text(f"{item.get('peso', 'N/A')} kg", weight=ft.FontWeight.BOLD),
+            subtitle=ft.Text(f"Data: {item.get('data', 'N/A')}"),
+            trailing=_create_history_item_menu(controller, animal_id, "historico_pesagens", item["id"]),
+        ),
+        elevation=1.5
+    )
+
+def _vacina_card(controller, animal_id: str, item: dict) -> ft.Card:
+    return ft.Card(
+        content=ft.ListTile(
+            leading=ft.Icon(ft.Icons.VACCINES_OUTLINED, color="primary"),
+            title=ft.Text(item.get("vacina", "N/A"), weight=ft.FontWeight.BOLD),
+            subtitle=ft.Text(f"Data: {item.get('data', 'N/A')} • Dose: {item.get('dose', 'N/A')}"),
+            trailing=_create_history_item_menu(controller, animal_id, "historico_vacinacao", item["id"]),
+        ),
+        elevation=1.5
+    )
+
+def _doenca_card(controller, animal_id: str, item: dict) -> ft.Card:
+    return ft.Card(
+        content=ft.ListTile(
+            leading=ft.Icon(ft.Icons.MEDICAL_SERVICES_OUTLINED, color="orange"),
+            title=ft.Text(item.get("doenca", "N/A"), weight=ft.FontWeight.BOLD),
+            subtitle=ft.Text(f"Data: {item.get('data', 'N/A')} • Tratamento: {item.get('tratamento', 'N/A')}"),
+            trailing=_create_history_item_menu(controller, animal_id, "historico_doencas", item["id"]),
+        ),
+        elevation=1.5
+    )
+
+def _reproducao_card(controller, animal_id: str, item: dict) -> ft.Card:
+    details = f"Data: {item.get('data', 'N/A')}"
+    if item.get("resultado"):
+        details += f" • Resultado: {item['resultado']}"
+    if item.get("observacao"):
+        details += f" • {item['observacao']}"
+    return ft.Card(
+        content=ft.ListTile(
+            leading=ft.Icon(ft.Icons.FAVORITE_OUTLINE, color="primary"),
+            title=ft.Text(item.get("evento", "N/A"), weight=ft.FontWeight.BOLD),
+            subtitle=ft.Text(details),
+            trailing=_create_history_item_menu(controller, animal_id, "historico_reproducao", item["id"]),
+        ),
+        elevation=1.5
+    )
+
+HISTORY_SECTIONS = {
+    "historico_pesagens": ("Histórico de Pesos", "Registrar Pesagem", "Nenhum registro de peso encontrado.", _pesagem_card),
+    "historico_vacinacao": ("Vacinação e Vermifugação", "Registrar Aplicação", "Nenhum registro de vacina encontrado.", _vacina_card),
+    "historico_doencas": ("Ocorrências de Saúde", "Registrar Ocorrência", "Nenhuma ocorrência de saúde registrada.", _doenca_card),
+    "historico_reproducao": ("Histórico Reprodutivo", "Registrar Evento", "Nenhum evento reprodutivo registrado.", _reproducao_card),
+}
+
+def fill_history_list(controller, animal_data: dict, history_key: str):
+    """Preenche a lista do histórico reaproveitando os cards dos registros que não mudaram."""
+    animal_controller = controller.animal_controller
+    list_column = animal_controller.history_list_column
+    _, _, empty_text, build_card = HISTORY_SECTIONS[history_key]
+    history = animal_data.get(history_key, [])
     if not history:
-        pesagens_list_controls.append(ft.Text("Nenhum registro de peso encontrado.", italic=True, opacity=0.8))
-    else:
-        for item in history:
-            card = ft.Card(
-                content=ft.ListTile(
-                    leading=ft.Icon(ft.Icons.SCALE_OUTLINED, color="primary"),
-                    title=ft.Text(f"{item.get('peso', 'N/A')} kg", weight=ft.FontWeight.BOLD),
-                    subtitle=ft.Text(f"Data: {item.get('data', 'N/A')}"),
-                    trailing=_create_history_item_menu(controller, animal_data["id"], "historico_pesagens", item["id"]),
-                ),
-                elevation=1.5
-            )
-            pesagens_list_controls.append(card)
+        animal_controller.history_cards = {}
+        list_column.controls = [ft.Text(empty_text, italic=True, opacity=0.8)]
+        return
+    header = [_build_gmd_summary(controller, animal_data["id"])] if history_key == "historico_pesagens" else []
+
+    cards = {}
+    for item in history:
+        snapshot = dict(item)
+        cached = animal_controller.history_cards.get(item["id"])
+        if cached is None or cached[0] != snapshot:
+            cached = (snapshot, build_card(controller, animal_data["id"], item))
+        cards[item["id"]] = cached
+    animal_controller.history_cards = cards
+    list_column.controls = header + [card for _, card in cards.values()]
+
+def _build_gmd_summary(controller, animal_id: str) -> ft.Text:
+    gmd = controller.herd_analytics.animal_gmd(animal_id)
+    if not gmd or gmd["gmd_periodo"] is None:
+        return ft.Text("GMD: são necessárias pesagens em datas diferentes.", size=12, italic=True, opacity=0.8)
+    text = f"GMD no período: {gmd['gmd_periodo']:.3f} kg/dia em {gmd['dias']} dias"
+    if gmd["intervalos"]:
+        text += f" · última: {gmd['intervalos'][-1]['gmd']:.3f} kg/dia"
+    return ft.Text(text, size=12, color="onSurfaceVariant")
+
+def _build_history_section(controller, animal_data: dict, history_key: str) -> ft.Container:
+    title, button_text, _, _ = HISTORY_SECTIONS[history_key]
+    animal_controller = controller.animal_controller
+    animal_controller.history_list_column = ft.Column(spacing=8, scroll=ft.ScrollMode.ADAPTIVE, expand=True)
+    animal_controller.history_cards = {}
+    fill_history_list(controller, animal_data, history_key)
 
     column = ft.Column(
         controls=[
             ft.Row([
-                ft.Text("Histórico de Pesos", size=18, weight=ft.FontWeight.BOLD, expand=True),
-                ft.FilledButton("Registrar Pesagem", icon=ft.Icons.ADD, on_click=lambda _: controller.page.go(f"/animal/{animal_data['id']}/add/historico_pesagens"))
+                ft.Text(title, size=18, weight=ft.FontWeight.BOLD, expand=True),
+                ft.FilledButton(button_text, icon=ft.Icons.ADD, on_click=lambda _: controller.page.go(f"/animal/{animal_data['id']}/add/{history_key}"))
             ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
             ft.Divider(),
-            ft.Column(controls=pesagens_list_controls, spacing=8, scroll=ft.ScrollMode.ADAPTIVE, expand=True)
+            animal_controller.history_list_column,
         ],
         spacing=12,
         expand=True,
     )
-    
     return ft.Container(content=column, padding=15, expand=True)
 
+def _build_pesagens_content(controller, animal_data: dict) -> ft.Container:
+    return _build_history_section(controller, animal_data, "historico_pesagens")
+
 def _build_vacinas_section(controller, animal_data: dict) -> ft.Container:
-    vacinas = animal_data.get("historico_vacinacao", [])
-    vacinas_list_controls = []
-    if not vacinas:
-        vacinas_list_controls.append(ft.Text("Nenhum registro de vacina encontrado.", italic=True, opacity=0.8))
-    else:
-        for item in vacinas:
-            card = ft.Card(
-                content=ft.ListTile(
-                    leading=ft.Icon(ft.Icons.VACCINES_OUTLINED, color="primary"),
-                    title=ft.Text(item.get("vacina", "N/A"), weight=ft.FontWeight.BOLD),
-                    subtitle=ft.Text(f"Data: {item.get('data', 'N/A')} • Dose: {item.get('dose', 'N/A')}"),
-                    trailing=_create_history_item_menu(controller, animal_data["id"], "historico_vacinacao", item["id"]),
-                ),
-                elevation=1.5
-            )
-            vacinas_list_controls.append(card)
-    
-    column = ft.Column(
-        controls=[
-            ft.Row([
-                ft.Text("Vacinação e Vermifugação", size=18, weight=ft.FontWeight.BOLD, expand=True),
-                ft.FilledButton("Registrar Aplicação", icon=ft.Icons.ADD, on_click=lambda _: controller.page.go(f"/animal/{animal_data['id']}/add/historico_vacinacao"))
-            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-            ft.Divider(),
-            ft.Column(controls=vacinas_list_controls, spacing=8, scroll=ft.ScrollMode.ADAPTIVE, expand=True),
-        ],
-        spacing=12,
-        expand=True,
-    )
-    return ft.Container(content=column, padding=15, expand=True)
+    return _build_history_section(controller, animal_data, "historico_vacinacao")
 
 def _build_doencas_section(controller, animal_data: dict) -> ft.Container:
-    doencas = animal_data.get("historico_doencas", [])
-    doencas_list_controls = []
-    if not doencas:
-        doencas_list_controls.append(ft.Text("Nenhuma ocorrência de saúde registrada.", italic=True, opacity=0.8))
-    else:
-        for item in doencas:
-            card = ft.Card(
-                content=ft.ListTile(
-                    leading=ft.Icon(ft.Icons.MEDICAL_SERVICES_OUTLINED, color="orange"),
-                    title=ft.Text(item.get("doenca", "N/A"), weight=ft.FontWeight.BOLD),
-                    subtitle=ft.Text(f"Data: {item.get('data', 'N/A')} • Tratamento: {item.get('tratamento', 'N/A')}"),
-                    trailing=_create_history_item_menu(controller, animal_data["id"], "historico_doencas", item["id"]),
-                ),
-                elevation=1.5
-            )
-            doencas_list_controls.append(card)
+    return _build_history_section(controller, animal_data, "historico_doencas")
 
-    column = ft.Column(
-        controls=[
-            ft.Row([
-                ft.Text("Ocorrências de Saúde", size=18, weight=ft.FontWeight.BOLD, expand=True),
-                ft.FilledButton("Registrar Ocorrência", icon=ft.Icons.ADD, on_click=lambda _: controller.page.go(f"/animal/{animal_data['id']}/add/historico_doencas"))
-            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-            ft.Divider(),
-            ft.Column(controls=doencas_list_controls, spacing=8, scroll=ft.ScrollMode.ADAPTIVE, expand=True),
-        ],
-        spacing=12,
-        expand=True,
-    )
-    return ft.Container(content=column, padding=15, expand=True)
\ No newline at end of file
+def _build_reproducao_section(controller, animal_data: dict) -> ft.Container:
+    return _build_history_section(controller, animal_data, "historico_reproducao")
@@ -14,6 +14,8 @@ def build_confirm_delete_history_view(controller, animal_id: str, history_key: s
         record_repr = f"Pesagem de {record_to_delete.get('peso')} kg em {record_to_delete.get('data')}"
     elif history_key == "historico_vacinacao":
         record_repr = f"Aplicação de {record_to_delete.get('vacina')} em {record_to_delete.get('data')}"
+    elif history_key == "historico_reproducao":
+        record_repr = f"{record_to_delete.get('evento')} em {record_to_delete.get('data')}"
     else:
         record_repr = f"Ocorrência de {record_to_delete.get('doenca')} em {record_to_delete.get('data')}"
 
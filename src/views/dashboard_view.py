@@ -1,9 +1,8 @@
 import flet as ft
-from datetime import datetime
+from utils.helpers import format_result, refresh_if_mounted
 
 def build_dashboard_view(controller) -> ft.ListView:
     state = controller.app_state
-    has_data = any(state.calculated_indices.values())
 
     dashboard_list = ft.ListView(expand=True, spacing=12, padding=10)
 
@@ -66,81 +65,51 @@ def build_dashboard_view(controller) -> ft.ListView:
         )
         dashboard_list.controls.append(ai_card)
 
-    if not has_data:
-        empty_msg = ft.Container(ft.Column([
-                ft.Icon(ft.Icons.INBOX_OUTLINED, size=50, opacity=0.5),
-                ft.Text("Dashboard Vazio", size=18, weight=ft.FontWeight.BOLD),
-                ft.Text("Nenhum índice foi calculado ainda.", text_align=ft.TextAlign.CENTER),
-            ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=10),
-            padding=40, alignment=ft.alignment.center
-        )
-        dashboard_list.controls.append(empty_msg)
-    else:
-        summary_title = ft.Container(
-            content=ft.Text("Resumo dos Índices", size=18, weight=ft.FontWeight.BOLD),
-            margin=ft.margin.only(top=15)
-        )
-        dashboard_list.controls.append(summary_title)
-        
-        sorted_indices = sorted(state.calculated_indices.items())
-        for name, results in sorted_indices:
-            if not results: continue
-            try:
-                latest = sorted(results, key=lambda x: datetime.strptime(f"{x['Data']} {x['Hora']}", "%d/%m/%Y %H:%M"), reverse=True)[0]
-            except (ValueError, KeyError):
-                latest = results[-1]
-            
-            latest_result_text = latest.get('Resultado', 'N/A')
-            parts = latest_result_text.split(' ', 1)
-            value = parts[0]
-            unit = parts[1] if len(parts) > 1 else ""
-
-            card_header = ft.Row(
-                [
-                    _get_index_icon(name, unit),
-                    ft.Text(name, weight=ft.FontWeight.BOLD, size=16, expand=True),
-                    ft.IconButton(
-                        icon=ft.Icons.DELETE_SWEEP_OUTLINED, icon_color="error", tooltip="Excluir todos os valores deste índice",
-                        on_click=lambda _, n=name: controller.page.go(f"/index/{controller.to_safe_route(n)}/delete_all_confirm")
-                    ),
-                ],
-                vertical_alignment=ft.CrossAxisAlignment.CENTER
-            )
+    controller.dashboard_summary_title = ft.Container(
+        content=ft.Text("Resumo dos Índices", size=18, weight=ft.FontWeight.BOLD),
+        margin=ft.margin.only(top=15)
+    )
+    controller.dashboard_summary_column = ft.Column(spacing=12)
+    controller.dashboard_cards = {}
+    _fill_summary(controller)
+    dashboard_list.controls.append(controller.dashboard_summary_column)
 
-            card_body = ft.Row(
-                [
-                    ft.Text(value, size=32, weight=ft.FontWeight.BOLD, color="primary"),
-                    ft.Container(width=2),
-                    ft.Text(unit, size=14, color="onSurfaceVariant", weight=ft.FontWeight.W_300, offset=ft.Offset(0, 0.35)),
-                ],
-                alignment=ft.MainAxisAlignment.CENTER
-            )
+    return dashboard_list
 
-            card_footer = ft.Text(
-                f"Última medição em: {latest.get('Data', 'N/A')} às {latest.get('Hora', 'N/A')}",
-                size=11, color="onSurfaceVariant", text_align=ft.TextAlign.CENTER
-            )
+def update_index_card(controller, index_name: str):
+    """Reconstrói apenas o card de `index_name`; os demais cards são reaproveitados."""
+    if controller.dashboard_summary_column is None:
+        return
+    controller.dashboard_cards.pop(index_name, None)
+    _fill_summary(controller)
+    refresh_if_mounted(controller.dashboard_summary_column)
 
-            card = ft.Card(
-                content=ft.Container(
-                    content=ft.Column(
-                        [
-                            card_header,
-                            ft.Divider(height=10),
-                            card_body,
-                            card_footer
-                        ],
-                        spacing=5,
-                    ),
-                    on_click=lambda _, n=name: controller.page.go(f"/index/{controller.to_safe_route(n)}/history"),
-                    ink=True,
-                    padding=12,
-                ),
-                elevation=2
+def _fill_summary(controller):
+    state = controller.app_state
+    column = controller.dashboard_summary_column
+    names = [name for name in sorted(state.calculated_indices) if state.calculated_indices[name]]
+    if not names:
+        controller.dashboard_cards.clear()
+        column.controls = [
+            ft.Container(ft.Column([
+                    ft.Icon(ft.Icons.INBOX_OUTLINED, size=50, opacity=0.5),
+                    ft.Text("Dashboard Vazio", size=18, weight=ft.FontWeight.BOLD),
+                    ft.Text("Nenhum índice foi calculado ainda.", text_align=ft.TextAlign.CENTER),
+                ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=10),
+                padding=40, alignment=ft.alignment.center
             )
-            dashboard_list.controls.append(card)
-            
-    return dashboard_list
+        ]
+        return
+
+    cards = {}
+    for name in names:
+        card = controller.dashboard_cards.get(name)
+        if card is None:
+            card = _build_index_card(controller, name, state.index_summary(name))
+        cards[name] = card
+    controller.dashboard_cards = cards
+    # Controles reaproveitados são os mesmos objetos, então o Flet só envia o card novo.
+    column.controls = [controller.dashboard_summary_title, *cards.values()]
 
 def _get_index_icon(index_name: str, result_value: str) -> ft.Icon:
     if "Taxa" in index_name or "%" in result_value: icon_name = ft.Icons.PERCENT_OUTLINED
@@ -150,4 +119,82 @@ def _get_index_icon(index_name: str, result_value: str) -> ft.Icon:
     elif "Lotação" in index_name: icon_name = ft.Icons.GROUP_WORK_OUTLINED
     elif "Leite" in index_name: icon_name = ft.Icons.WATER_DROP_OUTLINED
     else: icon_name = ft.Icons.TRENDING_UP
-    return ft.Icon(name=icon_name, size=24, color="primary")
\ No newline at end of file
+    return ft.Icon(name=icon_name, size=24, color="primary")
+
+def _build_trend_row(summary: dict) -> ft.Row:
+    trend = summary.get("trend")
+    if trend is None:
+        icon, trend_text = ft.Icons.TRENDING_FLAT, "Sem comparação"
+    elif trend > 0:
+        icon, trend_text = ft.Icons.TRENDING_UP, f"+{trend:.2f} vs. anterior"
+    elif trend < 0:
+        icon, trend_text = ft.Icons.TRENDING_DOWN, f"{trend:.2f} vs. anterior"
+    else:
+        icon, trend_text = ft.Icons.TRENDING_FLAT, "Igual à anterior"
+
+    stats_text = f"{summary['count']} medição(ões)"
+    if summary.get("mean") is not None:
+        stats_text += f" · Média {summary['mean']:.2f} · Mín {summary['min']:.2f} · Máx {summary['max']:.2f}"
+
+    return ft.Row(
+        [
+            ft.Icon(icon, size=16, color="onSurfaceVariant"),
+            ft.Text(trend_text, size=11, color="onSurfaceVariant"),
+            ft.Text(stats_text, size=11, color="onSurfaceVariant", expand=True, text_align=ft.TextAlign.RIGHT),
+        ],
+        spacing=4,
+        vertical_alignment=ft.CrossAxisAlignment.CENTER
+    )
+
+def _build_index_card(controller, name: str, summary: dict) -> ft.Card:
+    latest = summary["latest"]
+    unit = latest.get('unidade', "")
+    value = format_result(latest.get('valor'))
+
+    card_header = ft.Row(
+        [
+            _get_index_icon(name, unit),
+            ft.Text(name, weight=ft.FontWeight.BOLD, size=16, expand=True),
+            ft.IconButton(
+                icon=ft.Icons.DELETE_SWEEP_OUTLINED, icon_color="error", tooltip="Excluir todos os valores deste índice",
+                on_click=lambda _, n=name: controller.page.go(f"/index/{controller.to_safe_route(n)}/delete_all_confirm")
+            ),
+        ],
+        vertical_alignment=ft.CrossAxisAlignment.CENTER
+    )
+
+    card_body = ft.Row(
+        [
+            ft.Text(value, size=32, weight=ft.FontWeight.BOLD, color="primary"),
+            ft.Container(width=2),
+            ft.Text(unit, size=14, color="onSurfaceVariant", weight=ft.FontWeight.W_300, offset=ft.Offset(0, 0.35)),
+        ],
+        alignment=ft.MainAxisAlignment.CENTER
+    )
+
+    trend_row = _build_trend_row(summary)
+
+    card_footer = ft.Text(
+        f"Última medição em: {latest.get('Data', 'N/A')} às {latest.get('Hora', 'N/A')}",
+        size=11, color="onSurfaceVariant", text_align=ft.TextAlign.CENTER
+    )
+
+    card = ft.Card(
+        content=ft.Container(
+            content=ft.Column(
+                [
+                    card_header,
+                    ft.Divider(height=10),
+                    card_body,
+                    trend_row,
+                    card_footer
+                ],
+                spacing=5,
+            ),
+            on_click=lambda _, n=name: controller.page.go(f"/index/{controller.to_safe_route(n)}/history"),
+            ink=True,
+            padding=12,
+        ),
+        elevation=2
+    )
+    return card
@@ -1,6 +1,17 @@
 import flet as ft
+from models import persistence
+from models.tabular_io import PYARROW_AVAILABLE
 
 def build_backup_indices_view(controller) -> ft.Container:
+    has_manifest = persistence.has_backup_manifest()
+    controller.backup_incremental_switch = ft.Switch(
+        label="Incremental: só registros novos, alterados ou removidos desde o último backup",
+        value=has_manifest, disabled=not has_manifest
+    )
+    hint = (
+        "Para restaurar, selecione o último backup completo e todos os incrementais gerados depois dele."
+        if has_manifest else "O primeiro backup é sempre completo; os seguintes podem ser incrementais."
+    )
     return _build_export_selection_view(
         controller=controller,
         title="Backup de Índices",
@@ -8,7 +19,8 @@ def build_backup_indices_view(controller) -> ft.Container:
         button_text="Criar Backup dos Índices Selecionados",
         button_icon=ft.Icons.SAVE_ALT_ROUNDED,
         on_button_click=controller.handle_create_backup_click,
-        checkbox_dict_ref=controller.backup_checkboxes
+        checkbox_dict_ref=controller.backup_checkboxes,
+        extra_controls=[controller.backup_incremental_switch, ft.Text(hint, size=13, opacity=0.8)]
     )
 
 def build_export_spreadsheet_view(controller) -> ft.Container:
@@ -33,6 +45,73 @@ def build_export_pdf_view(controller) -> ft.Container:
         checkbox_dict_ref=controller.pdf_checkboxes
     )
 
+def build_pdf_progress_view(controller) -> ft.Container:
+    controller.pdf_progress_bar = ft.ProgressBar(value=0)
+    controller.pdf_status_text = ft.Text("Preparando...", size=13)
+    controller.pdf_cancel_button = ft.OutlinedButton(
+        "Cancelar", icon=ft.Icons.CLOSE_ROUNDED, on_click=controller.handle_cancel_pdf_export_click
+    )
+    return ft.Container(
+        content=ft.Column([
+            ft.Text("Gerando Relatório (PDF)", size=20, weight=ft.FontWeight.BOLD),
+            ft.Text("O relatório é gerado em segundo plano; você pode continuar usando o aplicativo."),
+            controller.pdf_progress_bar,
+            controller.pdf_status_text,
+            ft.Row([controller.pdf_cancel_button], alignment=ft.MainAxisAlignment.END),
+        ], spacing=15),
+        padding=20,
+        expand=True
+    )
+
+def build_export_tables_view(controller) -> ft.Container:
+    controller.tables_format_group = ft.RadioGroup(
+        value="csv",
+        content=ft.Row([
+            ft.Radio(value="csv", label="CSV"),
+            ft.Radio(value="parquet", label="Parquet" if PYARROW_AVAILABLE else "Parquet (requer pyarrow)", disabled=not PYARROW_AVAILABLE),
+        ]),
+    )
+    controller.tables_include_herd_checkbox = ft.Checkbox(
+        label="Incluir rebanho e históricos (pesagens, vacinas, ocorrências, reprodução)",
+        value=bool(controller.app_state.herd),
+    )
+    return _build_export_selection_view(
+        controller=controller,
+        title="Exportar Tabelas (CSV/Parquet)",
+        description="Cada tabela vira um arquivo numa pasta: índices, animais e um arquivo por histórico, ligados pelo id do animal.",
+        button_text="Gerar e Salvar Tabelas",
+        button_icon=ft.Icons.DATASET_OUTLINED,
+        on_button_click=controller.handle_export_tables_click,
+        checkbox_dict_ref=controller.tables_checkboxes,
+        extra_controls=[controller.tables_format_group, controller.tables_include_herd_checkbox],
+        has_other_data=bool(controller.app_state.herd),
+    )
+
+def build_import_tables_view(controller) -> ft.Container:
+    return ft.Container(
+        content=ft.Column(
+            [
+                ft.Text("Importar Tabelas (CSV/Parquet)", size=22, weight=ft.FontWeight.BOLD),
+                ft.Divider(height=15),
+                ft.Text(
+                    "Selecione um ou mais arquivos exportados pelo BoviCheck (indices, animais, pesagens, "
+                    "vacinacoes, doencas, reproducao). Registros com ids já existentes são ignorados; "
+                    "os dados cadastrais dos animais da tabela são atualizados.",
+                    text_align=ft.TextAlign.JUSTIFY
+                ),
+                ft.Container(height=20),
+                ft.FilledButton(
+                    "Selecionar Arquivos",
+                    icon=ft.Icons.FOLDER_OPEN_ROUNDED,
+                    on_click=controller.handle_select_tables_files_click,
+                    style=ft.ButtonStyle(padding=12)
+                ),
+            ],
+            spacing=15,
+        ),
+        padding=15, expand=True
+    )
+
 def build_restore_indices_view(controller) -> ft.Container:
     return ft.Container(
         content=ft.Column(
@@ -40,13 +119,14 @@ def build_restore_indices_view(controller) -> ft.Container:
                 ft.Text("Restaurar Dados de Índices", size=22, weight=ft.FontWeight.BOLD),
                 ft.Divider(height=15),
                 ft.Text(
-                    "Selecione um arquivo de backup (.json). ATENÇÃO: A restauração "
+                    "Selecione um arquivo de backup (.json) ou, para backups incrementais, o backup completo "
+                    "junto com todos os incrementais seguintes. ATENÇÃO: A restauração "
                     "mesclará os dados, adicionando apenas registros que não existem no app atual.",
                     text_align=ft.TextAlign.JUSTIFY
                 ),
                 ft.Container(height=20),
                 ft.FilledButton(
-                    "Selecionar Arquivo de Backup",
+                    "Selecionar Arquivo(s) de Backup",
                     icon=ft.Icons.FOLDER_OPEN_ROUNDED,
                     on_click=controller.handle_select_restore_file_click,
                     style=ft.ButtonStyle(padding=12)
@@ -57,7 +137,8 @@ def build_restore_indices_view(controller) -> ft.Container:
         padding=15, expand=True
     )
 
-def _build_export_selection_view(controller, title, description, button_text, button_icon, on_button_click, checkbox_dict_ref) -> ft.Container:
+def _build_export_selection_view(controller, title, description, button_text, button_icon, on_button_click, checkbox_dict_ref,
+                                 extra_controls=None, has_other_data=False) -> ft.Container:
     checkbox_dict_ref.clear()
     checkbox_list = ft.Column(scroll=ft.ScrollMode.ADAPTIVE, spacing=5, expand=True)
     indices_with_data = {name: data for name, data in controller.app_state.calculated_indices.items() if data}
@@ -76,8 +157,9 @@ def _build_export_selection_view(controller, title, description, button_text, bu
                 ft.Text(title, size=22, weight=ft.FontWeight.BOLD),
                 ft.Divider(height=10),
                 ft.Text(description, text_align=ft.TextAlign.JUSTIFY),
+                *(extra_controls or []),
                 ft.Container(content=checkbox_list, expand=True, padding=ft.padding.symmetric(vertical=10)),
-                ft.FilledButton(button_text, icon=button_icon, on_click=on_button_click, disabled=not indices_with_data),
+                ft.FilledButton(button_text, icon=button_icon, on_click=on_button_click, disabled=not (indices_with_data or has_other_data)),
             ],
             spacing=10, expand=True
         ),
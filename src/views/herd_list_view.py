@@ -15,13 +15,20 @@ def build_herd_list_view(controller) -> ft.Column:
         cursor_color="primary",
     )
 
+    # Os cards são preenchidos por animal_controller.attach_herd_list quando a rota /herd é exibida.
     animal_controller.herd_list_view = ft.ListView(expand=True, spacing=8, padding=8)
-    animal_controller.update_herd_list()
 
     return ft.Column(
         controls=[
             ft.Container(
-                content=search_bar,
+                content=ft.Row([
+                    ft.Container(content=search_bar, expand=True),
+                    ft.IconButton(
+                        icon=ft.Icons.INSIGHTS_ROUNDED,
+                        tooltip="GMD por lote",
+                        on_click=lambda _: controller.page.go("/herd/gmd"),
+                    ),
+                ], spacing=4),
                 padding=ft.padding.symmetric(horizontal=10, vertical=8)
             ),
             ft.Divider(height=1),
@@ -30,6 +37,10 @@ def build_herd_list_view(controller) -> ft.Column:
         expand=True
     )
 
+def card_fields(animal_data: dict) -> tuple:
+    """Campos mostrados no card (brinco primeiro); o card só é recriado quando eles mudam."""
+    return tuple(animal_data.get(key) for key in ("brinco_interno", "raca", "lote_atual", "sexo"))
+
 def create_animal_list_item(controller, animal_data: dict) -> ft.Card:
     animal_id = animal_data["id"]
     
@@ -44,4 +55,40 @@ def create_animal_list_item(controller, animal_data: dict) -> ft.Card:
             on_click=lambda _, r=animal_id: controller.page.go(f"/animal/view/{r}"),
         ),
         elevation=1.5
-    )
\ No newline at end of file
+    )
+
+def build_lot_gmd_view(controller) -> ft.Container:
+    """Distribuição do GMD do período (primeira à última pesagem de cada animal) por lote."""
+    distribution = controller.herd_analytics.lot_distribution()
+    cards = []
+    for lot, stats in distribution.items():
+        cards.append(ft.Card(
+            content=ft.Container(
+                content=ft.Column([
+                    ft.Row([
+                        ft.Text(f"Lote: {lot}", weight=ft.FontWeight.BOLD, size=16),
+                        ft.Text(f"{stats['animais']} animal(is)", size=13, opacity=0.8),
+                    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                    ft.Text(f"GMD médio: {stats['media']:.3f} kg/dia (desvio {stats['desvio']:.3f})", size=15),
+                    ft.Text(
+                        f"Mín. {stats['min']:.3f} · 1º quartil {stats['p25']:.3f} · Mediana {stats['mediana']:.3f} · "
+                        f"3º quartil {stats['p75']:.3f} · Máx. {stats['max']:.3f}",
+                        size=13, opacity=0.8
+                    ),
+                ], spacing=6),
+                padding=15
+            ),
+            elevation=1.5
+        ))
+    if not cards:
+        cards.append(ft.Text("Nenhum animal com duas pesagens em datas diferentes.", italic=True, opacity=0.8))
+
+    return ft.Container(
+        content=ft.Column([
+            ft.Text("GMD por Lote", size=20, weight=ft.FontWeight.BOLD),
+            ft.Text("Ganho médio diário entre a primeira e a última pesagem de cada animal, agrupado pelo lote atual.", size=13),
+            ft.ListView(controls=cards, expand=True, spacing=8),
+        ], spacing=10, expand=True),
+        padding=15,
+        expand=True
+    )
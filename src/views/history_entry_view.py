@@ -1,4 +1,6 @@
 import flet as ft
+from datetime import datetime
+from models.reproduction import EVENT_TYPES, RESULTS
 
 FORMS_CONFIG = {
     "historico_pesagens": {
@@ -23,6 +25,16 @@ FORMS_CONFIG = {
             {"key": "doenca", "label": "Doença/Ocorrência"},
             {"key": "tratamento", "label": "Tratamento Realizado"},
         ]
+    },
+    "historico_reproducao": {
+        "title_add": "Registrar Evento Reprodutivo",
+        "title_edit": "Editar Evento Reprodutivo",
+        "fields": [
+            {"key": "data", "label": "Data do Evento (DD/MM/AAAA)", "type": ft.KeyboardType.DATETIME},
+            {"key": "evento", "label": "Evento", "options": EVENT_TYPES},
+            {"key": "resultado", "label": "Resultado (diagnóstico ou parto)", "options": RESULTS},
+            {"key": "observacao", "label": "Observação (touro, sêmen, etc.)"},
+        ]
     }
 }
 
@@ -47,20 +59,31 @@ def build_history_entry_view(controller, animal_id: str, history_key: str, recor
 
     for field_config in config["fields"]:
         key = field_config["key"]
-        control = ft.TextField(
-            label=field_config["label"],
-            value=existing_data.get(key, ""),
-            keyboard_type=field_config.get("type", ft.KeyboardType.TEXT),
-            border_color="outline",
-            cursor_color="primary"
-        )
+        value = existing_data.get(key, "")
+        if key == "data" and not is_editing:
+            value = datetime.now().strftime("%d/%m/%Y")
+        if "options" in field_config:
+            control = ft.Dropdown(
+                label=field_config["label"],
+                value=value or None,
+                options=[ft.dropdown.Option(opt) for opt in field_config["options"]],
+                border_color="outline",
+            )
+        else:
+            control = ft.TextField(
+                label=field_config["label"],
+                value=value,
+                keyboard_type=field_config.get("type", ft.KeyboardType.TEXT),
+                border_color="outline",
+                cursor_color="primary"
+            )
         form_fields[key] = control
         form_controls.append(control)
 
     animal_controller.history_form_fields = form_fields
 
     def save_entry(e):
-        record_data = {key: field.value for key, field in form_fields.items()}
+        record_data = {key: field.value or "" for key, field in form_fields.items()}
         animal_controller.handle_save_history_record(animal_id, history_key, record_data, record_id)
 
     save_button = ft.FilledButton(
@@ -1,9 +1,11 @@
 import flet as ft
-from datetime import datetime
+from utils.helpers import timestamp_to_date
 import re
 
 def build_index_history_view(controller, index_name: str) -> ft.Container:
     all_calculations = controller.app_state.calculated_indices.get(index_name, [])
+    controller.history_index_name = index_name
+    controller.history_chart_container = None
 
     controller.history_start_date_input = ft.TextField(
         label="Data Inicial",
@@ -67,19 +69,9 @@ def build_index_history_view(controller, index_name: str) -> ft.Container:
             alignment=ft.alignment.center
         )
 
-    try:
-        sorted_calcs = sorted(
-            all_calculations,
-            key=lambda x: datetime.strptime(f"{x.get('Data','')} {x.get('Hora','')}", "%d/%m/%Y %H:%M"),
-            reverse=True
-        )
-    except (ValueError, KeyError):
-        sorted_calcs = all_calculations
+    sorted_calcs = controller.app_state.latest_calculations(index_name)
 
-    controller.history_details_container = ft.Container(
-        content=ft.Text("Clique em uma barra para ver detalhes.", italic=True, text_align=ft.TextAlign.CENTER),
-        padding=10,
-    )
+    controller.history_details_container = ft.Container(content=build_details_placeholder(), padding=10)
     
     chart = _build_bar_chart(controller, sorted_calcs, index_name)
     
@@ -167,13 +159,9 @@ def _build_bar_chart(controller, calcs: list, index_name: str) -> ft.Row:
 
     bar_items, parsed_calcs, max_val = [], [], 0
     for calc in calcs:
-        try:
-            val_str = calc.get("Resultado", "0 ").split()[0].replace(',', '.')
-            numeric_val = float(val_str)
-            parsed_calcs.append({"value": numeric_val, "data": calc})
-            if numeric_val > max_val: max_val = numeric_val
-        except (ValueError, IndexError):
-            parsed_calcs.append({"value": 0, "data": calc})
+        numeric_val = calc.get("valor") or 0
+        parsed_calcs.append({"value": numeric_val, "data": calc})
+        if numeric_val > max_val: max_val = numeric_val
     
     for item in parsed_calcs:
         calc_data = item["data"]
@@ -186,7 +174,8 @@ def _build_bar_chart(controller, calcs: list, index_name: str) -> ft.Row:
             on_click=lambda _, d=calc_data: controller.handle_history_item_selected(d, index_name),
             ink=True
         )
-        date_str = datetime.strptime(calc_data.get('Data'), "%d/%m/%Y").strftime("%d/%m")
+        timestamp = calc_data.get("timestamp")
+        date_str = timestamp_to_date(timestamp).strftime("%d/%m") if timestamp is not None else calc_data.get('Data', '')[:5]
         bar_col = ft.Column(
             [ft.Text(f"{item['value']:.2f}", size=11, weight=ft.FontWeight.BOLD), bar, ft.Text(date_str, size=9)],
             horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=3
@@ -195,6 +184,9 @@ def _build_bar_chart(controller, calcs: list, index_name: str) -> ft.Row:
     
     return ft.Row(controls=bar_items, scroll=ft.ScrollMode.ADAPTIVE, vertical_alignment=ft.CrossAxisAlignment.END)
 
+def build_details_placeholder() -> ft.Text:
+    return ft.Text("Clique em uma barra para ver detalhes.", italic=True, text_align=ft.TextAlign.CENTER)
+
 def build_details_card(controller, calc_data, index_name) -> ft.Card:
     safe_name = controller.to_safe_route(index_name)
     
@@ -208,6 +200,7 @@ def build_details_card(controller, calc_data, index_name) -> ft.Card:
             content=ft.Column([
                 ft.Text(f"Resultado: {calc_data.get('Resultado', 'N/A')}", weight=ft.FontWeight.BOLD),
                 ft.Text(f"Data: {calc_data.get('Data', 'N/A')} às {calc_data.get('Hora', 'N/A')}", size=13),
+                *([ft.Text(f"Rebanho: {calc_data['periodo']} • {calc_data.get('amostras', 0)} registro(s)", size=13)] if calc_data.get("periodo") else []),
                 ft.Row([
                     ft.ElevatedButton("Editar", icon=ft.Icons.EDIT_OUTLINED, on_click=lambda _: controller.page.go(f"/index/{safe_name}/edit/{calc_data['id']}")),
                     ft.FilledButton("Excluir", icon=ft.Icons.DELETE_OUTLINE, style=delete_button_style, on_click=lambda _: controller.page.go(f"/index/{safe_name}/delete_single/{calc_data['id']}/confirm"))
@@ -1,5 +1,10 @@
 import flet as ft
 import re
+from datetime import date
+from models.reproduction import COUNT_INDICES, season_bounds, season_label, season_of
+from utils.helpers import format_result
+
+REPRODUCTIVE_INDICES = (*COUNT_INDICES, "Idade ao Primeiro Parto", "Intervalo entre Partos")
 
 def build_index_calculation_view(controller, index_name: str, editing_calc_id: str | None) -> ft.Container:
     try:
@@ -56,8 +61,12 @@ def build_index_calculation_view(controller, index_name: str, editing_calc_id: s
         elevation=1.5
     )
     
+    cards = [concept_card, inputs_card]
+    if index_name in REPRODUCTIVE_INDICES and not is_editing:
+        cards.append(_build_herd_card(controller, index_name))
+
     column_content = ft.Column(
-        controls=[concept_card, inputs_card],
+        controls=cards,
         spacing=10, 
         scroll=ft.ScrollMode.ADAPTIVE, 
         expand=True
@@ -80,4 +89,46 @@ def _create_input_field(label: str, is_date: bool, value: str) -> ft.TextField:
         border_color="outline",
         focused_border_color="primary",
         cursor_color="primary",
-    )
\ No newline at end of file
+    )
+
+def _build_herd_card(controller, index_name: str) -> ft.Card:
+    """Cálculo a partir do histórico reprodutivo do rebanho, com o valor de cada estação de monta."""
+    reproduction = controller.app_state.reproduction
+    seasons = reproduction.seasons()
+    inicio, fim = season_bounds(seasons[0] if seasons else season_of(date.today().toordinal()))
+    controller.herd_period_start_input = _create_input_field("Início do período", True, inicio.strftime("%d/%m/%Y"))
+    controller.herd_period_end_input = _create_input_field("Fim do período", True, fim.strftime("%d/%m/%Y"))
+
+    unit = controller.calculator.unit_of(index_name)
+    season_rows = []
+    for season in seasons:
+        valor = reproduction.season_indices(controller.calculator, season)[index_name]
+        season_rows.append(ft.ListTile(
+            title=ft.Text(f"Estação {season_label(season)}"),
+            trailing=ft.Text(format_result(valor, unit) if valor is not None else "Sem dados", weight=ft.FontWeight.BOLD),
+            dense=True,
+        ))
+    if not season_rows:
+        season_rows.append(ft.Text("Nenhum evento reprodutivo registrado no rebanho.", italic=True, opacity=0.8))
+
+    return ft.Card(
+        content=ft.Container(
+            content=ft.Column([
+                ft.Text("Calcular pelo Rebanho", weight=ft.FontWeight.BOLD),
+                ft.Text("Usa os eventos reprodutivos registrados nas fichas dos animais.", size=12, opacity=0.8),
+                ft.Row([controller.herd_period_start_input, controller.herd_period_end_input]),
+                ft.Container(
+                    content=ft.OutlinedButton(
+                        "Calcular pelo Rebanho", icon=ft.Icons.PETS,
+                        on_click=lambda e: controller.handle_calculate_from_herd(index_name),
+                    ),
+                    alignment=ft.alignment.center,
+                ),
+                ft.Divider(),
+                ft.Text("Por Estação de Monta", weight=ft.FontWeight.BOLD),
+                *season_rows,
+            ]),
+            padding=15
+        ),
+        elevation=1.5
+    )
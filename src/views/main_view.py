@@ -9,6 +9,8 @@ class MainView:
 
         self.restore_file_picker = ft.FilePicker(on_result=self.controller.handle_restore_file_picked)
         self.page.overlay.append(self.restore_file_picker)
+        self.tables_file_picker = ft.FilePicker(on_result=self.controller.handle_tables_files_picked)
+        self.page.overlay.append(self.tables_file_picker)
 
     def _create_navigation_drawer(self) -> ft.NavigationDrawer:
         ai_enabled = self.controller.app_state.ai_settings.get("enabled", False)
@@ -29,6 +29,27 @@ def build_general_settings_view(controller) -> ft.ListView:
                 on_click=lambda _: controller.page.go("/settings/export_spreadsheet"),
                 trailing=ft.Icon(ft.Icons.ARROW_FORWARD_IOS_ROUNDED)
             ),
+            ft.ListTile(
+                leading=ft.Icon(ft.Icons.DATASET_OUTLINED, color="primary"),
+                title=ft.Text("Exportar CSV/Parquet"),
+                subtitle=ft.Text("Índices, rebanho e históricos em tabelas para outras ferramentas."),
+                on_click=lambda _: controller.page.go("/settings/export_tables"),
+                trailing=ft.Icon(ft.Icons.ARROW_FORWARD_IOS_ROUNDED)
+            ),
+            ft.ListTile(
+                leading=ft.Icon(ft.Icons.DATASET_LINKED_OUTLINED, color="primary"),
+                title=ft.Text("Importar CSV/Parquet"),
+                subtitle=ft.Text("Carregar tabelas exportadas pelo BoviCheck."),
+                on_click=lambda _: controller.page.go("/settings/import_tables"),
+                trailing=ft.Icon(ft.Icons.ARROW_FORWARD_IOS_ROUNDED)
+            ),
+            ft.ListTile(
+                leading=ft.Icon(ft.Icons.RESTART_ALT_ROUNDED, color="primary"),
+                title=ft.Text("Recalcular Índices"),
+                subtitle=ft.Text("Aplicar as fórmulas atuais a todos os cálculos salvos."),
+                on_click=lambda _: controller.page.go("/settings/recompute"),
+                trailing=ft.Icon(ft.Icons.ARROW_FORWARD_IOS_ROUNDED)
+            ),
             ft.ListTile(
                 leading=ft.Icon(ft.Icons.PICTURE_AS_PDF_OUTLINED, color="primary"),
                 title=ft.Text("Exportar Relatório PDF"),
@@ -57,4 +78,27 @@ def build_theme_color_view(controller) -> ft.ListView:
     for color_info in AVAILABLE_COLOR_SEEDS_WITH_NAMES:
         is_selected = (current_color_name == color_info["value"])
         items.append(ft.ListTile(title=ft.Text(color_info["name"], weight=ft.FontWeight.BOLD if is_selected else ft.FontWeight.NORMAL), leading=ft.Icon(ft.Icons.CIRCLE, color=color_info["color_obj"]), selected=is_selected, on_click=lambda _, c=color_info: controller.handle_theme_color_change(c)))
-    return ft.ListView(controls=items, expand=True, spacing=2)
\ No newline at end of file
+    return ft.ListView(controls=items, expand=True, spacing=2)
+
+def build_recompute_view(controller) -> ft.Container:
+    controller.recompute_progress_bar = ft.ProgressBar(value=0, visible=False)
+    controller.recompute_status_text = ft.Text("", size=13)
+    controller.recompute_button = ft.FilledButton(
+        "Recalcular Agora", icon=ft.Icons.RESTART_ALT_ROUNDED, on_click=controller.handle_recompute_click
+    )
+    total = sum(len(results) for results in controller.app_state.calculated_indices.values())
+    return ft.Container(
+        content=ft.Column([
+            ft.Text("Recalcular Índices", size=20, weight=ft.FontWeight.BOLD),
+            ft.Text(
+                "Todos os cálculos salvos com dados de entrada são refeitos com as fórmulas desta versão. "
+                "Registros importados sem dados de entrada não são alterados."
+            ),
+            ft.Text(f"{total} cálculo(s) salvo(s).", size=13, opacity=0.8),
+            controller.recompute_progress_bar,
+            controller.recompute_status_text,
+            ft.Row([controller.recompute_button], alignment=ft.MainAxisAlignment.END),
+        ], spacing=15),
+        padding=20,
+        expand=True
+    )